@@ -0,0 +1,37 @@
+"""HTTP endpoints served next to the Reflex app."""
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from library_admin.services.export import EXPORT_DATASETS, EXPORT_FORMATS, ExportService
+
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+async def export_dataset(request: Request):
+    """Stream /api/export/<dataset>.<format>?token=... straight from a server-side cursor."""
+    dataset = request.path_params["dataset"]
+    file_format = request.path_params["format"]
+
+    if dataset not in EXPORT_DATASETS or file_format not in EXPORT_FORMATS:
+        return PlainTextResponse("Unknown export", status_code=404)
+    if not ExportService.verify_token(dataset, file_format, request.query_params.get("token", "")):
+        return PlainTextResponse("Export link is invalid or has expired", status_code=403)
+
+    # A sync iterator: Starlette pulls each batch on a worker thread
+    return StreamingResponse(
+        ExportService.stream(dataset, file_format),
+        media_type=_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{file_format}"'},
+    )
+
+
+api = Starlette(routes=[
+    Route("/api/export/{dataset}.{format}", export_dataset, methods=["GET"]),
+])
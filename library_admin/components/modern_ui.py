@@ -8,7 +8,8 @@ Inspired by modern mobile app aesthetics with:
 """
 
 import reflex as rx
-from typing import Any, Optional
+from reflex.event import passthrough_event_spec
+from typing import Any, Callable, Optional
 
 
 # Color Palette
@@ -392,6 +393,70 @@ def list_item_modern(
     )
 
 
+class InView(rx.Component):
+    """Element reporting when it scrolls into or out of view (react-intersection-observer)."""
+
+    library = "react-intersection-observer@9.16.0"
+    tag = "InView"
+
+    # Grow the viewport by this margin, to fire before the element is reached
+    root_margin: rx.Var[str]
+
+    # Fired with True when the element enters the viewport, False when it leaves
+    on_change: rx.EventHandler[passthrough_event_spec(bool)]
+
+
+def virtual_list(
+    items: Any,
+    render_item: Callable[[Any], rx.Component],
+    on_load_more: Any,
+    has_more: Any,
+    item_height: str = "120px",
+    **props
+) -> rx.Component:
+    """Long list that loads pages on demand and skips layout of off-screen rows.
+
+    Each row gets `content-visibility: auto`, so the browser skips layout
+    and paint for rows outside the viewport, using item_height as their
+    size until they have been shown once. Every loaded row stays in the
+    DOM and in state; this is not windowed. A sentinel after the last row
+    calls on_load_more(True) as it nears the viewport, so the next page
+    is fetched before the user reaches the end.
+
+    Args:
+        items: List var of rows
+        render_item: Function rendering one row
+        on_load_more: Event handler taking a visibility flag
+        has_more: Var, True while there are pages left to load
+        item_height: Estimated height of a row
+    """
+    return rx.vstack(
+        rx.foreach(
+            items,
+            lambda item: rx.box(
+                render_item(item),
+                width="100%",
+                content_visibility="auto",
+                contain_intrinsic_size=f"auto {item_height}",
+            ),
+        ),
+        rx.cond(
+            has_more,
+            InView.create(
+                rx.center(rx.spinner(size="2"), width="100%", padding="4"),
+                root_margin="0px 0px 800px 0px",
+                on_change=on_load_more,
+                # Remount after every page, so a sentinel still in view fires again
+                key=items.length().to(str),
+                width="100%",
+            ),
+        ),
+        spacing="0",
+        width="100%",
+        **props
+    )
+
+
 def notification_badge(
     count: int,
     color: str = Colors.error_red,
@@ -421,6 +486,28 @@ def notification_badge(
     )
 
 
+def export_menu(on_csv: Any, on_jsonl: Any) -> rx.Component:
+    """Download menu offering CSV and JSON lines exports.
+
+    Args:
+        on_csv: Handler for the CSV item
+        on_jsonl: Handler for the JSONL item
+    """
+    return rx.menu.root(
+        rx.menu.trigger(
+            rx.icon_button(
+                rx.icon("download", size=18),
+                variant="ghost",
+                size="2",
+            ),
+        ),
+        rx.menu.content(
+            rx.menu.item("Export CSV", on_click=on_csv),
+            rx.menu.item("Export JSONL", on_click=on_jsonl),
+        ),
+    )
+
+
 def modern_page_container(
     *children,
     **props
@@ -16,15 +16,93 @@ class Config:
     DB_USER = os.getenv("DB_USER", "libraryuser")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 
+    # Database connection pool
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", "300"))  # seconds
+    DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))  # seconds
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+
     # Evolution API
     EVOLUTION_API_URL = os.getenv("EVOLUTION_API_URL", "https://api.ptcau.com")
     EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY", "")
     EVOLUTION_INSTANCE = os.getenv("EVOLUTION_INSTANCE", "ptc")
 
+    # Keep-alive connections kept open to the Evolution API, retries for
+    # failed connects (a reset connection is always retried once), and the
+    # connect and read timeout of each send attempt (seconds)
+    EVOLUTION_POOL_SIZE = int(os.getenv("EVOLUTION_POOL_SIZE", "10"))
+    EVOLUTION_MAX_RETRIES = int(os.getenv("EVOLUTION_MAX_RETRIES", "2"))
+    EVOLUTION_REQUEST_TIMEOUT = float(os.getenv("EVOLUTION_REQUEST_TIMEOUT", "10"))
+
+    # Evolution API send rate (messages per second per instance). Starts at
+    # EVOLUTION_RATE, halves on throttling and creeps back up to
+    # EVOLUTION_RATE_MAX; a send waits at most EVOLUTION_RATE_MAX_WAIT seconds
+    EVOLUTION_RATE = float(os.getenv("EVOLUTION_RATE", "1"))
+    EVOLUTION_BURST = int(os.getenv("EVOLUTION_BURST", "5"))
+    EVOLUTION_RATE_MIN = float(os.getenv("EVOLUTION_RATE_MIN", "0.1"))
+    EVOLUTION_RATE_MAX = float(os.getenv("EVOLUTION_RATE_MAX", "2"))
+    EVOLUTION_RATE_MAX_WAIT = float(os.getenv("EVOLUTION_RATE_MAX_WAIT", "30"))
+
     # App
     APP_PORT = int(os.getenv("APP_PORT", "3000"))
     APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 
+    # Dashboard statistics snapshot lifetime (seconds)
+    DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", "30"))
+
+    # Search-as-you-type: wait this long after the last keystroke before querying
+    SEARCH_DEBOUNCE_MS = int(os.getenv("SEARCH_DEBOUNCE_MS", "300"))
+
+    # Book IDs accepted by bulk import (PostgreSQL regular expression)
+    BOOK_ID_PATTERN = os.getenv("BOOK_ID_PATTERN", r"^[A-Za-z0-9][A-Za-z0-9_-]{0,49}$")
+
+    # Streaming export: rows fetched per server-side cursor round trip,
+    # and how long a download link stays valid (seconds)
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+    EXPORT_TOKEN_TTL = int(os.getenv("EXPORT_TOKEN_TTL", "60"))
+
+    # Notification dispatch: messages in flight at once, and how long one
+    # send may take before it is counted as failed (seconds; the outbox
+    # worker raises this above the worst-case Evolution API call time)
+    NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "8"))
+    NOTIFY_MESSAGE_TIMEOUT = float(os.getenv("NOTIFY_MESSAGE_TIMEOUT", "15"))
+
+    # Due-soon/overdue notifications: one digest per member listing all
+    # their books, instead of one message per loan
+    NOTIFY_DIGEST = os.getenv("NOTIFY_DIGEST", "true").lower() == "true"
+
+    # A loan gets each kind of notification at most once per this many days,
+    # however many cron runs or bulk sends happen in between
+    DUE_REMINDER_REPEAT_DAYS = int(os.getenv("DUE_REMINDER_REPEAT_DAYS", "3"))
+    OVERDUE_ALERT_REPEAT_DAYS = int(os.getenv("OVERDUE_ALERT_REPEAT_DAYS", "7"))
+
+    # Genres, settings and message templates are cached per process and
+    # dropped on change via LISTEN/NOTIFY; these TTLs (seconds) bound how
+    # stale they can get anyway, and while the listener is disconnected
+    REFERENCE_CACHE_LISTEN = os.getenv("REFERENCE_CACHE_LISTEN", "true").lower() == "true"
+    REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+    REFERENCE_CACHE_FALLBACK_TTL = float(os.getenv("REFERENCE_CACHE_FALLBACK_TTL", "30"))
+    PG_LISTEN_PING_INTERVAL = float(os.getenv("PG_LISTEN_PING_INTERVAL", "30"))
+
+    # Live change feed: row changes arriving within COALESCE_MS are patched
+    # into open sessions together; more than MAX_ROWS at once reloads the
+    # affected lists instead. Sessions idle for SESSION_TTL seconds stop
+    # receiving patches until they load a page again.
+    CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "true").lower() == "true"
+    CHANGE_FEED_COALESCE_MS = int(os.getenv("CHANGE_FEED_COALESCE_MS", "200"))
+    CHANGE_FEED_MAX_ROWS = int(os.getenv("CHANGE_FEED_MAX_ROWS", "200"))
+    CHANGE_FEED_SESSION_TTL = float(os.getenv("CHANGE_FEED_SESSION_TTL", "3600"))
+
+    # Notification outbox delivery
+    OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+    OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))
+    OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+
     # Admin Auth
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "changeme123")
 
@@ -1,6 +1,10 @@
 """PTC Library Admin Dashboard - Main Application."""
 
 import reflex as rx
+from library_admin.api import api
+from library_admin.config import Config
+from library_admin.services.change_feed import change_feed_task
+from library_admin.services.outbox import outbox_worker_task
 from library_admin.state import State
 from library_admin.pages.dashboard_modern import dashboard_page
 from library_admin.pages.books_modern import books_page_modern
@@ -247,7 +251,7 @@ def genres() -> rx.Component:
     )
 
 
-@rx.page(route="/notifications", on_load=State.load_users)
+@rx.page(route="/notifications", on_load=State.load_all_users)
 def notifications() -> rx.Component:
     """Notifications page route."""
     State.current_page = "notifications"
@@ -279,4 +283,13 @@ app = rx.App(
         radius="large",
         accent_color="blue",
     ),
+    api_transformer=api,
 )
+
+# Deliver queued notifications from the app process
+if Config.OUTBOX_WORKER_ENABLED:
+    app.register_lifespan_task(outbox_worker_task)
+
+# Push row changes to open sessions
+if Config.CHANGE_FEED_ENABLED:
+    app.register_lifespan_task(change_feed_task, reflex_app=app, state_cls=State)
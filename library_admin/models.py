@@ -0,0 +1,48 @@
+"""Typed row models for the lists State sends to the browser."""
+
+import dataclasses
+from typing import Any, Mapping, Optional
+
+
+class _Row:
+    """Builds a row model from a query row, ignoring columns it doesn't carry."""
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]):
+        return cls(**{field.name: row[field.name] for field in dataclasses.fields(cls) if field.name in row})
+
+
+@dataclasses.dataclass
+class BookRow(_Row):
+    """A book as shown on the books page."""
+
+    book_id: str
+    title: str
+    author: str
+    genre: str
+    status: str
+    loaned_to: Optional[str] = None
+
+
+@dataclasses.dataclass
+class LoanRow(_Row):
+    """An active loan as shown on the loans page."""
+
+    loan_id: int
+    book_id: str
+    user_id: str
+    title: str
+    name: str
+    due_date: Optional[str]
+    days_remaining: int
+    status: str  # 'overdue', 'due_soon' or 'ok'
+
+
+@dataclasses.dataclass
+class UserRow(_Row):
+    """A user as shown on the users page."""
+
+    user_id: str
+    name: Optional[str]
+    role: str
+    active_loans: int = 0
@@ -46,11 +46,6 @@ def book_card(book: Dict) -> rx.Component:
                         size="1",
                         color="gray",
                     ),
-                    rx.text(
-                        f"Since: {book.get('loaned_date', 'Unknown')}",
-                        size="1",
-                        color="gray",
-                    ),
                     margin_top="2",
                 ),
             ),
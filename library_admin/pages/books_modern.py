@@ -13,6 +13,8 @@ from library_admin.components.modern_ui import (
     list_item_modern,
     modern_button,
     empty_state,
+    export_menu,
+    virtual_list,
 )
 from typing import Dict
 
@@ -294,6 +296,179 @@ def book_form_modern() -> rx.Component:
     )
 
 
+def import_error_row(error: Dict) -> rx.Component:
+    """One rejected row from a bulk import."""
+    return rx.hstack(
+        rx.text("Line " + error["line"].to(str), size="1", weight="bold", color=Colors.dark_navy),
+        rx.text(error["book_id"], size="1", color=Colors.dark_gray),
+        rx.text(error["error"], size="1", color=Colors.error_red),
+        spacing="2",
+        width="100%",
+    )
+
+
+def book_import_modern() -> rx.Component:
+    """Bulk import dialog: upload a CSV/JSONL file and follow its progress."""
+    return rx.dialog.root(
+        rx.dialog.trigger(
+            rx.box(
+                rx.icon("upload", size=20, color=Colors.white),
+                background=Gradients.light_blue_gradient,
+                border_radius="12px",
+                padding="3",
+                cursor="pointer",
+                _hover={
+                    "transform": "scale(1.05)",
+                    "transition": "transform 0.2s",
+                },
+                on_click=State.open_import_dialog,
+            ),
+        ),
+
+        rx.dialog.content(
+            rx.vstack(
+                rx.text(
+                    "Import Books",
+                    size="6",
+                    weight="bold",
+                    color=Colors.dark_navy,
+                ),
+                rx.text(
+                    "CSV with a header row, or JSON lines, with book_id, title, author and genre. "
+                    "Valid rows are imported; invalid rows are listed below.",
+                    size="2",
+                    color=Colors.dark_gray,
+                ),
+
+                rx.cond(
+                    State.import_error != "",
+                    rx.box(
+                        rx.hstack(
+                            rx.icon("circle_alert", size=16, color=Colors.error_red),
+                            rx.text(
+                                State.import_error,
+                                size="2",
+                                color=Colors.error_red,
+                            ),
+                            spacing="2",
+                        ),
+                        background=f"{Colors.error_red}15",
+                        border=f"1px solid {Colors.error_red}",
+                        border_radius="8px",
+                        padding="2",
+                        width="100%",
+                    ),
+                ),
+
+                rx.upload(
+                    rx.vstack(
+                        rx.icon("file_up", size=24, color=Colors.dark_gray),
+                        rx.text(
+                            rx.cond(
+                                rx.selected_files("book_import").length() > 0,
+                                rx.selected_files("book_import")[0],
+                                "Drop a file here or click to choose",
+                            ),
+                            size="2",
+                            color=Colors.dark_gray,
+                        ),
+                        align="center",
+                        spacing="2",
+                    ),
+                    id="book_import",
+                    accept={
+                        "text/csv": [".csv"],
+                        "application/x-ndjson": [".jsonl", ".ndjson"],
+                    },
+                    max_files=1,
+                    multiple=False,
+                    disabled=State.import_in_progress,
+                    border=f"2px dashed {Colors.gray}",
+                    border_radius="12px",
+                    padding="5",
+                    width="100%",
+                ),
+
+                # Progress / result
+                rx.cond(
+                    State.import_phase != "",
+                    rx.vstack(
+                        rx.hstack(
+                            rx.cond(State.import_in_progress, rx.spinner(size="2")),
+                            rx.text(
+                                State.import_phase,
+                                size="2",
+                                weight="bold",
+                                color=Colors.dark_navy,
+                                text_transform="capitalize",
+                            ),
+                            rx.spacer(),
+                            rx.text(
+                                State.import_rows_read.to(str) + " rows read",
+                                size="2",
+                                color=Colors.dark_gray,
+                            ),
+                            width="100%",
+                            align="center",
+                        ),
+                        rx.cond(
+                            ~State.import_in_progress & (State.import_total > 0),
+                            rx.text(
+                                State.import_imported.to(str) + " imported, "
+                                + State.import_skipped.to(str) + " skipped",
+                                size="2",
+                                color=Colors.dark_navy,
+                            ),
+                        ),
+                        rx.cond(
+                            State.import_errors.length() > 0,
+                            rx.scroll_area(
+                                rx.vstack(
+                                    rx.foreach(State.import_errors, import_error_row),
+                                    spacing="1",
+                                    width="100%",
+                                ),
+                                max_height="200px",
+                                type="auto",
+                            ),
+                        ),
+                        spacing="2",
+                        width="100%",
+                    ),
+                ),
+
+                rx.hstack(
+                    rx.dialog.close(
+                        modern_button(
+                            "Close",
+                            variant="soft",
+                            color_scheme="gray",
+                            on_click=State.close_import_dialog,
+                        ),
+                    ),
+                    modern_button(
+                        "Import",
+                        icon="upload",
+                        on_click=State.handle_book_import_upload(
+                            rx.upload_files(upload_id="book_import")
+                        ),
+                        disabled=State.import_in_progress,
+                    ),
+                    spacing="2",
+                    justify="end",
+                    width="100%",
+                ),
+
+                spacing="4",
+                width="100%",
+            ),
+            max_width="560px",
+        ),
+
+        open=State.import_dialog_open,
+    )
+
+
 def filters_modern() -> rx.Component:
     """Modern filters section with search and chips."""
     return rx.vstack(
@@ -370,9 +545,18 @@ def books_page_modern() -> rx.Component:
         rx.hstack(
             section_header(
                 title="Books",
-                badge_value=State.books.length().to(str),
+                badge_value=rx.cond(
+                    State.books_next_cursor != "",
+                    State.books.length().to(str) + "+",
+                    State.books.length().to(str),
+                ),
             ),
             rx.spacer(),
+            export_menu(
+                on_csv=State.export_data("books", "csv"),
+                on_jsonl=State.export_data("books", "jsonl"),
+            ),
+            book_import_modern(),
             book_form_modern(),
             width="100%",
             align="center",
@@ -436,10 +620,12 @@ def books_page_modern() -> rx.Component:
                 action_text="Add Book",
                 on_action=State.open_add_book_form,
             ),
-            rx.vstack(
-                rx.foreach(State.books, book_card_modern),
-                spacing="0",
-                width="100%",
+            virtual_list(
+                State.books,
+                book_card_modern,
+                on_load_more=State.load_more_books,
+                has_more=State.books_next_cursor != "",
+                item_height="150px",
             ),
         ),
     )
@@ -31,7 +31,7 @@ def loan_card(loan: Dict) -> rx.Component:
 
     return rx.card(
         rx.vstack(
-            # Header: Status and Loan Date
+            # Header: Status and Due Date
             rx.hstack(
                 rx.badge(
                     status_text,
@@ -40,7 +40,7 @@ def loan_card(loan: Dict) -> rx.Component:
                 ),
                 rx.spacer(),
                 rx.text(
-                    f"Borrowed: {loan.get('borrow_date', 'N/A')}",
+                    f"Due: {loan.get('due_date', 'N/A')}",
                     size="1",
                     color="gray",
                 ),
@@ -53,7 +53,6 @@ def loan_card(loan: Dict) -> rx.Component:
             # Book Details
             rx.hstack(
                 rx.badge(loan.get("book_id", ""), variant="outline", size="1"),
-                rx.text(f"by {loan.get('author', 'Unknown')}", size="2", color="gray"),
                 spacing="2",
             ),
 
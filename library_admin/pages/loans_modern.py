@@ -11,6 +11,8 @@ from library_admin.components.modern_ui import (
     filter_chip,
     list_item_modern,
     empty_state,
+    export_menu,
+    virtual_list,
 )
 from typing import Dict
 
@@ -189,9 +191,17 @@ def loans_page_modern() -> rx.Component:
         rx.hstack(
             section_header(
                 title="Active Loans",
-                badge_value=State.active_loans.length().to(str),
+                badge_value=rx.cond(
+                    State.loans_has_more,
+                    State.active_loans.length().to(str) + "+",
+                    State.active_loans.length().to(str),
+                ),
             ),
             rx.spacer(),
+            export_menu(
+                on_csv=State.export_data("loans", "csv"),
+                on_jsonl=State.export_data("loans", "jsonl"),
+            ),
             rx.icon_button(
                 rx.icon("refresh_cw", size=18),
                 on_click=State.load_active_loans,
@@ -234,10 +244,12 @@ def loans_page_modern() -> rx.Component:
                 title="No active loans",
                 description="All books have been returned or no loans match your filters",
             ),
-            rx.vstack(
-                rx.foreach(State.active_loans, loan_card_modern),
-                spacing="0",
-                width="100%",
+            virtual_list(
+                State.active_loans,
+                loan_card_modern,
+                on_load_more=State.load_more_loans,
+                has_more=State.loans_has_more,
+                item_height="170px",
             ),
         ),
     )
@@ -11,6 +11,8 @@ from library_admin.components.modern_ui import (
     list_item_modern,
     modern_button,
     empty_state,
+    export_menu,
+    virtual_list,
 )
 from typing import Dict
 
@@ -213,9 +215,22 @@ def users_page_modern() -> rx.Component:
     """Modern users page."""
     return modern_page_container(
         # Header with count
-        section_header(
-            title="Users",
-            badge_value=State.users.length().to(str),
+        rx.hstack(
+            section_header(
+                title="Users",
+                badge_value=rx.cond(
+                    State.users_has_more,
+                    State.users.length().to(str) + "+",
+                    State.users.length().to(str),
+                ),
+            ),
+            rx.spacer(),
+            export_menu(
+                on_csv=State.export_data("users", "csv"),
+                on_jsonl=State.export_data("users", "jsonl"),
+            ),
+            width="100%",
+            align="center",
         ),
 
         # Success/Error messages
@@ -280,10 +295,12 @@ def users_page_modern() -> rx.Component:
                 title="No users found",
                 description="No users match your search criteria",
             ),
-            rx.vstack(
-                rx.foreach(State.users, user_card_modern),
-                spacing="0",
-                width="100%",
+            virtual_list(
+                State.users,
+                user_card_modern,
+                on_load_more=State.load_more_users,
+                has_more=State.users_has_more,
+                item_height="110px",
             ),
         ),
 
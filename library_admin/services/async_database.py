@@ -0,0 +1,66 @@
+"""Async database service for Reflex event handlers."""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from library_admin.config import Config
+from library_admin.services.connection_pool import QueryScope, query_scope
+from library_admin.services.database import DatabaseService
+
+
+# One worker per pooled connection: queries beyond that queue here instead
+# of holding threads that would only block on the pool.
+_executor = ThreadPoolExecutor(
+    max_workers=Config.DB_POOL_MAX_SIZE,
+    thread_name_prefix="library-admin-db",
+)
+
+
+class AsyncDatabaseService:
+    """
+    Awaitable counterpart of DatabaseService.
+
+    Exposes the same public methods as DatabaseService, e.g.
+    ``await AsyncDatabaseService.get_all_books(search="x")``. Each call
+    runs the DatabaseService query on a dedicated worker thread with a
+    pooled connection, so the Reflex event loop stays free to process
+    other sessions' events while the query is in flight.
+    """
+
+    @staticmethod
+    async def run(func, *args, **kwargs):
+        """
+        Run a blocking database callable without blocking the event loop.
+
+        If the awaiting task is cancelled, the statements still running on
+        the call's pooled connections are cancelled server-side as well.
+        """
+        loop = asyncio.get_running_loop()
+        scope = QueryScope()
+        context = contextvars.copy_context()
+        context.run(query_scope.set, scope)
+
+        future = loop.run_in_executor(
+            _executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            scope.cancel()
+            raise
+
+
+def _make_async(name: str):
+    sync_method = getattr(DatabaseService, name)
+
+    @functools.wraps(sync_method)
+    async def method(*args, **kwargs):
+        return await AsyncDatabaseService.run(getattr(DatabaseService, name), *args, **kwargs)
+
+    return staticmethod(method)
+
+
+for _name, _member in list(vars(DatabaseService).items()):
+    if isinstance(_member, staticmethod) and not _name.startswith("_") and _name != "get_connection":
+        setattr(AsyncDatabaseService, _name, _make_async(_name))
@@ -0,0 +1,278 @@
+"""Bulk book import for PTC Library Admin."""
+
+import csv
+import io
+import json
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from library_admin.config import Config
+from library_admin.services.database import DatabaseService
+
+
+IMPORT_COLUMNS = ("book_id", "title", "author", "genre")
+
+# Rows are pulled through COPY in chunks; report progress this often
+PROGRESS_EVERY = 1000
+
+# Cap on the per-row problems returned to the caller
+MAX_REPORTED_ERRORS = 100
+
+
+class BookImportError(Exception):
+    """Raised when an import file cannot be read at all."""
+
+
+class ImportProgress:
+    """
+    Thread-safe progress snapshot for an import running on a worker thread.
+
+    The import updates it as it goes; the UI polls snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {"phase": "queued", "rows_read": 0}
+
+    def update(self, **fields):
+        with self._lock:
+            self._data.update(fields)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._data)
+
+
+def _read_csv(stream: io.TextIOBase) -> Iterator[Dict[str, Any]]:
+    reader = csv.DictReader(stream)
+    # Check the header up front rather than halfway through COPY
+    if not reader.fieldnames:
+        raise BookImportError("CSV file is empty")
+    headers = {name.strip().lower() for name in reader.fieldnames if name}
+    missing = [column for column in IMPORT_COLUMNS if column not in headers]
+    if missing:
+        raise BookImportError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return (
+        {(key or "").strip().lower(): value for key, value in row.items()}
+        for row in reader
+    )
+
+
+def _read_jsonl(stream: io.TextIOBase) -> Iterator[Dict[str, Any]]:
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BookImportError(f"Line {line_no} is not valid JSON: {e.msg}")
+        if not isinstance(row, dict):
+            raise BookImportError(f"Line {line_no} is not a JSON object")
+        yield {str(key).lower(): value for key, value in row.items()}
+
+
+class _CopySource(io.RawIOBase):
+    """
+    File-like object that renders rows as CSV on demand for COPY FROM STDIN,
+    so the whole file never has to sit in memory.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], progress: Optional[ImportProgress]):
+        self._rows = iter(rows)
+        self._progress = progress
+        self._buffer = b""
+        self._line_no = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for _ in range(PROGRESS_EVERY):
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._line_no += 1
+            writer.writerow([self._line_no] + [
+                "" if row.get(column) is None else str(row.get(column)).strip()
+                for column in IMPORT_COLUMNS
+            ])
+        if self._progress is not None:
+            self._progress.update(rows_read=self._line_no)
+        return out.getvalue().encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+# Set-wise validation rules, applied in order; a row keeps the first error it hits
+_VALIDATION_RULES = [
+    ("Missing book_id, title, author or genre", """
+        COALESCE(book_id, '') = '' OR COALESCE(title, '') = ''
+        OR COALESCE(author, '') = '' OR COALESCE(genre, '') = ''
+    """),
+    ("Invalid book_id format", """
+        book_id !~ %(id_pattern)s
+    """),
+    ("Duplicate book_id in file", """
+        book_id IN (
+            SELECT book_id FROM book_import_staging GROUP BY book_id HAVING COUNT(*) > 1
+        )
+    """),
+    ("Book ID already exists", """
+        EXISTS (SELECT 1 FROM books b WHERE b.book_id = book_import_staging.book_id)
+    """),
+    ("Unknown genre", """
+        NOT EXISTS (SELECT 1 FROM genres g WHERE g.genre_name = book_import_staging.genre)
+    """),
+]
+
+
+class BookImportService:
+    """Service for importing many books in one transaction."""
+
+    @staticmethod
+    def read_rows(data: io.BufferedIOBase, file_format: str) -> Iterator[Dict[str, Any]]:
+        """Stream rows out of a CSV or JSONL file (binary, UTF-8)."""
+        stream = io.TextIOWrapper(data, encoding="utf-8-sig", newline="")
+        if file_format == "csv":
+            return _read_csv(stream)
+        if file_format == "jsonl":
+            return _read_jsonl(stream)
+        raise BookImportError(f"Unsupported import format: {file_format}")
+
+    @staticmethod
+    def import_books(rows: Iterable[Dict[str, Any]], skip_invalid: bool = True,
+                     progress: Optional[ImportProgress] = None) -> Dict[str, Any]:
+        """
+        Import books through a COPY-loaded staging table.
+
+        Rows are streamed into a temporary table with COPY, validated with
+        a handful of set-wise statements (required fields, ID format,
+        duplicates within the file, existing IDs, unknown genres) and merged
+        into books with a single INSERT ... SELECT, all in one transaction.
+
+        Args:
+            rows: Dicts with book_id, title, author and genre
+            skip_invalid: Import the valid rows and report the rest; when
+                False, any invalid row aborts the whole import
+            progress: Optional progress tracker updated along the way
+
+        Returns:
+            Dict with 'success', 'total', 'imported', 'skipped' and 'errors'
+            (list of {'line', 'book_id', 'error'}, capped)
+        """
+        progress = progress or ImportProgress()
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            progress.update(phase="loading")
+            cursor.execute("""
+                CREATE TEMP TABLE book_import_staging (
+                    line_no INTEGER,
+                    book_id TEXT,
+                    title TEXT,
+                    author TEXT,
+                    genre TEXT,
+                    error TEXT
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(
+                "COPY book_import_staging (line_no, book_id, title, author, genre) "
+                "FROM STDIN WITH (FORMAT csv)",
+                _CopySource(rows, progress),
+            )
+
+            # Give the planner real row counts for the validation joins
+            cursor.execute("ANALYZE book_import_staging")
+            cursor.execute("SELECT COUNT(*) as total FROM book_import_staging")
+            total = cursor.fetchone()['total']
+
+            progress.update(phase="validating", total=total)
+            for message, condition in _VALIDATION_RULES:
+                cursor.execute(
+                    f"UPDATE book_import_staging SET error = %(message)s "
+                    f"WHERE error IS NULL AND ({condition})",
+                    {"message": message, "id_pattern": Config.BOOK_ID_PATTERN},
+                )
+
+            cursor.execute("""
+                SELECT line_no, book_id, error
+                FROM book_import_staging
+                WHERE error IS NOT NULL
+                ORDER BY line_no
+                LIMIT %s
+            """, (MAX_REPORTED_ERRORS,))
+            errors: List[Dict[str, Any]] = [
+                {"line": row['line_no'], "book_id": row['book_id'], "error": row['error']}
+                for row in cursor.fetchall()
+            ]
+            cursor.execute("SELECT COUNT(*) as invalid FROM book_import_staging WHERE error IS NOT NULL")
+            invalid = cursor.fetchone()['invalid']
+
+            if invalid and not skip_invalid:
+                conn.rollback()
+                progress.update(phase="failed")
+                return {
+                    "success": False,
+                    "total": total,
+                    "imported": 0,
+                    "skipped": total,
+                    "errors": errors,
+                }
+
+            progress.update(phase="merging")
+            cursor.execute("""
+                INSERT INTO books (book_id, title, author, genre, status)
+                SELECT book_id, title, author, genre, 'available'
+                FROM book_import_staging
+                WHERE error IS NULL
+                ORDER BY line_no
+                ON CONFLICT (book_id) DO NOTHING
+            """)
+            imported = cursor.rowcount
+
+            conn.commit()
+            if imported:
+                DatabaseService.invalidate_dashboard_stats()
+            progress.update(phase="done", imported=imported)
+
+            return {
+                "success": True,
+                "total": total,
+                "imported": imported,
+                "skipped": total - imported,
+                "errors": errors,
+            }
+        except Exception:
+            conn.rollback()
+            progress.update(phase="failed")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def import_file(path: str, file_format: str, skip_invalid: bool = True,
+                    progress: Optional[ImportProgress] = None) -> Dict[str, Any]:
+        """Import books from a CSV or JSONL file on disk."""
+        with open(path, "rb") as data:
+            rows = BookImportService.read_rows(data, file_format)
+            return BookImportService.import_books(rows, skip_invalid=skip_invalid, progress=progress)
@@ -0,0 +1,229 @@
+"""Live change feed pushing database row changes to open sessions."""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from library_admin.config import Config
+from library_admin.services.async_database import AsyncDatabaseService
+from library_admin.services.database import DatabaseService
+from library_admin.services.pg_listener import get_listener
+
+
+# Statement triggers NOTIFY this channel (migrations/008_change_feed.sql)
+CHANGE_CHANNEL = "row_changed"
+
+# Session lists, and the tables whose changes can alter them
+LIST_TABLES = {
+    "books": {"books"},
+    "genres": {"genres"},
+    "genres_list": {"genres", "books"},
+    "active_loans": {"loans", "books", "users"},
+    "users": {"users", "loans"},
+}
+
+_watchers: Dict[str, Dict[str, Any]] = {}  # client token -> {"lists": set, "seen": monotonic}
+_watchers_lock = threading.Lock()
+
+
+class ChangeBatch:
+    """Change notifications received together, coalesced per table."""
+
+    def __init__(self):
+        self.keys: Dict[str, Set[str]] = {}  # table -> primary keys of changed rows
+        self.deleted: Dict[str, Set[str]] = {}  # table -> keys no longer present
+        self.inserted: Dict[str, Set[str]] = {}  # table -> keys of new rows
+        self.loan_users: Set[str] = set()  # borrowers of changed loans
+        self.reloaded: Set[str] = set()  # tables changed by statements too large to list
+        self.resync = False
+
+    def add(self, change: Optional[Dict[str, Any]]):
+        """Add one notification payload; None means changes may have been missed."""
+        if change is None:
+            self.resync = True
+            return
+        table = change["table"]
+        keys = self.keys.setdefault(table, set())
+        if change.get("reload"):
+            self.reloaded.add(table)
+            return
+        keys.update(change["keys"])
+        if change["op"] == "DELETE":
+            self.deleted.setdefault(table, set()).update(change["keys"])
+        elif change["op"] == "INSERT":
+            self.inserted.setdefault(table, set()).update(change["keys"])
+        if change.get("old_keys"):
+            # Renamed primary keys: the old rows are gone
+            keys.update(change["old_keys"])
+            self.deleted.setdefault(table, set()).update(change["old_keys"])
+        if table == "loans":
+            self.loan_users.update(change.get("user_ids") or [])
+
+    def lists(self) -> Set[str]:
+        """Session lists these changes can alter."""
+        if self.resync:
+            return set(LIST_TABLES)
+        return {name for name, tables in LIST_TABLES.items() if tables & set(self.keys)}
+
+
+class ChangeFeed:
+    """
+    Fans database row changes out to the sessions showing them.
+
+    Sessions register the lists they show with watch(). One listener task
+    per backend process receives the row_changed notifications (one per
+    writing statement), coalesces those arriving within
+    CHANGE_FEED_COALESCE_MS, fetches the changed rows once, and hands the
+    resulting patch to every watching session's State._apply_change_patch().
+    Cost per statement: one notification and one small query, however many
+    sessions are open.
+    """
+
+    @staticmethod
+    def watch(token: str, *lists: str):
+        """Send this session patches for these lists (see LIST_TABLES)."""
+        if not Config.CHANGE_FEED_ENABLED or not token:
+            return
+        with _watchers_lock:
+            watcher = _watchers.setdefault(token, {"lists": set(), "seen": 0.0})
+            watcher["lists"].update(lists)
+            watcher["seen"] = time.monotonic()
+
+    @staticmethod
+    def _targets(lists: Set[str]) -> Dict[str, Set[str]]:
+        """Sessions watching any of these lists, dropping long-idle ones."""
+        cutoff = time.monotonic() - Config.CHANGE_FEED_SESSION_TTL
+        with _watchers_lock:
+            for token in [t for t, w in _watchers.items() if w["seen"] < cutoff]:
+                del _watchers[token]
+            return {
+                token: watcher["lists"] & lists
+                for token, watcher in _watchers.items()
+                if watcher["lists"] & lists
+            }
+
+    @staticmethod
+    async def build_patch(batch: ChangeBatch, lists: Set[str]) -> Dict[str, Any]:
+        """
+        Fetch the changed rows for the given lists.
+
+        Returns:
+            Dict keyed by list name, each with 'rows' (fresh rows) and
+            'removed' (keys to drop), plus 'reload': lists to reload in
+            full (after a resync, or when too many rows changed at once).
+            'users' also has 'added': keys of newly inserted users
+        """
+        patch: Dict[str, Any] = {"reload": set()}
+        if batch.resync:
+            patch["reload"] = set(lists)
+            return patch
+
+        keys = batch.keys
+        deleted = batch.deleted
+        changed_rows = sum(len(k) for k in keys.values())
+        if changed_rows > Config.CHANGE_FEED_MAX_ROWS:
+            # e.g. a bulk import: one reload is cheaper than patching
+            patch["reload"] = {name for name in lists if name not in ("genres", "genres_list")}
+            lists = lists & {"genres", "genres_list"}
+        elif batch.reloaded:
+            # Statements whose keys didn't fit in the notification
+            patch["reload"] = {
+                name for name in lists
+                if name not in ("genres", "genres_list") and LIST_TABLES[name] & batch.reloaded
+            }
+
+        if "books" in lists and "books" not in patch["reload"]:
+            book_ids = keys.get("books", set())
+            rows = await AsyncDatabaseService.get_books_by_ids(list(book_ids - deleted.get("books", set())))
+            patch["books"] = {
+                "rows": rows,
+                "removed": book_ids - {row["book_id"] for row in rows},
+            }
+
+        if "active_loans" in lists and "active_loans" not in patch["reload"]:
+            loan_ids = {int(key) for key in keys.get("loans", set())}
+            rows = await AsyncDatabaseService.get_active_loans(
+                loan_ids=list(loan_ids),
+                book_ids=list(keys.get("books", set())),
+                user_ids=list(keys.get("users", set())),
+            )
+            patch["active_loans"] = {
+                # Returned or deleted loans are no longer active
+                "rows": rows,
+                "removed": loan_ids - {row["loan_id"] for row in rows},
+            }
+
+        if "users" in lists and "users" not in patch["reload"]:
+            user_ids = keys.get("users", set()) | batch.loan_users
+            rows = await AsyncDatabaseService.get_all_users(user_ids=list(user_ids))
+            patch["users"] = {
+                "rows": rows,
+                "removed": user_ids - {row["user_id"] for row in rows},
+                "added": batch.inserted.get("users", set()),
+            }
+
+        # Small enough to always send whole
+        if "genres_list" in lists:
+            patch["genres_list"] = {"rows": await AsyncDatabaseService.get_genres_with_counts()}
+        if "genres" in lists and "genres" in keys:
+            patch["genres"] = {"rows": await AsyncDatabaseService.get_all_genres()}
+
+        return patch
+
+
+async def change_feed_task(reflex_app, state_cls):
+    """
+    Reflex lifespan task delivering row changes to open sessions.
+
+    Args:
+        reflex_app: The rx.App, used to modify sessions' state
+        state_cls: State class with an async _apply_change_patch(patch, lists)
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_notify(payload: str):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, change)
+
+    listener = get_listener()
+    listener.on_connect(lambda: loop.call_soon_threadsafe(queue.put_nowait, None))
+    listener.subscribe(CHANGE_CHANNEL, on_notify)
+
+    while True:
+        batch = ChangeBatch()
+        batch.add(await queue.get())
+        await asyncio.sleep(Config.CHANGE_FEED_COALESCE_MS / 1000)
+        while not queue.empty():
+            batch.add(queue.get_nowait())
+
+        try:
+            if batch.resync or batch.keys.keys() & {"books", "loans", "users"}:
+                # Counts changed, possibly in another process
+                DatabaseService.invalidate_dashboard_stats()
+
+            targets = ChangeFeed._targets(batch.lists())
+            if not targets:
+                continue
+            patch = await ChangeFeed.build_patch(batch, set().union(*targets.values()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error building change feed patch: {e}")
+            continue
+
+        for token, lists in targets.items():
+            try:
+                # Same key format as reflex uses for a session's state
+                async with reflex_app.modify_state(f"{token}_{state_cls.get_full_name()}") as root:
+                    state = await root.get_state(state_cls)
+                    await state._apply_change_patch(patch, lists)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error pushing changes to session: {e}")
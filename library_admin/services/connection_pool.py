@@ -0,0 +1,334 @@
+"""Process-wide PostgreSQL connection pool for PTC Library Admin."""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+from library_admin.config import Config
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes free before the checkout timeout."""
+
+
+class QueryScope:
+    """
+    Tracks the connections checked out while a scope is active so the
+    queries running on them can be cancelled from another thread.
+
+    Activate with query_scope.set(scope) (or copy it into a worker thread's
+    context); every pooled checkout in that context registers itself until
+    it is returned to the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = set()
+        self.cancelled = False
+
+    def attach(self, conn) -> bool:
+        """Register a checked-out connection; False if the scope is already cancelled."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connections.add(conn)
+            return True
+
+    def detach(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+
+    def cancel(self):
+        """Ask PostgreSQL to abort whatever the scope's connections are running."""
+        with self._lock:
+            self.cancelled = True
+            for conn in self._connections:
+                try:
+                    conn.cancel()
+                except psycopg2.Error:
+                    pass
+
+
+query_scope: contextvars.ContextVar[Optional[QueryScope]] = contextvars.ContextVar(
+    "library_admin_query_scope", default=None
+)
+
+
+class PooledConnection:
+    """
+    Thin proxy around a psycopg2 connection checked out from the pool.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of tearing down the backend.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn):
+        self._pool = pool
+        self._conn = conn
+        self._scope = query_scope.get()
+        if self._scope is not None and not self._scope.attach(conn):
+            # The caller gave up before this query started
+            self._conn = None
+            pool.putconn(conn)
+            raise extensions.QueryCanceledError("query cancelled before it started")
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection."""
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return self._conn
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)."""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if self._scope is not None:
+                self._scope.detach(conn)
+            self._pool.putconn(conn)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - Keeps between min_size and max_size connections open
+    - Recycles connections idle longer than max_idle seconds or older
+      than max_lifetime seconds
+    - Checks liveness on checkout (pings connections that sat idle)
+    - Blocks up to timeout seconds when exhausted, then raises
+      PoolExhaustedError
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 10, max_idle: float = 300,
+                 max_lifetime: float = 3600, timeout: float = 10, ping_after: float = 30,
+                 **connect_kwargs):
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._connect_kwargs = connect_kwargs
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, returned_at), most recently returned on the right
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "exhausted": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "failed_pings": 0,
+            "wait_time_ms": 0.0,
+        }
+
+        for _ in range(self.min_size):
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"Error pre-filling connection pool: {e}")
+                break
+            with self._lock:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+
+    # ----- internals -----
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and release its slot. Caller must hold the lock."""
+        self._created_at.pop(id(conn), None)
+        self._size -= 1
+        self._lock.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _should_recycle(self, conn, returned_at: float, now: float) -> bool:
+        """Caller must hold the lock."""
+        if conn.closed:
+            return True
+        created_at = self._created_at.get(id(conn), now)
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return True
+        # Idle connections above the floor are released after max_idle
+        return bool(self.max_idle) and now - returned_at > self.max_idle and self._size > self.min_size
+
+    def _reap_idle(self, now: float):
+        """Recycle expired idle connections, oldest first. Caller must hold the lock."""
+        kept = deque()
+        while self._idle:
+            conn, returned_at = self._idle.popleft()
+            if self._should_recycle(conn, returned_at, now):
+                self._stats["connections_recycled"] += 1
+                self._discard(conn)
+            else:
+                kept.append((conn, returned_at))
+        self._idle = kept
+
+    def _is_alive(self, conn) -> bool:
+        """Round-trip a trivial query to confirm the backend is still there."""
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # ----- public API -----
+
+    def getconn(self) -> PooledConnection:
+        """Check a live connection out of the pool."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        started = time.monotonic()
+
+        while True:
+            conn = None
+            returned_at = None
+            create = False
+
+            with self._lock:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+
+                self._reap_idle(time.monotonic())
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["exhausted"] += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available within {self.timeout}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._lock.wait(remaining)
+                    continue
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif time.monotonic() - returned_at > self.ping_after and not self._is_alive(conn):
+                with self._lock:
+                    self._stats["failed_pings"] += 1
+                    self._discard(conn)
+                continue
+
+            with self._lock:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["wait_time_ms"] += (time.monotonic() - started) * 1000
+            return PooledConnection(self, conn)
+
+    def putconn(self, conn):
+        """Return a raw connection to the pool, resetting any open transaction."""
+        if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+
+        with self._lock:
+            broken = conn.closed or (
+                conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+            )
+            if self._closed or broken:
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size and checkout/exhaustion counters."""
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Get the process-wide connection pool, creating it on first use.
+
+    A forked worker process gets its own pool rather than sharing
+    sockets with its parent.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(
+                min_size=Config.DB_POOL_MIN_SIZE,
+                max_size=Config.DB_POOL_MAX_SIZE,
+                max_idle=Config.DB_POOL_MAX_IDLE,
+                max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                timeout=Config.DB_POOL_TIMEOUT,
+                host=Config.DB_HOST,
+                port=Config.DB_PORT,
+                dbname=Config.DB_NAME,
+                user=Config.DB_USER,
+                password=Config.DB_PASSWORD,
+                cursor_factory=RealDictCursor,
+            )
+            _pool_pid = pid
+        return _pool
@@ -1,10 +1,53 @@
 """Database service for PTC Library Admin Dashboard."""
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Optional, Any
+import base64
+import json
+import re
+import threading
+import time
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
 from library_admin.config import Config
+from library_admin.services.connection_pool import get_pool
+from library_admin.services.reference_cache import ReferenceCache
+
+
+# Process-wide dashboard statistics snapshot, shared by every session
+_stats_snapshot: Dict[str, Any] = {"value": None, "expires_at": 0.0, "generation": 0}
+_stats_lock = threading.Lock()
+_stats_refresh_lock = threading.Lock()
+
+# Loan status conditions for get_active_loans, as ranges on the indexed due_date
+_LOAN_STATUS_FILTERS = {
+    'overdue': "l.due_date < CURRENT_DATE",
+    'due_soon': "l.due_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 2",
+    'ok': "l.due_date > CURRENT_DATE + 2",
+}
+
+
+def _not_notified_filter(kind: str) -> Tuple[str, List[Any]]:
+    """
+    WHERE clause (on loans l) excluding loans that got a `kind` notification
+    within its repeat window, checked set-wise against notification_log.
+    Notifications whose outbox message went dead don't count.
+    """
+    repeat_days = {
+        'due_reminder': Config.DUE_REMINDER_REPEAT_DAYS,
+        'overdue_alert': Config.OVERDUE_ALERT_REPEAT_DAYS,
+    }[kind]
+    return """
+        AND NOT EXISTS (
+            SELECT 1 FROM notification_log n
+            WHERE n.loan_id = l.loan_id
+              AND n.kind = %s
+              AND n.notified_on > CURRENT_DATE - %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM notification_outbox o
+                  WHERE o.idempotency_key = n.idempotency_key AND o.status = 'dead'
+              )
+        )
+    """, [kind, repeat_days]
 
 
 class DatabaseService:
@@ -12,78 +55,137 @@ class DatabaseService:
 
     @staticmethod
     def get_connection():
-        """Get database connection."""
-        return psycopg2.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            dbname=Config.DB_NAME,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            cursor_factory=RealDictCursor
-        )
+        """
+        Get a database connection from the process-wide pool.
 
-    # ===== STATISTICS =====
+        Calling close() on the returned connection hands it back to the
+        pool; any transaction left open is rolled back first.
+        """
+        return get_pool().getconn()
 
     @staticmethod
-    def get_dashboard_stats() -> Dict[str, Any]:
-        """Get dashboard statistics."""
-        conn = DatabaseService.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            # Total books
-            cursor.execute("SELECT COUNT(*) as total FROM books")
-            total_books = cursor.fetchone()['total']
+    def get_pool_stats() -> Dict[str, Any]:
+        """Get connection pool size and checkout/exhaustion metrics."""
+        return get_pool().stats()
 
-            # Available books
-            cursor.execute("SELECT COUNT(*) as available FROM books WHERE status = 'available'")
-            available_books = cursor.fetchone()['available']
+    # ===== STATISTICS =====
 
-            # Borrowed books
-            cursor.execute("SELECT COUNT(*) as borrowed FROM books WHERE status = 'borrowed'")
-            borrowed_books = cursor.fetchone()['borrowed']
+    @staticmethod
+    def get_dashboard_stats(use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get dashboard statistics.
+
+        Served from a process-wide snapshot for Config.DASHBOARD_STATS_TTL
+        seconds; writes that change the counts call
+        invalidate_dashboard_stats(). Concurrent callers share one refresh.
+        """
+        if use_cache:
+            with _stats_lock:
+                if _stats_snapshot["value"] is not None and time.monotonic() < _stats_snapshot["expires_at"]:
+                    return dict(_stats_snapshot["value"])
+
+        with _stats_refresh_lock:
+            # Another session may have refreshed while we waited
+            with _stats_lock:
+                if use_cache and _stats_snapshot["value"] is not None and time.monotonic() < _stats_snapshot["expires_at"]:
+                    return dict(_stats_snapshot["value"])
+                generation = _stats_snapshot["generation"]
+
+            stats = DatabaseService._query_dashboard_stats()
+
+            with _stats_lock:
+                # Don't store a result that raced with a write
+                if _stats_snapshot["generation"] == generation:
+                    _stats_snapshot["value"] = stats
+                    _stats_snapshot["expires_at"] = time.monotonic() + Config.DASHBOARD_STATS_TTL
+            return dict(stats)
 
-            # Active loans
-            cursor.execute("SELECT COUNT(*) as active FROM loans WHERE return_date IS NULL")
-            active_loans = cursor.fetchone()['active']
+    @staticmethod
+    def invalidate_dashboard_stats():
+        """Drop the cached dashboard statistics snapshot."""
+        with _stats_lock:
+            _stats_snapshot["value"] = None
+            _stats_snapshot["expires_at"] = 0.0
+            _stats_snapshot["generation"] += 1
 
-            # Overdue books
-            cursor.execute("""
-                SELECT COUNT(*) as overdue
-                FROM loans
-                WHERE return_date IS NULL
-                  AND (borrow_date + INTERVAL '14 days') < CURRENT_DATE
-            """)
-            overdue_books = cursor.fetchone()['overdue']
+    @staticmethod
+    def _query_dashboard_stats() -> Dict[str, Any]:
+        """Compute all dashboard counters in a single round trip."""
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
 
-            # Due soon (within 2 days)
+        try:
             cursor.execute("""
-                SELECT COUNT(*) as due_soon
-                FROM loans
-                WHERE return_date IS NULL
-                  AND (borrow_date + INTERVAL '14 days') BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '2 days'
+                SELECT
+                    b.total_books,
+                    b.available_books,
+                    b.borrowed_books,
+                    l.active_loans,
+                    l.overdue_books,
+                    l.due_soon,
+                    u.total_users
+                FROM (
+                    SELECT
+                        COUNT(*) as total_books,
+                        COUNT(*) FILTER (WHERE status = 'available') as available_books,
+                        COUNT(*) FILTER (WHERE status = 'borrowed') as borrowed_books
+                    FROM books
+                ) b
+                CROSS JOIN (
+                    SELECT
+                        COUNT(*) as active_loans,
+                        COUNT(*) FILTER (WHERE due_date < CURRENT_DATE) as overdue_books,
+                        COUNT(*) FILTER (
+                            WHERE due_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 2
+                        ) as due_soon
+                    FROM loans
+                    WHERE return_date IS NULL
+                ) l
+                CROSS JOIN (
+                    SELECT COUNT(*) as total_users FROM users
+                ) u
             """)
-            due_soon = cursor.fetchone()['due_soon']
-
-            # Total users
-            cursor.execute("SELECT COUNT(*) as total FROM users")
-            total_users = cursor.fetchone()['total']
-
-            return {
-                'total_books': total_books,
-                'available_books': available_books,
-                'borrowed_books': borrowed_books,
-                'active_loans': active_loans,
-                'overdue_books': overdue_books,
-                'due_soon': due_soon,
-                'total_users': total_users
-            }
+            return dict(cursor.fetchone())
         finally:
             cursor.close()
             conn.close()
 
     # ===== BOOKS =====
 
+    @staticmethod
+    def _book_filters(search: str, filter_status: str, filter_genre: str):
+        """Build the WHERE clauses and params shared by the book listing queries."""
+        clauses = []
+        params = []
+
+        # Search filter
+        if search:
+            clauses.append("(LOWER(title) LIKE %s OR LOWER(author) LIKE %s OR LOWER(book_id) LIKE %s)")
+            search_pattern = f"%{search.lower()}%"
+            params.extend([search_pattern, search_pattern, search_pattern])
+
+        # Status filter
+        if filter_status != "all":
+            clauses.append("status = %s")
+            params.append(filter_status)
+
+        # Genre filter
+        if filter_genre != "all":
+            clauses.append("genre = %s")
+            params.append(filter_genre)
+
+        return clauses, params
+
+    @staticmethod
+    def _format_book(book) -> Dict:
+        """Convert a book row to a dict with formatted dates."""
+        book_dict = dict(book)
+        if book_dict.get('loaned_date'):
+            book_dict['loaned_date'] = book_dict['loaned_date'].strftime('%Y-%m-%d')
+        if book_dict.get('created_at'):
+            book_dict['created_at'] = book_dict['created_at'].strftime('%Y-%m-%d')
+        return book_dict
+
     @staticmethod
     def get_all_books(search: str = "", filter_status: str = "all", filter_genre: str = "all") -> List[Dict]:
         """Get all books with optional filters."""
@@ -91,45 +193,268 @@ class DatabaseService:
         cursor = conn.cursor()
 
         try:
+            clauses, params = DatabaseService._book_filters(search, filter_status, filter_genre)
             query = """
                 SELECT book_id, title, author, genre, status, loaned_to, loaned_date, created_at
                 FROM books
                 WHERE 1=1
             """
-            params = []
+            for clause in clauses:
+                query += f" AND {clause}"
+            query += " ORDER BY book_id"
 
-            # Search filter
-            if search:
-                query += " AND (LOWER(title) LIKE %s OR LOWER(author) LIKE %s OR LOWER(book_id) LIKE %s)"
-                search_pattern = f"%{search.lower()}%"
-                params.extend([search_pattern, search_pattern, search_pattern])
+            cursor.execute(query, params)
+            return [DatabaseService._format_book(book) for book in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
 
-            # Status filter
-            if filter_status != "all":
-                query += " AND status = %s"
-                params.append(filter_status)
+    @staticmethod
+    def encode_page_cursor(direction: str, key: str) -> str:
+        """Encode a keyset position as an opaque page token."""
+        raw = json.dumps({"d": direction, "k": key}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
 
-            # Genre filter
-            if filter_genre != "all":
-                query += " AND genre = %s"
-                params.append(filter_genre)
+    @staticmethod
+    def decode_page_cursor(token: str):
+        """Decode a page token into (direction, key); (None, None) if empty or invalid."""
+        if not token:
+            return None, None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            if data.get("d") in ("next", "prev") and isinstance(data.get("k"), str):
+                return data["d"], data["k"]
+        except (ValueError, TypeError, AttributeError):
+            pass
+        return None, None
 
-            query += " ORDER BY book_id"
+    @staticmethod
+    def get_books_page(search: str = "", filter_status: str = "all", filter_genre: str = "all",
+                       page_size: int = 50, cursor: str = "") -> Dict[str, Any]:
+        """
+        Get one page of books ordered by book_id using keyset pagination.
+
+        Args:
+            search: Search text for title, author or book ID
+            filter_status: Book status or "all"
+            filter_genre: Genre name or "all"
+            page_size: Maximum number of books to return
+            cursor: Token from a previous page's next_cursor/prev_cursor,
+                or "" for the first page
+
+        Returns:
+            Dict with 'books' (list), 'next_cursor' and 'prev_cursor'
+            (tokens, "" when there is no further page)
+        """
+        page_size = max(1, int(page_size))
+        direction, key = DatabaseService.decode_page_cursor(cursor)
 
-            cursor.execute(query, params)
-            books = cursor.fetchall()
+        conn = DatabaseService.get_connection()
+        db_cursor = conn.cursor()
 
-            # Convert to list of dicts and format dates
-            result = []
-            for book in books:
-                book_dict = dict(book)
-                if book_dict.get('loaned_date'):
-                    book_dict['loaned_date'] = book_dict['loaned_date'].strftime('%Y-%m-%d')
-                if book_dict.get('created_at'):
-                    book_dict['created_at'] = book_dict['created_at'].strftime('%Y-%m-%d')
-                result.append(book_dict)
+        try:
+            clauses, params = DatabaseService._book_filters(search, filter_status, filter_genre)
+            if direction == "next":
+                clauses.append("book_id > %s")
+                params.append(key)
+            elif direction == "prev":
+                clauses.append("book_id < %s")
+                params.append(key)
+
+            # Walk the book_id index backwards for previous pages, then flip
+            order = "DESC" if direction == "prev" else "ASC"
+            query = """
+                SELECT book_id, title, author, genre, status, loaned_to
+                FROM books
+                WHERE 1=1
+            """
+            for clause in clauses:
+                query += f" AND {clause}"
+            query += f" ORDER BY book_id {order} LIMIT %s"
+            params.append(page_size + 1)  # One extra row tells us whether another page exists
+
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            if direction == "prev":
+                rows.reverse()
+
+            books = [DatabaseService._format_book(book) for book in rows]
+
+            next_cursor = ""
+            prev_cursor = ""
+            if books:
+                if direction == "prev":
+                    next_cursor = DatabaseService.encode_page_cursor("next", books[-1]['book_id'])
+                    if has_more:
+                        prev_cursor = DatabaseService.encode_page_cursor("prev", books[0]['book_id'])
+                else:
+                    if has_more:
+                        next_cursor = DatabaseService.encode_page_cursor("next", books[-1]['book_id'])
+                    if direction == "next":
+                        prev_cursor = DatabaseService.encode_page_cursor("prev", books[0]['book_id'])
 
-            return result
+            return {
+                'books': books,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor,
+            }
+        finally:
+            db_cursor.close()
+            conn.close()
+
+    @staticmethod
+    def _prefix_tsquery(search: str) -> str:
+        """Turn free text into a prefix-matching tsquery, e.g. 'harry pot' -> 'harry:* & pot:*'."""
+        terms = re.findall(r"\w+", search.lower())
+        return " & ".join(f"{term}:*" for term in terms)
+
+    @staticmethod
+    def search_books(search: str, filter_status: str = "all", filter_genre: str = "all",
+                     limit: int = 50) -> List[Dict]:
+        """Search books by relevance; the first page of search_books_page."""
+        return DatabaseService.search_books_page(
+            search, filter_status=filter_status, filter_genre=filter_genre, page_size=limit
+        )['books']
+
+    @staticmethod
+    def search_books_page(search: str, filter_status: str = "all", filter_genre: str = "all",
+                          page_size: int = 50, cursor: str = "") -> Dict[str, Any]:
+        """
+        Get one page of books ranked by relevance using the indexed search_vector column.
+
+        Words are prefix-matched against title, author and book ID and
+        ranked by ts_rank (title hits weigh most). If nothing matches, falls
+        back to trigram word similarity so small typos still find the book.
+        Ranks aren't unique, so pages are offsets into the ranking, ties
+        broken by book_id. Requires migrations/001_books_search.sql.
+
+        Args:
+            search: Free-text query
+            filter_status: Book status or "all"
+            filter_genre: Genre name or "all"
+            page_size: Maximum number of books to return
+            cursor: Token from a previous page's next_cursor, or "" for the
+                first page
+
+        Returns:
+            Dict with 'books' (ordered by relevance), 'next_cursor' and
+            'prev_cursor' (tokens, "" when there is no further page)
+        """
+        search = search.strip()
+        if not search:
+            return DatabaseService.get_books_page(
+                filter_status=filter_status, filter_genre=filter_genre,
+                page_size=page_size, cursor=cursor
+            )
+
+        page_size = max(1, int(page_size))
+        # The token remembers which ranking the first page used, so later
+        # pages don't switch to the typo fallback once the matches run out
+        _, key = DatabaseService.decode_page_cursor(cursor)
+        mode, _, offset = (key or "").partition(":")
+        offset = int(offset) if mode in ("fts", "fuzzy") and offset.isdigit() else 0
+        if not offset:
+            mode = ""
+
+        clauses, params = DatabaseService._book_filters("", filter_status, filter_genre)
+        filters = "".join(f" AND {clause}" for clause in clauses)
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            rows = []
+            tsquery = DatabaseService._prefix_tsquery(search)
+
+            if tsquery and mode in ("", "fts"):
+                cursor.execute(f"""
+                    SELECT book_id, title, author, genre, status, loaned_to
+                    FROM books, to_tsquery('simple', %s) query
+                    WHERE search_vector @@ query{filters}
+                    ORDER BY ts_rank(search_vector, query) DESC, book_id
+                    LIMIT %s OFFSET %s
+                """, [tsquery] + params + [page_size + 1, offset])
+                rows = cursor.fetchall()
+                mode = "fts" if rows or mode else ""
+
+            if not mode or mode == "fuzzy":
+                # Typo-tolerant fallback served by the trigram indexes
+                mode = "fuzzy"
+                term = search.lower()
+                cursor.execute(f"""
+                    SELECT book_id, title, author, genre, status, loaned_to
+                    FROM books
+                    WHERE (%s <%% LOWER(title) OR %s <%% LOWER(author) OR %s <%% LOWER(book_id)){filters}
+                    ORDER BY GREATEST(
+                        word_similarity(%s, LOWER(title)),
+                        word_similarity(%s, LOWER(author)),
+                        word_similarity(%s, LOWER(book_id))
+                    ) DESC, book_id
+                    LIMIT %s OFFSET %s
+                """, [term, term, term] + params + [term, term, term, page_size + 1, offset])
+                rows = cursor.fetchall()
+
+            next_cursor = ""
+            if len(rows) > page_size:  # One extra row tells us whether another page exists
+                next_cursor = DatabaseService.encode_page_cursor("next", f"{mode}:{offset + page_size}")
+            return {
+                'books': [DatabaseService._format_book(book) for book in rows[:page_size]],
+                'next_cursor': next_cursor,
+                'prev_cursor': "",
+            }
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_books_by_ids(book_ids: List[str]) -> List[Dict]:
+        """Get the books with these IDs, ordered by book_id."""
+        if not book_ids:
+            return []
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT book_id, title, author, genre, status, loaned_to
+                FROM books
+                WHERE book_id = ANY(%s)
+                ORDER BY book_id
+            """, (list(book_ids),))
+            return [DatabaseService._format_book(book) for book in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def order_book_ids(book_ids: List[str], up_to: str = "") -> List[str]:
+        """
+        Order book IDs the way the books listing does, without reading any rows.
+
+        Args:
+            book_ids: IDs to order
+            up_to: Drop IDs sorting after this one ("" keeps them all)
+
+        Returns:
+            The IDs in book_id order, as the database's collation sorts them
+        """
+        if not book_ids:
+            return []
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT id
+                FROM unnest(%s::text[]) AS id
+                WHERE %s = '' OR id <= %s
+                ORDER BY id
+            """, (list(book_ids), up_to, up_to))
+            return [row['id'] for row in cursor.fetchall()]
         finally:
             cursor.close()
             conn.close()
@@ -156,8 +481,13 @@ class DatabaseService:
             conn.close()
 
     @staticmethod
-    def add_book(book_id: str, title: str, author: str, genre: str) -> bool:
-        """Add a new book."""
+    def add_book(book_id: str, title: str, author: str, genre: str) -> Optional[Dict]:
+        """
+        Add a new book.
+
+        Returns:
+            The new book row (as listed by get_books_page), or None on failure
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -165,21 +495,30 @@ class DatabaseService:
             cursor.execute("""
                 INSERT INTO books (book_id, title, author, genre, status)
                 VALUES (%s, %s, %s, %s, 'available')
+                RETURNING book_id, title, author, genre, status, loaned_to
             """, (book_id, title, author, genre))
+            book = cursor.fetchone()
 
             conn.commit()
-            return True
+            DatabaseService.invalidate_dashboard_stats()
+            return DatabaseService._format_book(book)
         except Exception as e:
             conn.rollback()
             print(f"Error adding book: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
-    def update_book(book_id: str, title: str, author: str, genre: str, new_book_id: str = None) -> bool:
-        """Update an existing book. If new_book_id is provided, also update the book_id."""
+    def update_book(book_id: str, title: str, author: str, genre: str, new_book_id: str = None) -> Optional[Dict]:
+        """
+        Update an existing book. If new_book_id is provided, also update the book_id.
+
+        Returns:
+            The updated book row, or None if the book does not exist or
+            new_book_id is already taken
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -188,7 +527,7 @@ class DatabaseService:
             if new_book_id and new_book_id != book_id:
                 cursor.execute("SELECT book_id FROM books WHERE book_id = %s", (new_book_id,))
                 if cursor.fetchone():
-                    return False  # New book_id already exists
+                    return None  # New book_id already exists
 
                 # Update book_id along with other fields
                 # Note: This also updates foreign key references in loans table due to ON UPDATE CASCADE
@@ -196,6 +535,7 @@ class DatabaseService:
                     UPDATE books
                     SET book_id = %s, title = %s, author = %s, genre = %s, updated_at = CURRENT_TIMESTAMP
                     WHERE book_id = %s
+                    RETURNING book_id, title, author, genre, status, loaned_to
                 """, (new_book_id, title, author, genre, book_id))
             else:
                 # Just update title, author, genre
@@ -203,42 +543,48 @@ class DatabaseService:
                     UPDATE books
                     SET title = %s, author = %s, genre = %s, updated_at = CURRENT_TIMESTAMP
                     WHERE book_id = %s
+                    RETURNING book_id, title, author, genre, status, loaned_to
                 """, (title, author, genre, book_id))
+            book = cursor.fetchone()
 
             conn.commit()
-            return cursor.rowcount > 0
+            return DatabaseService._format_book(book) if book else None
         except Exception as e:
             conn.rollback()
             print(f"Error updating book: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
-    def delete_book(book_id: str) -> bool:
-        """Delete a book (only if not currently borrowed)."""
+    def delete_book(book_id: str) -> Optional[Dict]:
+        """
+        Delete a book (only if not currently borrowed).
+
+        Returns:
+            The deleted book (as listed on the books page), or None if it
+            does not exist or is borrowed
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Check if book is borrowed
-            cursor.execute("SELECT status FROM books WHERE book_id = %s", (book_id,))
+            # Borrowed books are left alone
+            cursor.execute("""
+                DELETE FROM books
+                WHERE book_id = %s AND status <> 'borrowed'
+                RETURNING book_id, title, author, genre, status, loaned_to
+            """, (book_id,))
             book = cursor.fetchone()
-
-            if not book:
-                return False
-
-            if book['status'] == 'borrowed':
-                return False  # Cannot delete borrowed book
-
-            cursor.execute("DELETE FROM books WHERE book_id = %s", (book_id,))
             conn.commit()
-            return cursor.rowcount > 0
+            if book:
+                DatabaseService.invalidate_dashboard_stats()
+            return dict(book) if book else None
         except Exception as e:
             conn.rollback()
             print(f"Error deleting book: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
@@ -247,7 +593,12 @@ class DatabaseService:
 
     @staticmethod
     def get_all_genres() -> List[str]:
-        """Get all genre names."""
+        """Get all genre names (cached, see ReferenceCache)."""
+        return ReferenceCache.get('genres', 'genres:names', DatabaseService._query_genre_names)
+
+    @staticmethod
+    def _query_genre_names() -> List[str]:
+        """Query all genre names, in display order."""
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -284,77 +635,95 @@ class DatabaseService:
             conn.close()
 
     @staticmethod
-    def add_genre(genre_name: str, description: str = "") -> bool:
-        """Add a new genre."""
+    def add_genre(genre_name: str, description: str = "") -> Optional[Dict]:
+        """
+        Add a new genre, placed last.
+
+        Returns:
+            The new genre row (as listed by get_genres_with_counts), or None on failure
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Get max display_order
-            cursor.execute("SELECT COALESCE(MAX(display_order), 0) + 1 FROM genres")
-            display_order = cursor.fetchone()['coalesce']
-
-            cursor.execute(
-                "INSERT INTO genres (genre_name, description, display_order) VALUES (%s, %s, %s)",
-                (genre_name, description, display_order)
-            )
+            cursor.execute("""
+                INSERT INTO genres (genre_name, description, display_order)
+                SELECT %s, %s, COALESCE(MAX(display_order), 0) + 1 FROM genres
+                RETURNING genre_id, genre_name, description, display_order,
+                          (SELECT COUNT(*) FROM books b WHERE b.genre = genres.genre_name) as book_count
+            """, (genre_name, description))
+            genre = cursor.fetchone()
             conn.commit()
-            return True
+            ReferenceCache.invalidate('genres')
+            return dict(genre)
         except Exception as e:
             conn.rollback()
             print(f"Error adding genre: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
-    def update_genre(genre_id: int, genre_name: str, description: str) -> bool:
-        """Update genre details."""
+    def update_genre(genre_id: int, genre_name: str, description: str) -> Optional[Dict]:
+        """
+        Update genre details.
+
+        Returns:
+            The updated genre row (as listed by get_genres_with_counts), or
+            None if it does not exist or the update failed
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute(
-                "UPDATE genres SET genre_name = %s, description = %s WHERE genre_id = %s",
-                (genre_name, description, genre_id)
-            )
+            cursor.execute("""
+                UPDATE genres SET genre_name = %s, description = %s
+                WHERE genre_id = %s
+                RETURNING genre_id, genre_name, description, display_order,
+                          (SELECT COUNT(*) FROM books b WHERE b.genre = genres.genre_name) as book_count
+            """, (genre_name, description, genre_id))
+            genre = cursor.fetchone()
             conn.commit()
-            return True
+            ReferenceCache.invalidate('genres')
+            return dict(genre) if genre else None
         except Exception as e:
             conn.rollback()
             print(f"Error updating genre: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
-    def delete_genre(genre_id: int) -> bool:
-        """Delete a genre (only if no books use it)."""
+    def delete_genre(genre_id: int) -> Optional[Dict]:
+        """
+        Delete a genre (only if no books use it).
+
+        Returns:
+            The deleted genre's genre_id and genre_name, or None if it does
+            not exist or books use it
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Check if any books use this genre
-            cursor.execute("SELECT genre_name FROM genres WHERE genre_id = %s", (genre_id,))
+            # Genres still used by books are left alone
+            cursor.execute("""
+                DELETE FROM genres g
+                WHERE g.genre_id = %s
+                  AND NOT EXISTS (SELECT 1 FROM books b WHERE b.genre = g.genre_name)
+                RETURNING g.genre_id, g.genre_name
+            """, (genre_id,))
             genre = cursor.fetchone()
-            if not genre:
-                return False
-
-            cursor.execute("SELECT COUNT(*) as count FROM books WHERE genre = %s", (genre['genre_name'],))
-            count = cursor.fetchone()['count']
-
-            if count > 0:
-                return False  # Cannot delete genre with books
-
-            cursor.execute("DELETE FROM genres WHERE genre_id = %s", (genre_id,))
             conn.commit()
-            return True
+            if genre:
+                ReferenceCache.invalidate('genres')
+            return dict(genre) if genre else None
         except Exception as e:
             conn.rollback()
             print(f"Error deleting genre: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
@@ -362,44 +731,118 @@ class DatabaseService:
     # ===== LOANS =====
 
     @staticmethod
-    def get_active_loans() -> List[Dict]:
-        """Get all active loans with user and book info."""
+    def get_active_loans(search: str = "", status: str = "all", limit: Optional[int] = None,
+                         offset: int = 0, shard: Optional[Tuple[int, int]] = None,
+                         not_notified: Optional[str] = None, loan_ids: Optional[List[int]] = None,
+                         book_ids: Optional[List[str]] = None,
+                         user_ids: Optional[List[str]] = None,
+                         due_in: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                         after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """
+        Get active loans with user and book info.
+
+        Args:
+            search: Match against book title, author, book ID or user ID
+            status: 'overdue', 'due_soon', 'ok' or 'all'
+            limit: Maximum number of loans to return (None for all)
+            offset: Number of matching loans to skip
+            shard: (index, count) to only return the loans of users whose
+                user_id hashes to shard `index` of `count`
+            not_notified: Notification kind ('due_reminder' or
+                'overdue_alert'); leave out loans already sent one
+                within its repeat window
+            loan_ids, book_ids, user_ids: Only loans matching any of these
+                (used to refresh the rows a change touched)
+            due_in: (first, last) days from today; only loans due in that
+                range, inclusive (None leaves that end open)
+            after: (due_date, loan_id) of the last loan of the previous
+                page; only loans sorting after it (keyset pagination)
+
+        Returns:
+            Loans ordered by due date
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("""
+            query = """
                 SELECT
                     l.loan_id,
                     l.book_id,
                     l.user_id,
-                    l.borrow_date,
-                    (l.borrow_date + INTERVAL '14 days') as due_date,
+                    l.due_date,
                     b.title,
-                    b.author,
-                    b.genre,
                     COALESCE(u.name, 'User ' || u.user_id) as name,
-                    EXTRACT(DAY FROM ((l.borrow_date + INTERVAL '14 days') - CURRENT_DATE))::integer as days_remaining,
+                    (l.due_date - CURRENT_DATE) as days_remaining,
                     CASE
-                        WHEN (l.borrow_date + INTERVAL '14 days') < CURRENT_DATE THEN 'overdue'
-                        WHEN (l.borrow_date + INTERVAL '14 days') BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '2 days' THEN 'due_soon'
+                        WHEN l.due_date < CURRENT_DATE THEN 'overdue'
+                        WHEN l.due_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 2 THEN 'due_soon'
                         ELSE 'ok'
                     END as status
                 FROM loans l
                 JOIN books b ON l.book_id = b.book_id
                 LEFT JOIN users u ON l.user_id = u.user_id
                 WHERE l.return_date IS NULL
-                ORDER BY l.borrow_date + INTERVAL '14 days'
-            """)
+            """
+            params = []
 
+            # Search filter
+            if search:
+                query += """
+                  AND (LOWER(b.title) LIKE %s OR LOWER(b.author) LIKE %s
+                       OR LOWER(l.book_id) LIKE %s OR LOWER(l.user_id) LIKE %s)
+                """
+                search_pattern = f"%{search.lower()}%"
+                params.extend([search_pattern] * 4)
+
+            # Status filter, served by the partial active-loans due_date index
+            if status in _LOAN_STATUS_FILTERS:
+                query += f" AND {_LOAN_STATUS_FILTERS[status]}"
+
+            # Plain due_date ranges, so the due_date index serves them too
+            if due_in is not None:
+                first, last = due_in
+                if first is not None:
+                    query += " AND l.due_date >= CURRENT_DATE + %s"
+                    params.append(int(first))
+                if last is not None:
+                    query += " AND l.due_date <= CURRENT_DATE + %s"
+                    params.append(int(last))
+
+            # Shard by user so each user's loans (and digest) land in one shard
+            if shard is not None:
+                query += " AND mod(abs(hashtext(l.user_id)::bigint), %s) = %s"
+                params.extend([shard[1], shard[0]])
+
+            if not_notified:
+                clause, clause_params = _not_notified_filter(not_notified)
+                query += clause
+                params.extend(clause_params)
+
+            if loan_ids is not None or book_ids is not None or user_ids is not None:
+                query += " AND (l.loan_id = ANY(%s) OR l.book_id = ANY(%s) OR l.user_id = ANY(%s))"
+                params.extend([list(loan_ids or []), list(book_ids or []), list(user_ids or [])])
+
+            if after is not None:
+                query += " AND (l.due_date, l.loan_id) > (%s::date, %s)"
+                params.extend([after[0], after[1]])
+
+            query += " ORDER BY l.due_date, l.loan_id"
+
+            if limit is not None:
+                query += " LIMIT %s OFFSET %s"
+                params.extend([limit, offset])
+            elif offset:
+                query += " OFFSET %s"
+                params.append(offset)
+
+            cursor.execute(query, params)
             loans = cursor.fetchall()
 
             # Convert to list of dicts and format dates
             result = []
             for loan in loans:
                 loan_dict = dict(loan)
-                if loan_dict.get('borrow_date'):
-                    loan_dict['borrow_date'] = loan_dict['borrow_date'].strftime('%Y-%m-%d')
                 if loan_dict.get('due_date'):
                     loan_dict['due_date'] = loan_dict['due_date'].strftime('%Y-%m-%d')
                 result.append(loan_dict)
@@ -409,60 +852,219 @@ class DatabaseService:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    def get_active_loans_by_user(status: str = "all", user_id: Optional[str] = None,
+                                 not_notified: Optional[str] = None) -> List[Dict]:
+        """
+        Get active loans grouped per borrower, in one query.
+
+        Args:
+            status: 'overdue', 'due_soon', 'ok' or 'all'
+            user_id: Only this borrower's loans
+            not_notified: Notification kind; leave out loans already sent
+                one within its repeat window
+
+        Returns:
+            One dict per borrower with 'user_id', 'name' and 'loans' (each
+            loan has loan_id, book_id, title, user_id, name, due_date,
+            days_remaining and status), loans ordered by due date
+        """
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            query = """
+                SELECT
+                    l.user_id,
+                    COALESCE(u.name, 'User ' || l.user_id) as name,
+                    json_agg(json_build_object(
+                        'loan_id', l.loan_id,
+                        'book_id', l.book_id,
+                        'title', b.title,
+                        'user_id', l.user_id,
+                        'name', COALESCE(u.name, 'User ' || l.user_id),
+                        'due_date', to_char(l.due_date, 'YYYY-MM-DD'),
+                        'days_remaining', l.due_date - CURRENT_DATE,
+                        'status', CASE
+                            WHEN l.due_date < CURRENT_DATE THEN 'overdue'
+                            WHEN l.due_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 2 THEN 'due_soon'
+                            ELSE 'ok'
+                        END
+                    ) ORDER BY l.due_date, l.loan_id) as loans
+                FROM loans l
+                JOIN books b ON l.book_id = b.book_id
+                LEFT JOIN users u ON l.user_id = u.user_id
+                WHERE l.return_date IS NULL
+            """
+            params = []
+
+            if status in _LOAN_STATUS_FILTERS:
+                query += f" AND {_LOAN_STATUS_FILTERS[status]}"
+
+            if user_id is not None:
+                query += " AND l.user_id = %s"
+                params.append(user_id)
+
+            if not_notified:
+                clause, clause_params = _not_notified_filter(not_notified)
+                query += clause
+                params.extend(clause_params)
+
+            query += """
+                GROUP BY l.user_id, u.name
+                ORDER BY COUNT(*) DESC, l.user_id
+            """
+
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def log_notifications(entries: List[Tuple[int, str, str, Optional[str]]], cursor=None) -> int:
+        """
+        Record notifications in the delivery ledger.
+
+        Args:
+            entries: (loan_id, kind, user_id, idempotency_key) tuples, with
+                the key of the outbox message carrying the notification (None
+                if sent directly); a loan already logged for that kind today
+                is skipped
+            cursor: Write within the caller's transaction (the caller
+                commits) instead of in a transaction of its own
+
+        Returns:
+            Number of entries newly logged
+        """
+        if not entries:
+            return 0
+
+        conn = None
+        if cursor is None:
+            conn = DatabaseService.get_connection()
+            cursor = conn.cursor()
+
+        try:
+            logged = execute_values(cursor, """
+                INSERT INTO notification_log (loan_id, kind, user_id, idempotency_key)
+                VALUES %s
+                ON CONFLICT (loan_id, kind, notified_on) DO NOTHING
+                RETURNING loan_id
+            """, entries, page_size=500, fetch=True)
+            if conn is not None:
+                conn.commit()
+            return len(logged)
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            raise e
+        finally:
+            if conn is not None:
+                cursor.close()
+                conn.close()
+
     # ===== USERS =====
 
     @staticmethod
-    def get_all_users() -> List[Dict]:
-        """Get all users."""
+    def get_all_users(search: str = "", user_ids: Optional[List[str]] = None,
+                      limit: Optional[int] = None,
+                      after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        Get all users, optionally matching search against name or phone number.
+
+        Args:
+            search: Match against name or user ID
+            user_ids: Only these users
+            limit: Maximum number of users to return (None for all)
+            after: (created_at, user_id) of the last user of the previous
+                page; only users sorting after it (keyset pagination)
+
+        Returns:
+            Users, newest first, with created_at (an ISO timestamp) for
+            paging
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("""
+            query = """
                 SELECT
                     u.user_id,
                     u.name,
                     u.role,
-                    u.created_at,
+                    COALESCE(u.created_at, 'epoch') as created_at,
                     COUNT(l.loan_id) FILTER (WHERE l.return_date IS NULL) as active_loans
                 FROM users u
                 LEFT JOIN loans l ON u.user_id = l.user_id
+                WHERE 1=1
+            """
+            params = []
+
+            if search:
+                query += " AND (LOWER(COALESCE(u.name, '')) LIKE %s OR LOWER(u.user_id) LIKE %s)"
+                search_pattern = f"%{search.lower()}%"
+                params.extend([search_pattern, search_pattern])
+
+            if user_ids is not None:
+                query += " AND u.user_id = ANY(%s)"
+                params.append(list(user_ids))
+
+            if after is not None:
+                # Newest first, ties broken by user_id; users without a
+                # created_at sort as created at the epoch, i.e. last
+                query += (
+                    " AND (COALESCE(u.created_at, 'epoch') < %s"
+                    " OR (COALESCE(u.created_at, 'epoch') = %s AND u.user_id > %s))"
+                )
+                params.extend([after[0], after[0], after[1]])
+
+            query += """
                 GROUP BY u.user_id, u.name, u.role, u.created_at
-                ORDER BY u.created_at DESC
-            """)
+                ORDER BY COALESCE(u.created_at, 'epoch') DESC, u.user_id
+            """
 
-            users = cursor.fetchall()
+            if limit is not None:
+                query += " LIMIT %s"
+                params.append(limit)
 
-            # Convert to list of dicts
-            result = []
-            for user in users:
-                user_dict = dict(user)
-                if user_dict.get('created_at'):
-                    user_dict['created_at'] = user_dict['created_at'].strftime('%Y-%m-%d')
-                result.append(user_dict)
+            cursor.execute(query, params)
 
-            return result
+            users = [dict(user) for user in cursor.fetchall()]
+            for user in users:
+                user['created_at'] = user['created_at'].isoformat()
+            return users
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
-    def update_user(user_id: str, name: str, role: str) -> bool:
-        """Update user details."""
+    def update_user(user_id: str, name: str, role: str) -> Optional[Dict]:
+        """
+        Update user details.
+
+        Returns:
+            The updated user row (as listed by get_all_users), or None if
+            the user does not exist or the update failed
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute(
-                "UPDATE users SET name = %s, role = %s WHERE user_id = %s",
-                (name, role, user_id)
-            )
+            cursor.execute("""
+                UPDATE users u SET name = %s, role = %s
+                WHERE u.user_id = %s
+                RETURNING u.user_id, u.name, u.role,
+                          (SELECT COUNT(*) FROM loans l
+                           WHERE l.user_id = u.user_id AND l.return_date IS NULL) as active_loans
+            """, (name, role, user_id))
+            user = cursor.fetchone()
             conn.commit()
-            return True
+            return dict(user) if user else None
         except Exception as e:
             conn.rollback()
             print(f"Error updating user: {e}")
-            return False
+            return None
         finally:
             cursor.close()
             conn.close()
@@ -494,7 +1096,12 @@ class DatabaseService:
 
     @staticmethod
     def get_all_settings() -> List[Dict]:
-        """Get all settings."""
+        """Get all settings (cached, see ReferenceCache)."""
+        return ReferenceCache.get('settings', 'settings:all', DatabaseService._query_all_settings)
+
+    @staticmethod
+    def _query_all_settings() -> List[Dict]:
+        """Query all settings."""
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -504,28 +1111,27 @@ class DatabaseService:
                 FROM settings
                 ORDER BY setting_key
             """)
-            return cursor.fetchall()
+            return [dict(row) for row in cursor.fetchall()]
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
     def get_setting(key: str) -> Optional[str]:
-        """Get a single setting value."""
-        conn = DatabaseService.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("SELECT setting_value FROM settings WHERE setting_key = %s", (key,))
-            result = cursor.fetchone()
-            return result['setting_value'] if result else None
-        finally:
-            cursor.close()
-            conn.close()
+        """Get a single setting value (from the cached settings)."""
+        for setting in DatabaseService.get_all_settings():
+            if setting['setting_key'] == key:
+                return setting['setting_value']
+        return None
 
     @staticmethod
     def update_setting(key: str, value: str) -> bool:
-        """Update a setting value."""
+        """
+        Update a setting value.
+
+        Changing loan_due_days also recomputes due_date for every active
+        loan in the same transaction.
+        """
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -535,8 +1141,24 @@ class DatabaseService:
                 SET setting_value = %s, updated_at = CURRENT_TIMESTAMP
                 WHERE setting_key = %s
             """, (value, key))
+            updated = cursor.rowcount > 0
+            loans_changed = False
+
+            if key == 'loan_due_days':
+                loan_days = int(value)
+                cursor.execute("""
+                    UPDATE loans
+                    SET due_date = borrow_date::date + %s
+                    WHERE return_date IS NULL
+                      AND due_date IS DISTINCT FROM borrow_date::date + %s
+                """, (loan_days, loan_days))
+                loans_changed = cursor.rowcount > 0
+
             conn.commit()
-            return cursor.rowcount > 0
+            ReferenceCache.invalidate('settings')
+            if loans_changed:
+                DatabaseService.invalidate_dashboard_stats()
+            return updated
         except Exception as e:
             conn.rollback()
             print(f"Error updating setting: {e}")
@@ -549,7 +1171,12 @@ class DatabaseService:
 
     @staticmethod
     def get_all_templates() -> List[Dict]:
-        """Get all message templates."""
+        """Get all message templates (cached, see ReferenceCache)."""
+        return ReferenceCache.get('message_templates', 'message_templates:all', DatabaseService._query_all_templates)
+
+    @staticmethod
+    def _query_all_templates() -> List[Dict]:
+        """Query all message templates."""
         conn = DatabaseService.get_connection()
         cursor = conn.cursor()
 
@@ -560,7 +1187,7 @@ class DatabaseService:
                 FROM message_templates
                 ORDER BY template_type, template_name
             """)
-            return cursor.fetchall()
+            return [dict(row) for row in cursor.fetchall()]
         finally:
             cursor.close()
             conn.close()
@@ -596,6 +1223,7 @@ class DatabaseService:
                 VALUES (%s, %s, %s, %s)
             """, (template_name, template_type, message_content, description))
             conn.commit()
+            ReferenceCache.invalidate('message_templates')
             return True
         except Exception as e:
             conn.rollback()
@@ -620,6 +1248,7 @@ class DatabaseService:
                 WHERE template_id = %s
             """, (template_name, template_type, message_content, description, template_id))
             conn.commit()
+            ReferenceCache.invalidate('message_templates')
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -638,6 +1267,7 @@ class DatabaseService:
         try:
             cursor.execute("DELETE FROM message_templates WHERE template_id = %s", (template_id,))
             conn.commit()
+            ReferenceCache.invalidate('message_templates')
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -662,9 +1292,7 @@ class DatabaseService:
                 FROM users u
                 JOIN loans l ON u.user_id = l.user_id
                 WHERE l.return_date IS NULL
-                  AND (l.borrow_date + (
-                      SELECT setting_value::INTEGER FROM settings WHERE setting_key = 'loan_due_days'
-                  ) || ' days')::INTERVAL < CURRENT_DATE
+                  AND l.due_date < CURRENT_DATE
                 GROUP BY u.user_id, u.name
                 ORDER BY overdue_count DESC
             """)
@@ -688,12 +1316,9 @@ class DatabaseService:
                 FROM users u
                 JOIN loans l ON u.user_id = l.user_id
                 WHERE l.return_date IS NULL
-                  AND (l.borrow_date + (
-                      SELECT setting_value::INTEGER FROM settings WHERE setting_key = 'loan_due_days'
-                  ) || ' days')::INTERVAL
-                  BETWEEN CURRENT_DATE AND CURRENT_DATE + (
+                  AND l.due_date BETWEEN CURRENT_DATE AND CURRENT_DATE + COALESCE((
                       SELECT setting_value::INTEGER FROM settings WHERE setting_key = 'reminder_days_before'
-                  ) || ' days')::INTERVAL
+                  ), 2)
                 GROUP BY u.user_id, u.name
                 ORDER BY due_soon_count DESC
             """)
@@ -0,0 +1,98 @@
+"""Concurrent message dispatch for PTC Library Admin notifications."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from library_admin.config import Config
+from library_admin.services.rate_limit import AdaptiveRateLimiter
+
+
+# A job is (details, send): details describe the message for the results,
+# send() performs the blocking API call and returns a NotificationService result.
+DispatchJob = Tuple[Dict[str, Any], Callable[[], Dict[str, Any]]]
+
+
+class DispatchEngine:
+    """
+    Sends messages with bounded concurrency.
+
+    - At most `concurrency` sends are in flight at once
+    - Each send gets `timeout` seconds before it is counted as failed
+    - With a rate_limiter, each send first waits for a slot from it (the
+      sends themselves must then skip their own rate limiting)
+    - Results are aggregated into the usual
+      {'total', 'success', 'failed', 'details'} shape, in job order
+
+    NotificationService calls are blocking, so each send runs on a worker
+    thread while the event loop keeps the others moving.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        self.concurrency = max(1, concurrency or Config.NOTIFY_CONCURRENCY)
+        self.timeout = timeout or Config.NOTIFY_MESSAGE_TIMEOUT
+        self.rate_limiter = rate_limiter
+
+    async def _send(self, semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor,
+                    details: Dict[str, Any], send: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            # Wait for a send slot outside the per-message timeout
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            try:
+                result = await asyncio.wait_for(loop.run_in_executor(executor, send), self.timeout)
+            except asyncio.TimeoutError:
+                result = {"success": False, "error": f"Timed out after {self.timeout:g}s"}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+        if result.get("success"):
+            return {**details, "status": "sent"}
+        failed = {**details, "status": "failed", "error": result.get("error")}
+        if result.get("retry_after"):
+            failed["retry_after"] = result["retry_after"]
+        return failed
+
+    async def run(self, jobs: Iterable[DispatchJob]) -> Dict[str, Any]:
+        """
+        Send every job and wait for all of them.
+
+        Args:
+            jobs: (details, send) pairs
+
+        Returns:
+            Dict with total, success, failed, details and elapsed_seconds
+        """
+        jobs = list(jobs)
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Headroom for sends that outlive their timeout: their threads keep
+        # running until the HTTP call returns and must not starve new sends
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency * 2,
+            thread_name_prefix="library-admin-dispatch",
+        )
+
+        try:
+            details = await asyncio.gather(*(
+                self._send(semaphore, executor, job_details, send)
+                for job_details, send in jobs
+            ))
+        finally:
+            executor.shutdown(wait=False)
+
+        success = sum(1 for detail in details if detail["status"] == "sent")
+        return {
+            "total": len(jobs),
+            "success": success,
+            "failed": len(jobs) - success,
+            "details": list(details),
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+        }
+
+    def run_sync(self, jobs: Iterable[DispatchJob]) -> Dict[str, Any]:
+        """Blocking wrapper around run() for scripts and other sync callers."""
+        return asyncio.run(self.run(jobs))
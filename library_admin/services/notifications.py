@@ -1,21 +1,176 @@
 """WhatsApp notification service using Evolution API."""
 
+import os
+import threading
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
 from library_admin.config import Config
+from library_admin.services.rate_limit import RateLimitTimeout, get_rate_limiter, parse_retry_after
+from library_admin.services.templates import CompiledTemplate
+
+
+# Built-in digest texts, used when no '<kind>_digest' template is defined
+_DIGEST_TEMPLATES = {
+    'due_soon': """📚 PTC Library Reminder
+
+You have {book_count} book(s) due soon:
+
+{book_list}
+
+Please return them by the due date or renew if needed.
+
+Thank you! 🙏""",
+    'overdue': """⚠️ PTC Library - Overdue Books
+
+You have {book_count} overdue book(s):
+
+{book_list}
+
+Please return them as soon as possible so others can borrow them.
+
+Thank you for your understanding! 🙏""",
+}
+
+
+class _ResetRetry(Retry):
+    """
+    Retries failed connects, and requests whose connection was reset (e.g.
+    a pooled keep-alive connection the server had already closed).
+
+    Read timeouts are never retried: the message may already have been
+    delivered, and sending it again would duplicate it.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+# Retry backoff: urllib3 sleeps factor * 2 ** (n - 1) before the n-th retry (n >= 2)
+_RETRY_BACKOFF_FACTOR = 0.2
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """
+    Get the process-wide HTTP session for Evolution API calls.
+
+    Connections to the API are kept alive and reused across messages and
+    threads, so bulk sends skip the TCP and TLS handshake per message.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            retries = _ResetRetry(
+                total=Config.EVOLUTION_MAX_RETRIES,
+                connect=Config.EVOLUTION_MAX_RETRIES,
+                read=1,
+                status=0,
+                other=0,
+                allowed_methods=frozenset({"GET", "POST"}),
+                backoff_factor=_RETRY_BACKOFF_FACTOR,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=Config.EVOLUTION_POOL_SIZE,
+                max_retries=retries,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = pid
+        return _session
 
 
 class NotificationService:
     """Service for sending WhatsApp notifications via Evolution API."""
 
     @staticmethod
-    def send_whatsapp_message(phone_number: str, message: str) -> Dict[str, Any]:
+    def max_send_seconds() -> float:
+        """
+        Longest one send can take once rate limiting is done: every attempt
+        timing out on connect and read, plus the backoff between retries.
+
+        A caller giving up sooner can't tell whether the message went out.
+        """
+        attempts = Config.EVOLUTION_MAX_RETRIES + 1
+        backoff = sum(_RETRY_BACKOFF_FACTOR * 2 ** (n - 1) for n in range(2, attempts))
+        return attempts * 2 * Config.EVOLUTION_REQUEST_TIMEOUT + backoff
+
+    @staticmethod
+    def _post_text(number: str, text: str, rate_limited: bool = True) -> requests.Response:
+        """
+        POST a text message to the Evolution API instance.
+
+        Waits for the instance's rate limiter first (unless the caller
+        already did) and feeds the response back into it.
+        """
+        limiter = get_rate_limiter()
+        if rate_limited:
+            limiter.acquire(timeout=Config.EVOLUTION_RATE_MAX_WAIT)
+
+        # Evolution API endpoint for sending text messages
+        url = f"{Config.EVOLUTION_API_URL}/message/sendText/{Config.EVOLUTION_INSTANCE}"
+
+        headers = {
+            "Content-Type": "application/json",
+            "apikey": Config.EVOLUTION_API_KEY
+        }
+
+        payload = {
+            "number": number,
+            "text": text
+        }
+
+        response = _get_session().post(
+            url, json=payload, headers=headers, timeout=Config.EVOLUTION_REQUEST_TIMEOUT
+        )
+
+        if response.status_code in (429, 503):
+            limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+        elif response.status_code in (200, 201):
+            limiter.on_success()
+        return response
+
+    @staticmethod
+    def _failed_response(response: requests.Response) -> Dict[str, Any]:
+        if response.status_code in (429, 503):
+            return {
+                "success": False,
+                "error": f"Rate limited by Evolution API. Status: {response.status_code}",
+                "retry_after": parse_retry_after(response.headers.get("Retry-After")),
+                "response": response.text
+            }
+        return {
+            "success": False,
+            "error": f"Failed to send message. Status: {response.status_code}",
+            "response": response.text
+        }
+
+    @staticmethod
+    def send_whatsapp_message(phone_number: str, message: str, rate_limited: bool = True) -> Dict[str, Any]:
         """
         Send a WhatsApp message to a phone number.
 
         Args:
             phone_number: Phone number with country code (e.g., 61412345678)
             message: Message text to send
+            rate_limited: Wait for the rate limiter first; pass False when
+                the caller already acquired a send slot
 
         Returns:
             Dict with 'success' (bool) and 'message' (str) or 'error' (str)
@@ -24,20 +179,7 @@ class NotificationService:
             # Remove any spaces or special characters from phone number
             clean_phone = phone_number.replace(" ", "").replace("+", "").replace("-", "")
 
-            # Evolution API endpoint for sending text messages
-            url = f"{Config.EVOLUTION_API_URL}/message/sendText/{Config.EVOLUTION_INSTANCE}"
-
-            headers = {
-                "Content-Type": "application/json",
-                "apikey": Config.EVOLUTION_API_KEY
-            }
-
-            payload = {
-                "number": clean_phone,
-                "text": message
-            }
-
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = NotificationService._post_text(clean_phone, message, rate_limited)
 
             if response.status_code == 200 or response.status_code == 201:
                 return {
@@ -46,12 +188,13 @@ class NotificationService:
                     "response": response.json()
                 }
             else:
-                return {
-                    "success": False,
-                    "error": f"Failed to send message. Status: {response.status_code}",
-                    "response": response.text
-                }
+                return NotificationService._failed_response(response)
 
+        except RateLimitTimeout:
+            return {
+                "success": False,
+                "error": "Send rate limit reached. Please try again shortly."
+            }
         except requests.exceptions.Timeout:
             return {
                 "success": False,
@@ -69,31 +212,21 @@ class NotificationService:
             }
 
     @staticmethod
-    def send_group_message(group_id: str, message: str) -> Dict[str, Any]:
+    def send_group_message(group_id: str, message: str, rate_limited: bool = True) -> Dict[str, Any]:
         """
         Send a WhatsApp message to a group.
 
         Args:
             group_id: WhatsApp group ID
             message: Message text to send
+            rate_limited: Wait for the rate limiter first; pass False when
+                the caller already acquired a send slot
 
         Returns:
             Dict with 'success' (bool) and 'message' (str) or 'error' (str)
         """
         try:
-            url = f"{Config.EVOLUTION_API_URL}/message/sendText/{Config.EVOLUTION_INSTANCE}"
-
-            headers = {
-                "Content-Type": "application/json",
-                "apikey": Config.EVOLUTION_API_KEY
-            }
-
-            payload = {
-                "number": group_id,
-                "text": message
-            }
-
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = NotificationService._post_text(group_id, message, rate_limited)
 
             if response.status_code == 200 or response.status_code == 201:
                 return {
@@ -102,18 +235,38 @@ class NotificationService:
                     "response": response.json()
                 }
             else:
-                return {
-                    "success": False,
-                    "error": f"Failed to send message. Status: {response.status_code}",
-                    "response": response.text
-                }
+                return NotificationService._failed_response(response)
 
+        except RateLimitTimeout:
+            return {
+                "success": False,
+                "error": "Send rate limit reached. Please try again shortly."
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Error sending group message: {str(e)}"
             }
 
+    @staticmethod
+    def get_rate_limit_stats() -> Dict[str, Any]:
+        """Current send rate and throughput for the Evolution API instance."""
+        return get_rate_limiter().stats()
+
+    @staticmethod
+    def format_due_reminder(book_title: str, due_date: str) -> str:
+        """Text of the reminder about a book due soon."""
+        return f"""📚 PTC Library Reminder
+
+Your borrowed book is due soon:
+
+📖 {book_title}
+📅 Due: {due_date}
+
+Please return it by the due date or renew if needed.
+
+Thank you! 🙏"""
+
     @staticmethod
     def send_due_reminder(user_id: str, book_title: str, due_date: str) -> Dict[str, Any]:
         """
@@ -127,18 +280,53 @@ class NotificationService:
         Returns:
             Result from send_whatsapp_message
         """
-        message = f"""📚 PTC Library Reminder
+        message = NotificationService.format_due_reminder(book_title, due_date)
+        return NotificationService.send_whatsapp_message(user_id, message)
 
-Your borrowed book is due soon:
+    @staticmethod
+    def format_overdue_alert(book_title: str, days_overdue: int) -> str:
+        """Text of the alert about an overdue book."""
+        return f"""⚠️ PTC Library - Overdue Book
+
+Your borrowed book is {days_overdue} days overdue:
 
 📖 {book_title}
-📅 Due: {due_date}
 
-Please return it by the due date or renew if needed.
+Please return it as soon as possible so others can borrow it.
 
-Thank you! 🙏"""
+Thank you for your understanding! 🙏"""
 
-        return NotificationService.send_whatsapp_message(user_id, message)
+    @staticmethod
+    def format_loan_digest(kind: str, loans: List[Dict[str, Any]],
+                           template: Optional[CompiledTemplate] = None) -> str:
+        """
+        Text of one message listing all of a member's due-soon or overdue books.
+
+        Args:
+            kind: 'due_soon' or 'overdue'
+            loans: The member's loans (title, due_date, days_remaining, name)
+            template: Optional compiled template using {name}, {book_count}
+                and {book_list}; the built-in text is used if missing
+
+        Returns:
+            Message text
+        """
+        if kind == 'overdue':
+            lines = [
+                f"📖 {loan['title']} ({abs(loan.get('days_remaining') or 0)} days overdue)"
+                for loan in loans
+            ]
+        else:
+            lines = [f"📖 {loan['title']} (due {loan.get('due_date')})" for loan in loans]
+
+        fields = {
+            "name": loans[0].get('name') or "",
+            "book_count": len(loans),
+            "book_list": "\n".join(lines),
+        }
+        if template:
+            return template.render(**fields)
+        return _DIGEST_TEMPLATES[kind].format(**fields)
 
     @staticmethod
     def send_overdue_alert(user_id: str, book_title: str, days_overdue: int) -> Dict[str, Any]:
@@ -153,16 +341,7 @@ Thank you! 🙏"""
         Returns:
             Result from send_whatsapp_message
         """
-        message = f"""⚠️ PTC Library - Overdue Book
-
-Your borrowed book is {days_overdue} days overdue:
-
-📖 {book_title}
-
-Please return it as soon as possible so others can borrow it.
-
-Thank you for your understanding! 🙏"""
-
+        message = NotificationService.format_overdue_alert(book_title, days_overdue)
         return NotificationService.send_whatsapp_message(user_id, message)
 
     @staticmethod
@@ -207,7 +386,7 @@ Come and borrow it today! 📚✨"""
                 "apikey": Config.EVOLUTION_API_KEY
             }
 
-            response = requests.get(url, headers=headers, timeout=5)
+            response = _get_session().get(url, headers=headers, timeout=5)
 
             if response.status_code == 200:
                 return {
@@ -0,0 +1,377 @@
+"""Durable notification outbox for PTC Library Admin."""
+
+import asyncio
+import functools
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from library_admin.config import Config
+from library_admin.services.async_database import AsyncDatabaseService
+from library_admin.services.database import DatabaseService
+from library_admin.services.dispatch import DispatchEngine, DispatchJob
+from library_admin.services.notifications import NotificationService
+from library_admin.services.rate_limit import get_rate_limiter
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retrying a message that has failed `attempts` times."""
+    delay = min(Config.OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)), Config.OUTBOX_BACKOFF_MAX)
+    # Jitter so messages that failed together don't all retry together
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxService:
+    """Service for queueing notifications and tracking their delivery."""
+
+    @staticmethod
+    def message(idempotency_key: str, recipient: str, message: str, channel: str = "direct") -> Dict[str, str]:
+        """
+        Build an outbox message.
+
+        Args:
+            idempotency_key: Unique key; enqueueing the same key twice is a no-op
+            recipient: Phone number ('direct') or WhatsApp group ID ('group')
+            message: Message text
+            channel: 'direct' or 'group'
+        """
+        return {
+            "idempotency_key": idempotency_key,
+            "channel": channel,
+            "recipient": recipient,
+            "message": message,
+        }
+
+    @staticmethod
+    def enqueue_many(messages: List[Dict[str, str]],
+                     ledger: Optional[List[Tuple[int, str, str, str]]] = None) -> int:
+        """
+        Queue messages for delivery in one INSERT.
+
+        Messages whose idempotency key is already in the outbox are skipped,
+        and so are their ledger entries.
+
+        Args:
+            messages: Dicts from OutboxService.message
+            ledger: (loan_id, kind, user_id, idempotency_key) entries for
+                the notification log, written in the same transaction
+
+        Returns:
+            Number of messages newly queued
+        """
+        if not messages:
+            return 0
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            queued = execute_values(cursor, """
+                INSERT INTO notification_outbox (idempotency_key, channel, recipient, message)
+                VALUES %s
+                ON CONFLICT (idempotency_key) DO NOTHING
+                RETURNING idempotency_key
+            """, [
+                (m["idempotency_key"], m["channel"], m["recipient"], m["message"])
+                for m in messages
+            ], page_size=500, fetch=True)
+            inserted = {row["idempotency_key"] for row in queued}
+            DatabaseService.log_notifications(
+                [entry for entry in ledger or [] if entry[3] in inserted], cursor=cursor
+            )
+            conn.commit()
+            return len(queued)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def existing_keys(keys: List[str]) -> Set[str]:
+        """
+        Which of these idempotency keys are already in the outbox.
+
+        Args:
+            keys: Idempotency keys
+
+        Returns:
+            The subset of keys that enqueue_many would skip
+        """
+        if not keys:
+            return set()
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT idempotency_key
+                FROM notification_outbox
+                WHERE idempotency_key = ANY(%s)
+            """, (list(keys),))
+            return {row['idempotency_key'] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def claim_batch(limit: int) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` due messages for this worker.
+
+        SKIP LOCKED lets any number of workers claim concurrently without
+        blocking on, or double-sending, each other's rows. The claim is a
+        lease: the worker renews it (renew_leases) while the batch is in
+        flight, and if the worker dies, the message is due again once
+        OUTBOX_LEASE_SECONDS have passed.
+        """
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                UPDATE notification_outbox o
+                SET status = 'sending',
+                    attempts = o.attempts + 1,
+                    locked_at = now(),
+                    next_attempt_at = now() + make_interval(secs => %s)
+                WHERE o.id IN (
+                    SELECT id
+                    FROM notification_outbox
+                    WHERE status IN ('pending', 'sending')
+                      AND next_attempt_at <= now()
+                    ORDER BY next_attempt_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING o.id, o.channel, o.recipient, o.message, o.attempts
+            """, (Config.OUTBOX_LEASE_SECONDS, limit))
+            claimed = [dict(row) for row in cursor.fetchall()]
+            conn.commit()
+            return claimed
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def renew_leases(claims: List[Dict[str, Any]]) -> int:
+        """
+        Extend the lease on claimed messages still being sent.
+
+        Args:
+            claims: Dicts with the 'id' and 'attempts' claim_batch returned
+
+        Returns:
+            Number of leases renewed; a message another worker has since
+            reclaimed is not renewed
+        """
+        if not claims:
+            return 0
+
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            renewed = execute_values(cursor, f"""
+                UPDATE notification_outbox o
+                SET locked_at = now(),
+                    next_attempt_at = now() + make_interval(secs => {int(Config.OUTBOX_LEASE_SECONDS)})
+                FROM (VALUES %s) AS c (id, attempts)
+                WHERE o.id = c.id AND o.attempts = c.attempts AND o.status = 'sending'
+                RETURNING o.id
+            """, [
+                (c["id"], c["attempts"]) for c in claims
+            ], template="(%s::bigint, %s::int)", fetch=True)
+            conn.commit()
+            return len(renewed)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def record_results(sent: List[Dict[str, Any]], failures: List[Dict[str, Any]]) -> None:
+        """
+        Record the outcome of a claimed batch.
+
+        Only rows still held by this claim (same attempts, still 'sending')
+        are updated, so a worker whose lease lapsed can't overwrite the
+        state of a worker that reclaimed the message.
+
+        Args:
+            sent: Dicts with the 'id' and 'attempts' of delivered messages
+            failures: Dicts with 'id', 'attempts', 'error' and optionally
+                'retry_after'; retried with exponential backoff (or after
+                retry_after, if longer), or dead-lettered after
+                OUTBOX_MAX_ATTEMPTS attempts
+        """
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            if sent:
+                execute_values(cursor, """
+                    UPDATE notification_outbox o
+                    SET status = 'sent', sent_at = now(), locked_at = NULL, last_error = NULL
+                    FROM (VALUES %s) AS s (id, attempts)
+                    WHERE o.id = s.id AND o.attempts = s.attempts AND o.status = 'sending'
+                """, [
+                    (s["id"], s["attempts"]) for s in sent
+                ], template="(%s::bigint, %s::int)")
+
+            if failures:
+                execute_values(cursor, f"""
+                    UPDATE notification_outbox o
+                    SET status = CASE WHEN o.attempts >= {int(Config.OUTBOX_MAX_ATTEMPTS)}
+                                      THEN 'dead' ELSE 'pending' END,
+                        next_attempt_at = now() + make_interval(secs => f.delay),
+                        locked_at = NULL,
+                        last_error = f.error
+                    FROM (VALUES %s) AS f (id, attempts, delay, error)
+                    WHERE o.id = f.id AND o.attempts = f.attempts AND o.status = 'sending'
+                """, [
+                    (
+                        f["id"],
+                        f["attempts"],
+                        max(backoff_seconds(f["attempts"]), f.get("retry_after") or 0),
+                        (f.get("error") or "")[:1000],
+                    )
+                    for f in failures
+                ], template="(%s::bigint, %s::int, %s::double precision, %s::text)")
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_outbox_stats() -> Dict[str, int]:
+        """Count outbox messages by status."""
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT status, COUNT(*) as count
+                FROM notification_outbox
+                GROUP BY status
+            """)
+            stats = {"pending": 0, "sending": 0, "sent": 0, "dead": 0}
+            for row in cursor.fetchall():
+                stats[row['status']] = row['count']
+            return stats
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def _deliver(row: Dict[str, Any]) -> Dict[str, Any]:
+    # The dispatch engine already waited for the rate limiter
+    if row["channel"] == "group":
+        return NotificationService.send_group_message(row["recipient"], row["message"], rate_limited=False)
+    return NotificationService.send_whatsapp_message(row["recipient"], row["message"], rate_limited=False)
+
+
+class OutboxWorker:
+    """
+    Drains the notification outbox.
+
+    Claims batches with SKIP LOCKED, sends each batch through a
+    DispatchEngine and records sent, retried and dead-lettered messages.
+    Several workers (processes or app instances) can run side by side.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None):
+        self.batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+        # A send abandoned while its HTTP call could still deliver would be
+        # retried and sent twice; only give up after the call itself would have
+        timeout = max(Config.NOTIFY_MESSAGE_TIMEOUT, NotificationService.max_send_seconds() + 5)
+        self.engine = DispatchEngine(concurrency, timeout=timeout, rate_limiter=get_rate_limiter())
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Claim and deliver one batch.
+
+        Returns:
+            Dict with claimed, sent and failed counts
+        """
+        rows = await AsyncDatabaseService.run(OutboxService.claim_batch, self.batch_size)
+        if not rows:
+            return {"claimed": 0, "sent": 0, "failed": 0}
+
+        claims = [{"id": row["id"], "attempts": row["attempts"]} for row in rows]
+        jobs: List[DispatchJob] = [
+            (claim, functools.partial(_deliver, row))
+            for claim, row in zip(claims, rows)
+        ]
+        # A throttled batch can outlast the lease; keep it from being reclaimed
+        renewing = asyncio.create_task(self._renew_leases(claims))
+        try:
+            results = await self.engine.run(jobs)
+        finally:
+            renewing.cancel()
+
+        sent = [d for d in results["details"] if d["status"] == "sent"]
+        failures = [d for d in results["details"] if d["status"] != "sent"]
+        await AsyncDatabaseService.run(OutboxService.record_results, sent, failures)
+
+        return {"claimed": len(rows), "sent": len(sent), "failed": len(failures)}
+
+    async def _renew_leases(self, claims: List[Dict[str, Any]]):
+        """Renew the batch's leases every third of OUTBOX_LEASE_SECONDS until cancelled."""
+        while True:
+            await asyncio.sleep(Config.OUTBOX_LEASE_SECONDS / 3)
+            try:
+                await AsyncDatabaseService.run(OutboxService.renew_leases, claims)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error renewing outbox leases: {e}")
+
+    async def drain(self) -> Dict[str, int]:
+        """
+        Deliver batches until nothing is due.
+
+        Returns:
+            Dict with claimed, sent, failed, elapsed_seconds and the
+            limiter's current rate
+        """
+        started = time.monotonic()
+        totals = {"claimed": 0, "sent": 0, "failed": 0}
+        while True:
+            batch = await self.run_once()
+            for key in totals:
+                totals[key] += batch[key]
+            if batch["claimed"] < self.batch_size:
+                totals["elapsed_seconds"] = round(time.monotonic() - started, 2)
+                totals["rate"] = self.engine.rate_limiter.stats()
+                return totals
+
+    async def run_forever(self, poll_interval: Optional[float] = None):
+        """Keep draining, polling every poll_interval seconds when idle."""
+        poll_interval = poll_interval or Config.OUTBOX_POLL_INTERVAL
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error delivering outbox notifications: {e}")
+            await asyncio.sleep(poll_interval)
+
+
+async def outbox_worker_task():
+    """Reflex lifespan task delivering queued notifications in the app process."""
+    await OutboxWorker().run_forever()
@@ -0,0 +1,150 @@
+"""Shared PostgreSQL LISTEN connection for PTC Library Admin."""
+
+import os
+import select
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import extensions, sql
+from library_admin.config import Config
+
+
+class PgListener:
+    """
+    One dedicated connection per process that LISTENs for NOTIFY events.
+
+    - subscribe(channel, callback) runs callback(payload) on the listener
+      thread for every notification on that channel
+    - on_connect(callback) runs after every (re)connect; notifications sent
+      while the listener was down are lost, so subscribers should treat
+      this as "anything may have changed"
+    - Reconnects with exponential backoff; `connected` says whether
+      notifications are currently being received
+
+    The thread starts on the first subscribe(); callbacks must be quick
+    and thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {}
+        self._connect_callbacks: List[Callable[[], None]] = []
+        self._pending_channels = set()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        """Call callback(payload) for every notification on channel."""
+        with self._lock:
+            if channel not in self._subscribers:
+                self._subscribers[channel] = []
+                self._pending_channels.add(channel)
+            self._subscribers[channel].append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="library-admin-pg-listener", daemon=True
+                )
+                self._thread.start()
+
+    def on_connect(self, callback: Callable[[], None]):
+        """Call callback() every time the listener (re)connects."""
+        with self._lock:
+            self._connect_callbacks.append(callback)
+
+    def _listen(self, cursor, channels):
+        for channel in channels:
+            cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+
+    def _dispatch(self, channel: str, payload: str):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, []))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"Error handling {channel} notification: {e}")
+
+    def _run(self):
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(
+                    host=Config.DB_HOST,
+                    port=Config.DB_PORT,
+                    dbname=Config.DB_NAME,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                )
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+
+                with self._lock:
+                    channels = list(self._subscribers)
+                    self._pending_channels.clear()
+                    callbacks = list(self._connect_callbacks)
+                self._listen(cursor, channels)
+                self.connected = True
+                delay = 1.0
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Error in listener connect callback: {e}")
+
+                last_ping = time.monotonic()
+                while True:
+                    with self._lock:
+                        channels = list(self._pending_channels)
+                        self._pending_channels.clear()
+                    self._listen(cursor, channels)
+
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        # A dead connection never becomes readable; ping now and then
+                        if time.monotonic() - last_ping < Config.PG_LISTEN_PING_INTERVAL:
+                            continue
+                        # The ping reads any NOTIFY that arrived with it into
+                        # conn.notifies, so fall through and drain them
+                        cursor.execute("SELECT 1")
+                        last_ping = time.monotonic()
+
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(notify.channel, notify.payload)
+
+            except Exception as e:
+                print(f"Database listener disconnected: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+_listener: Optional[PgListener] = None
+_listener_pid: Optional[int] = None
+_listener_lock = threading.Lock()
+
+
+def get_listener() -> PgListener:
+    """
+    Get the process-wide listener, creating it on first use.
+
+    A forked worker process gets its own listener (and thread).
+    """
+    global _listener, _listener_pid
+
+    pid = os.getpid()
+    with _listener_lock:
+        if _listener is None or _listener_pid != pid:
+            _listener = PgListener()
+            _listener_pid = pid
+        return _listener
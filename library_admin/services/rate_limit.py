@@ -0,0 +1,149 @@
+"""Adaptive rate limiting for Evolution API sends."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from library_admin.config import Config
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no send slot frees up within the allowed wait."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket that adapts its rate to how the API responds.
+
+    - Allows `rate` sends per second on average, bursts of up to `burst`
+    - On a throttle response (429 / 503) the rate is halved, down to
+      min_rate, and sends pause for Retry-After seconds if given
+    - Every accepted send nudges the rate back up by `increase`, up to
+      max_rate (additive increase, multiplicative decrease), so the rate
+      settles just under what the API tolerates
+
+    Thread-safe; sync senders use acquire(), async ones acquire_async().
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float, max_rate: float,
+                 increase: float = 0.01):
+        self.max_rate = max(rate, max_rate)
+        self.min_rate = min(rate, max(min_rate, 0.001))
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.increase = increase
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._sent = deque()  # monotonic timestamps of recent sends
+        self._throttled = 0
+        self._last_backoff = 0.0
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._sent.append(now)
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Block until a send is allowed; RateLimitTimeout after `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No send slot within {timeout:g}s")
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a send is allowed."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Record an accepted send and probe a little faster."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        """Record a throttle response: back off, and pause if told how long."""
+        with self._lock:
+            now = time.monotonic()
+            self._throttled += 1
+            # Sends in flight together get throttled together; back off once per burst
+            if now - self._last_backoff >= 1.0:
+                self._last_backoff = now
+                self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current rate and recent throughput."""
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] > 60:
+                self._sent.popleft()
+            return {
+                "rate_per_second": round(self.rate, 3),
+                "burst": self.burst,
+                "sent_last_minute": len(self._sent),
+                "throttled": self._throttled,
+                "paused_for": round(max(0.0, self._paused_until - now), 1),
+            }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(instance: Optional[str] = None) -> AdaptiveRateLimiter:
+    """Get the process-wide limiter for an Evolution API instance."""
+    instance = instance or Config.EVOLUTION_INSTANCE
+    with _limiters_lock:
+        limiter = _limiters.get(instance)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(
+                rate=Config.EVOLUTION_RATE,
+                burst=Config.EVOLUTION_BURST,
+                min_rate=Config.EVOLUTION_RATE_MIN,
+                max_rate=Config.EVOLUTION_RATE_MAX,
+            )
+            _limiters[instance] = limiter
+        return limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,114 @@
+"""Process-wide read-through cache for small reference tables."""
+
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from library_admin.config import Config
+from library_admin.services.pg_listener import get_listener
+
+
+# Database triggers NOTIFY this channel with the changed table's name
+# (migrations/007_reference_change_notify.sql)
+REFERENCE_CHANNEL = "reference_changed"
+
+_entries: Dict[str, Dict[str, Any]] = {}  # key -> {"table", "value", "loaded_at"}
+_generations: Dict[str, int] = {}  # table -> bumped on every invalidation
+_callbacks: Dict[str, List[Callable[[], None]]] = {}
+_lock = threading.Lock()
+_listening_pid: Optional[int] = None
+
+
+def _on_notify(table: str):
+    ReferenceCache.invalidate(table)
+
+
+def _on_connect():
+    # Changes made while the listener was down were never announced
+    ReferenceCache.invalidate()
+
+
+class ReferenceCache:
+    """
+    Read-through cache for genres, settings and message templates.
+
+    These tables change a few times a month but are read on every page
+    load. Values are cached per process and dropped:
+    - at once by this process's own writes (invalidate())
+    - within milliseconds for writes from any other process, via the
+      reference_changed NOTIFY a trigger sends on each change
+    - after REFERENCE_CACHE_TTL seconds regardless, or after
+      REFERENCE_CACHE_FALLBACK_TTL while the listener is disconnected
+    """
+
+    @staticmethod
+    def _ensure_listening():
+        global _listening_pid
+
+        if not Config.REFERENCE_CACHE_LISTEN or _listening_pid == os.getpid():
+            return
+        with _lock:
+            if _listening_pid == os.getpid():
+                return
+            _listening_pid = os.getpid()
+        listener = get_listener()
+        listener.on_connect(_on_connect)
+        listener.subscribe(REFERENCE_CHANNEL, _on_notify)
+
+    @staticmethod
+    def ttl() -> float:
+        """How long a cached value may be served, given the listener's health."""
+        if Config.REFERENCE_CACHE_LISTEN and get_listener().connected:
+            return Config.REFERENCE_CACHE_TTL
+        return Config.REFERENCE_CACHE_FALLBACK_TTL
+
+    @staticmethod
+    def get(table: str, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Get a cached value, loading it on a miss.
+
+        Args:
+            table: Table the value is read from; invalidating it drops the value
+            key: Cache key
+            loader: Callable that queries the value
+
+        Returns:
+            A copy of the value, safe for the caller to modify
+        """
+        ReferenceCache._ensure_listening()
+
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and time.monotonic() - entry["loaded_at"] < ReferenceCache.ttl():
+                return copy.deepcopy(entry["value"])
+            generation = _generations.setdefault(table, 0)
+
+        value = loader()
+
+        with _lock:
+            # Don't store a result that raced with a write
+            if _generations.get(table, 0) == generation:
+                _entries[key] = {"table": table, "value": value, "loaded_at": time.monotonic()}
+        return copy.deepcopy(value)
+
+    @staticmethod
+    def invalidate(table: Optional[str] = None):
+        """Drop cached values read from table (or from every table)."""
+        with _lock:
+            tables = [table] if table else list(set(_generations) | set(_callbacks))
+            for name in tables:
+                _generations[name] = _generations.get(name, 0) + 1
+            for key in [k for k, e in _entries.items() if e["table"] in tables]:
+                del _entries[key]
+            callbacks = [cb for name in tables for cb in _callbacks.get(name, [])]
+
+        for callback in callbacks:
+            callback()
+
+    @staticmethod
+    def on_invalidate(table: str, callback: Callable[[], None]):
+        """Call callback() whenever table's cached values are invalidated."""
+        with _lock:
+            _callbacks.setdefault(table, []).append(callback)
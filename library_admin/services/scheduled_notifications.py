@@ -1,165 +1,286 @@
 """Scheduled notification service for PTC Library Admin."""
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from library_admin.config import Config
 from library_admin.services.database import DatabaseService
 from library_admin.services.notifications import NotificationService
+from library_admin.services.outbox import OutboxService, OutboxWorker
+from library_admin.services.rate_limit import get_rate_limiter
+from library_admin.services.templates import TemplateRegistry
 
 
 class ScheduledNotificationService:
     """Service for scheduled automated notifications."""
 
     @staticmethod
-    def send_due_reminders(days_before: int = 2) -> Dict[str, Any]:
+    def _group_loans(loans: List[Dict], digest: bool) -> List[List[Dict]]:
+        """Split loans into messages: one per user in digest mode, else one per loan."""
+        if not digest:
+            return [[loan] for loan in loans]
+        by_user: Dict[str, List[Dict]] = {}
+        for loan in loans:
+            by_user.setdefault(loan.get('user_id'), []).append(loan)
+        return list(by_user.values())
+
+    @staticmethod
+    def _build_messages(groups: List[List[Dict]], build) -> Tuple[List[Dict], Dict[str, Any]]:
         """
-        Send reminders for books due soon.
+        Render one outbox message per group of loans.
 
         Args:
-            days_before: Send reminder X days before due date
+            groups: Loans grouped by message (all loans of a group share a user)
+            build: loans -> (idempotency_key, message)
 
         Returns:
-            Dict with results: total, success, failed counts and details
+            (messages, results) where results has total (loans), messages,
+            failed (invalid loans) and details
         """
         results = {
-            "total": 0,
-            "success": 0,
+            "total": sum(len(group) for group in groups),
+            "messages": 0,
             "failed": 0,
             "details": []
         }
 
-        try:
-            # Get all active loans
-            loans = DatabaseService.get_active_loans()
-
-            # Filter loans that are due soon (but not overdue)
-            target_date = datetime.now().date()
-            due_soon_loans = [
-                loan for loan in loans
-                if loan.get('status') == 'due_soon'
-                and loan.get('days_remaining') == days_before
-            ]
-
-            results["total"] = len(due_soon_loans)
-
-            # Send reminder for each loan
-            for loan in due_soon_loans:
-                user_id = loan.get('user_id')
-                book_title = loan.get('title')
-                due_date = loan.get('due_date')
-
-                if not user_id or not book_title:
+        messages = []
+        for group in groups:
+            valid = []
+            for loan in group:
+                if not loan.get('user_id') or not loan.get('title'):
                     results["failed"] += 1
                     results["details"].append({
                         "loan_id": loan.get('loan_id'),
                         "status": "failed",
                         "error": "Missing user_id or book_title"
                     })
-                    continue
-
-                # Send reminder
-                result = NotificationService.send_due_reminder(
-                    user_id,
-                    book_title,
-                    due_date
-                )
-
-                if result.get("success"):
-                    results["success"] += 1
-                    results["details"].append({
-                        "loan_id": loan.get('loan_id'),
-                        "user_id": user_id,
-                        "book_title": book_title,
-                        "status": "sent"
-                    })
                 else:
-                    results["failed"] += 1
-                    results["details"].append({
-                        "loan_id": loan.get('loan_id'),
-                        "user_id": user_id,
-                        "status": "failed",
-                        "error": result.get("error")
-                    })
+                    valid.append(loan)
+            if not valid:
+                continue
+
+            user_id = valid[0]['user_id']
+            key, message = build(valid)
+            messages.append(OutboxService.message(key, user_id, message))
+            results["details"].append({
+                "user_id": user_id,
+                "idempotency_key": key,
+                "loan_ids": [loan.get('loan_id') for loan in valid],
+                "book_titles": [loan['title'] for loan in valid],
+                "chars": len(message),
+                "status": "queued"
+            })
+
+        results["messages"] = len(messages)
+        return messages, results
 
-        except Exception as e:
-            results["error"] = str(e)
+    @staticmethod
+    def _due_reminder_batch(days_before: int, digest: bool,
+                            shard: Optional[Tuple[int, int]] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """Query due-soon loans and render their reminders, timing both phases."""
+        started = time.perf_counter()
+
+        # Get loans due exactly days_before days from now (but not overdue)
+        due_soon_loans = DatabaseService.get_active_loans(
+            status='due_soon', shard=shard, not_notified='due_reminder',
+            due_in=(days_before, days_before)
+        )
+        queried = time.perf_counter()
+
+        groups = ScheduledNotificationService._group_loans(due_soon_loans, digest)
+
+        # One reminder per loan (or user) per day, however often this runs
+        today = date.today().isoformat()
+        if digest:
+            template = TemplateRegistry.get('due_soon_digest')
+            build = lambda user_loans: (
+                f"due_soon_digest:{user_loans[0]['user_id']}:{today}",
+                NotificationService.format_loan_digest('due_soon', user_loans, template),
+            )
+        else:
+            build = lambda user_loans: (
+                f"due_reminder:{user_loans[0]['loan_id']}:{today}",
+                NotificationService.format_due_reminder(user_loans[0]['title'], user_loans[0].get('due_date')),
+            )
+        messages, results = ScheduledNotificationService._build_messages(groups, build)
+
+        results["timings"] = {
+            "query_ms": round((queried - started) * 1000, 1),
+            "render_ms": round((time.perf_counter() - queried) * 1000, 1),
+        }
+        return messages, results
+
+    @staticmethod
+    def _overdue_alert_batch(days_overdue: int, digest: bool,
+                             shard: Optional[Tuple[int, int]] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """Query overdue loans and render their alerts, timing both phases."""
+        started = time.perf_counter()
+
+        # Get loans overdue by at least days_overdue days
+        overdue_loans = DatabaseService.get_active_loans(
+            status='overdue', shard=shard, not_notified='overdue_alert',
+            due_in=(None, -days_overdue)
+        )
+        queried = time.perf_counter()
+
+        groups = ScheduledNotificationService._group_loans(overdue_loans, digest)
+
+        today = date.today().isoformat()
+        if digest:
+            template = TemplateRegistry.get('overdue_digest')
+            build = lambda user_loans: (
+                f"overdue_digest:{user_loans[0]['user_id']}:{today}",
+                NotificationService.format_loan_digest('overdue', user_loans, template),
+            )
+        else:
+            build = lambda user_loans: (
+                f"overdue_alert:{user_loans[0]['loan_id']}:{today}",
+                NotificationService.format_overdue_alert(
+                    user_loans[0]['title'], abs(user_loans[0].get('days_remaining', 0))
+                ),
+            )
+        messages, results = ScheduledNotificationService._build_messages(groups, build)
+
+        results["timings"] = {
+            "query_ms": round((queried - started) * 1000, 1),
+            "render_ms": round((time.perf_counter() - queried) * 1000, 1),
+        }
+        return messages, results
 
+    @staticmethod
+    def _enqueue(messages: List[Dict], results: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        """
+        Queue a rendered batch and log its loans as notified with `kind`,
+        adding queued/duplicates counts and enqueue timing.
+        """
+        ledger = [
+            (loan_id, kind, detail["user_id"], detail["idempotency_key"])
+            for detail in results["details"] if detail["status"] == "queued"
+            for loan_id in detail["loan_ids"]
+        ]
+        started = time.perf_counter()
+        results["queued"] = OutboxService.enqueue_many(messages, ledger)
+        results["duplicates"] = len(messages) - results["queued"]
+        results["timings"]["enqueue_ms"] = round((time.perf_counter() - started) * 1000, 1)
         return results
 
     @staticmethod
-    def send_overdue_alerts(days_overdue: int = 1) -> Dict[str, Any]:
+    def send_due_reminders(days_before: int = 2, digest: Optional[bool] = None,
+                           shard: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
         """
-        Send alerts for overdue books.
+        Queue reminders for books due soon.
 
         Args:
-            days_overdue: Send alert X days after due date
+            days_before: Send reminder X days before due date
+            digest: One message per user listing all their books
+                (defaults to NOTIFY_DIGEST); otherwise one per loan
+            shard: (index, count) to only handle that shard of users
 
         Returns:
-            Dict with results: total, success, failed counts and details
+            Dict with results: total, queued, duplicates, failed counts, details and timings
         """
-        results = {
-            "total": 0,
-            "success": 0,
-            "failed": 0,
-            "details": []
-        }
-
+        digest = Config.NOTIFY_DIGEST if digest is None else digest
         try:
-            # Get all active loans
-            loans = DatabaseService.get_active_loans()
+            messages, results = ScheduledNotificationService._due_reminder_batch(days_before, digest, shard)
+            return ScheduledNotificationService._enqueue(messages, results, 'due_reminder')
+        except Exception as e:
+            return {"total": 0, "queued": 0, "duplicates": 0, "failed": 0, "details": [], "error": str(e)}
 
-            # Filter overdue loans
-            overdue_loans = [
-                loan for loan in loans
-                if loan.get('status') == 'overdue'
-                and abs(loan.get('days_remaining', 0)) >= days_overdue
-            ]
+    @staticmethod
+    def send_overdue_alerts(days_overdue: int = 1, digest: Optional[bool] = None,
+                            shard: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Queue alerts for overdue books.
 
-            results["total"] = len(overdue_loans)
+        Args:
+            days_overdue: Send alert X days after due date
+            digest: One message per user listing all their books
+                (defaults to NOTIFY_DIGEST); otherwise one per loan
+            shard: (index, count) to only handle that shard of users
 
-            # Send alert for each overdue loan
-            for loan in overdue_loans:
-                user_id = loan.get('user_id')
-                book_title = loan.get('title')
-                days_late = abs(loan.get('days_remaining', 0))
+        Returns:
+            Dict with results: total, queued, duplicates, failed counts, details and timings
+        """
+        digest = Config.NOTIFY_DIGEST if digest is None else digest
+        try:
+            messages, results = ScheduledNotificationService._overdue_alert_batch(days_overdue, digest, shard)
+            return ScheduledNotificationService._enqueue(messages, results, 'overdue_alert')
+        except Exception as e:
+            return {"total": 0, "queued": 0, "duplicates": 0, "failed": 0, "details": [], "error": str(e)}
 
-                if not user_id or not book_title:
-                    results["failed"] += 1
-                    results["details"].append({
-                        "loan_id": loan.get('loan_id'),
-                        "status": "failed",
-                        "error": "Missing user_id or book_title"
-                    })
-                    continue
+    @staticmethod
+    def plan_daily_notifications(digest: Optional[bool] = None,
+                                 shard: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Work out what run_daily_notifications would send, without sending.
 
-                # Send overdue alert
-                result = NotificationService.send_overdue_alert(
-                    user_id,
-                    book_title,
-                    days_late
-                )
+        Runs the same queries and renders the same messages, checks which
+        are already in the outbox, and estimates how long delivery takes at
+        the current rate limit.
 
-                if result.get("success"):
-                    results["success"] += 1
-                    results["details"].append({
-                        "loan_id": loan.get('loan_id'),
-                        "user_id": user_id,
-                        "book_title": book_title,
-                        "days_overdue": days_late,
-                        "status": "sent"
-                    })
-                else:
-                    results["failed"] += 1
-                    results["details"].append({
-                        "loan_id": loan.get('loan_id'),
-                        "user_id": user_id,
-                        "status": "failed",
-                        "error": result.get("error")
-                    })
+        Args:
+            digest: Digest mode (defaults to NOTIFY_DIGEST)
+            shard: (index, count) to only plan that shard of users
 
-        except Exception as e:
-            results["error"] = str(e)
+        Returns:
+            Dict with 'phases' (due_reminders and overdue_alerts: counts,
+            details and query/render timings) and 'summary' (totals and
+            estimated send time)
+        """
+        digest = Config.NOTIFY_DIGEST if digest is None else digest
+        plan = {
+            "timestamp": datetime.now().isoformat(),
+            "digest": digest,
+            "phases": {},
+        }
 
-        return results
+        batches = {
+            "due_reminders": lambda: ScheduledNotificationService._due_reminder_batch(2, digest, shard),
+            "overdue_alerts": lambda: ScheduledNotificationService._overdue_alert_batch(1, digest, shard),
+        }
+        new_messages = 0
+        for phase, run_batch in batches.items():
+            messages, results = run_batch()
+
+            started = time.perf_counter()
+            queued = OutboxService.existing_keys([m["idempotency_key"] for m in messages])
+            results["timings"]["outbox_check_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            for detail in results["details"]:
+                if detail.get("idempotency_key") in queued:
+                    detail["status"] = "already_queued"
+                elif detail["status"] == "queued":
+                    detail["status"] = "planned"
+            results["already_queued"] = len(queued)
+            results["recipients"] = len({m["recipient"] for m in messages})
+            results["chars"] = sum(len(m["message"]) for m in messages)
+
+            new_messages += len(messages) - len(queued)
+            plan["phases"][phase] = results
+
+        limiter = get_rate_limiter()
+        rate = limiter.stats()["rate_per_second"]
+        # The first `burst` messages go out at once, the rest at the steady rate
+        estimated = max(0, new_messages - limiter.burst) / rate if rate else None
+
+        plan["summary"] = {
+            "loans": sum(p["total"] for p in plan["phases"].values()),
+            "messages": sum(p["messages"] for p in plan["phases"].values()),
+            "new_messages": new_messages,
+            "already_queued": sum(p["already_queued"] for p in plan["phases"].values()),
+            "invalid": sum(p["failed"] for p in plan["phases"].values()),
+            "rate_per_second": rate,
+            "estimated_send_seconds": round(estimated, 1) if estimated is not None else None,
+            "timings": {
+                "query_ms": round(sum(p["timings"]["query_ms"] for p in plan["phases"].values()), 1),
+                "render_ms": round(sum(p["timings"]["render_ms"] for p in plan["phases"].values()), 1),
+            },
+        }
+        return plan
 
     @staticmethod
     def get_notification_summary() -> Dict[str, Any]:
@@ -184,35 +305,207 @@ class ScheduledNotificationService:
             }
 
     @staticmethod
-    def run_daily_notifications() -> Dict[str, Any]:
+    def _get_checkpoint(run_date: date, phase: str, shard: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """Checkpoint of a finished phase of a day's run, or None."""
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT loans, queued, duplicates, invalid, completed_at
+                FROM notification_checkpoints
+                WHERE run_date = %s AND phase = %s AND shard_index = %s AND shard_count = %s
+            """, (run_date, phase, shard[0], shard[1]))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def _save_checkpoint(run_date: date, phase: str, shard: Tuple[int, int], results: Dict[str, Any]):
+        """Record that a phase of a day's run has been queued."""
+        conn = DatabaseService.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                INSERT INTO notification_checkpoints
+                    (run_date, phase, shard_index, shard_count, loans, queued, duplicates, invalid)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (run_date, phase, shard_index, shard_count) DO NOTHING
+            """, (
+                run_date, phase, shard[0], shard[1],
+                results.get("total", 0), results.get("queued", 0),
+                results.get("duplicates", 0), results.get("failed", 0),
+            ))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def queue_daily_notifications(shard: Optional[Tuple[int, int]] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Queue the day's due reminders and overdue alerts, checkpointing each phase.
+
+        Args:
+            shard: (index, count) to only handle that shard of users;
+                defaults to all users (0, 1)
+            resume: Skip phases already checkpointed today for this shard
+
+        Returns:
+            Dict with timestamp, shard, due_reminders and overdue_alerts;
+            a skipped phase has 'skipped': True and the checkpointed counts
+        """
+        shard = shard or (0, 1)
+        today = date.today()
+        results = {
+            "timestamp": datetime.now().isoformat(),
+            "shard": f"{shard[0]}/{shard[1]}",
+            "due_reminders": {},
+            "overdue_alerts": {},
+        }
+
+        phases = {
+            # Due reminders (2 days before)
+            "due_reminders": lambda: ScheduledNotificationService.send_due_reminders(days_before=2, shard=shard),
+            # Overdue alerts (1+ days overdue)
+            "overdue_alerts": lambda: ScheduledNotificationService.send_overdue_alerts(days_overdue=1, shard=shard),
+        }
+        for phase, queue in phases.items():
+            checkpoint = ScheduledNotificationService._get_checkpoint(today, phase, shard) if resume else None
+            if checkpoint:
+                results[phase] = {
+                    "skipped": True,
+                    "total": checkpoint["loans"],
+                    "queued": 0,
+                    "duplicates": checkpoint["queued"] + checkpoint["duplicates"],
+                    "failed": checkpoint["invalid"],
+                    "details": [],
+                    "completed_at": checkpoint["completed_at"].isoformat(),
+                }
+                continue
+
+            results[phase] = queue()
+            if "error" not in results[phase]:
+                ScheduledNotificationService._save_checkpoint(today, phase, shard, results[phase])
+
+        return results
+
+    @staticmethod
+    def run_daily_notifications(deliver: bool = True, concurrency: Optional[int] = None,
+                                shard: Optional[Tuple[int, int]] = None, resume: bool = True) -> Dict[str, Any]:
         """
         Run all daily notifications (due reminders and overdue alerts).
 
         This method should be called once per day by a cron job or scheduler.
+        Messages are queued in the notification outbox; failed deliveries
+        stay there and are retried by the outbox worker. Each queued phase
+        is checkpointed, so a rerun after a crash picks up where it stopped.
+
+        Args:
+            deliver: Drain the outbox right away instead of leaving delivery
+                to a running outbox worker
+            concurrency: Messages in flight at once (defaults to NOTIFY_CONCURRENCY)
+            shard: (index, count) to only queue that shard of users
+            resume: Skip phases already checkpointed today
 
         Returns:
             Combined results from all notification types
         """
+        results = ScheduledNotificationService.queue_daily_notifications(shard, resume)
+        return ScheduledNotificationService._finish_run(results, deliver, concurrency)
+
+    @staticmethod
+    def run_daily_notifications_parallel(workers: int, deliver: bool = True,
+                                         concurrency: Optional[int] = None,
+                                         resume: bool = True) -> Dict[str, Any]:
+        """
+        Run daily notifications with the queueing split over worker processes.
+
+        Only queueing is parallel: each of `workers` processes queues one
+        shard of users, then this process delivers the outbox on its own,
+        so sends still share one rate limiter. A shard that fails is
+        reported under its phases' 'error' without stopping the others,
+        and the phases it did finish stay checkpointed for a rerun.
+
+        Args:
+            workers: Number of worker processes (and shards)
+            deliver: Drain the outbox once all shards are queued
+            concurrency: Messages in flight at once (defaults to NOTIFY_CONCURRENCY)
+            resume: Skip shard phases already checkpointed today
+
+        Returns:
+            Combined results, in the run_daily_notifications shape, plus
+            each shard's results under 'shards'
+        """
+        # spawn: forked children would inherit the parent's pooled connections
+        context = multiprocessing.get_context("spawn")
+        shards = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_queue_shard, (index, workers), resume=resume): index
+                for index in range(workers)
+            }
+            for future in as_completed(futures):
+                try:
+                    shards.append(future.result())
+                except Exception as e:
+                    error = {"error": f"shard failed: {e}"}
+                    shards.append({
+                        "timestamp": datetime.now().isoformat(),
+                        "shard": f"{futures[future]}/{workers}",
+                        "due_reminders": dict(error),
+                        "overdue_alerts": dict(error),
+                    })
+        shards.sort(key=lambda shard: int(shard["shard"].split("/")[0]))
+
         results = {
             "timestamp": datetime.now().isoformat(),
-            "due_reminders": {},
-            "overdue_alerts": {}
+            "shards": shards,
         }
+        for phase in ("due_reminders", "overdue_alerts"):
+            merged = {"total": 0, "queued": 0, "duplicates": 0, "failed": 0, "details": []}
+            for shard in shards:
+                for key in ("total", "queued", "duplicates", "failed"):
+                    merged[key] += shard[phase].get(key, 0)
+                merged["details"].extend(shard[phase].get("details", []))
+                if "error" in shard[phase]:
+                    merged.setdefault("errors", []).append(f"shard {shard['shard']}: {shard[phase]['error']}")
+            results[phase] = merged
+
+        return ScheduledNotificationService._finish_run(results, deliver, concurrency)
 
-        # Send due reminders (2 days before)
-        results["due_reminders"] = ScheduledNotificationService.send_due_reminders(days_before=2)
+    @staticmethod
+    def _finish_run(results: Dict[str, Any], deliver: bool, concurrency: Optional[int]) -> Dict[str, Any]:
+        """Deliver the outbox (if asked) and add the run totals."""
+        results["delivery"] = {}
+        results["total_queued"] = (
+            results["due_reminders"].get("queued", 0) +
+            results["overdue_alerts"].get("queued", 0)
+        )
 
-        # Send overdue alerts (1+ days overdue)
-        results["overdue_alerts"] = ScheduledNotificationService.send_overdue_alerts(days_overdue=1)
+        if deliver:
+            try:
+                results["delivery"] = asyncio.run(OutboxWorker(concurrency=concurrency).drain())
+            except Exception as e:
+                results["delivery"] = {"error": str(e)}
 
         # Calculate totals
-        results["total_sent"] = (
-            results["due_reminders"].get("success", 0) +
-            results["overdue_alerts"].get("success", 0)
-        )
+        results["total_sent"] = results["delivery"].get("sent", 0)
         results["total_failed"] = (
             results["due_reminders"].get("failed", 0) +
-            results["overdue_alerts"].get("failed", 0)
+            results["overdue_alerts"].get("failed", 0) +
+            results["delivery"].get("failed", 0)
         )
 
         return results
+
+
+def _queue_shard(shard: Tuple[int, int], resume: bool = True) -> Dict[str, Any]:
+    # Worker process entry point for run_daily_notifications_parallel
+    return ScheduledNotificationService.queue_daily_notifications(shard, resume)
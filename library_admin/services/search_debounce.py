@@ -0,0 +1,100 @@
+"""Debouncing and coalescing for search-as-you-type event handlers."""
+
+import asyncio
+import contextlib
+import itertools
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+
+class SearchSuperseded(Exception):
+    """Raised when a newer search for the same key replaced this one."""
+
+
+class SearchDebouncer:
+    """
+    Coalesces bursts of search events per key (typically session + page).
+
+    Usage from a background event handler:
+
+        async with debouncer.settled(key) as ticket:   # wait for typing to stop
+            ...read the current search text...
+            result = await debouncer.run(key, ticket, lambda: query(text))
+
+    settle() raises SearchSuperseded if another event for the key arrived
+    during the quiet period; settled() does the same and releases the
+    search however the handler exits, so has_pending() can't be left
+    stuck by a handler failing between settle() and run().
+
+    run() cancels the key's previous in-flight query (including its SQL
+    statement) and raises SearchSuperseded if a newer search started
+    while this one was running, so an older result can never overwrite a
+    newer one.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._tickets = itertools.count(1)
+        self._latest: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def is_current(self, key: str, ticket: int) -> bool:
+        """Whether ticket is still the newest search for key."""
+        return self._latest.get(key) == ticket
+
+    def has_pending(self, key: str) -> bool:
+        """Whether a search for key has been registered and not yet finished."""
+        return key in self._latest
+
+    async def settle(self, key: str, delay: Optional[float] = None) -> int:
+        """Register a search event and wait until no newer one arrives."""
+        ticket = next(self._tickets)
+        self._latest[key] = ticket
+        try:
+            await asyncio.sleep(self.delay if delay is None else delay)
+        except BaseException:
+            self.release(key, ticket)
+            raise
+        if not self.is_current(key, ticket):
+            raise SearchSuperseded()
+        return ticket
+
+    @contextlib.asynccontextmanager
+    async def settled(self, key: str, delay: Optional[float] = None) -> AsyncIterator[int]:
+        """settle(), releasing the search when the block exits, however it exits."""
+        ticket = await self.settle(key, delay)
+        try:
+            yield ticket
+        finally:
+            self.release(key, ticket)
+
+    def release(self, key: str, ticket: int):
+        """Forget ticket's search for key, unless a newer one replaced it."""
+        if self.is_current(key, ticket):
+            del self._latest[key]
+
+    async def run(self, key: str, ticket: int, query: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the query for ticket, cancelling the key's older in-flight query."""
+        if not self.is_current(key, ticket):
+            raise SearchSuperseded()
+
+        previous = self._inflight.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+        task = asyncio.ensure_future(query())
+        self._inflight[key] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if not self.is_current(key, ticket):
+                raise SearchSuperseded()
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+            superseded = not self.is_current(key, ticket)
+            self.release(key, ticket)
+
+        if superseded:
+            raise SearchSuperseded()
+        return result
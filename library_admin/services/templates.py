@@ -0,0 +1,148 @@
+"""Compiled, cached message templates for PTC Library Admin."""
+
+import string
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from library_admin.services.database import DatabaseService
+from library_admin.services.reference_cache import ReferenceCache
+
+
+# Placeholders each built-in template may use
+TEMPLATE_FIELDS = {
+    'due_reminder': {'book_title', 'due_date'},
+    'overdue_alert': {'book_title', 'days_overdue'},
+    'new_book_announcement': {'book_title', 'author', 'genre'},
+    'due_soon_digest': {'name', 'book_count', 'book_list'},
+    'overdue_digest': {'name', 'book_count', 'book_list'},
+}
+
+_formatter = string.Formatter()
+
+
+class TemplateError(ValueError):
+    """Raised when template text does not parse or uses unknown placeholders."""
+
+
+class CompiledTemplate:
+    """
+    Message template parsed once into literal text and placeholders.
+
+    render() only substitutes values, so many messages can be produced
+    from the same template without re-parsing it.
+    """
+
+    def __init__(self, name: str, content: str, template_type: str = ""):
+        self.name = name
+        self.content = content
+        self.template_type = template_type
+        self._parts: List[Tuple[str, Optional[str], str, Optional[str]]] = []
+
+        try:
+            parsed = list(_formatter.parse(content))
+        except ValueError as e:
+            raise TemplateError(f"Template '{name}' is not valid: {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if field is not None and not field.isidentifier():
+                raise TemplateError(
+                    f"Template '{name}' has an invalid placeholder {{{field}}}; "
+                    f"use plain names like {{book_title}}"
+                )
+            if spec and "{" in spec:
+                raise TemplateError(f"Template '{name}' has a nested placeholder in {{{field}:{spec}}}")
+            self._parts.append((literal, field, spec or "", conversion))
+
+        self.fields = {field for _, field, _, _ in self._parts if field is not None}
+
+        allowed = TEMPLATE_FIELDS.get(name)
+        if allowed is not None and not self.fields <= allowed:
+            unknown = ", ".join(f"{{{field}}}" for field in sorted(self.fields - allowed))
+            known = ", ".join(f"{{{field}}}" for field in sorted(allowed))
+            raise TemplateError(f"Template '{name}' uses unknown placeholder(s) {unknown}; available: {known}")
+
+    def render(self, **values: Any) -> str:
+        """Fill in the placeholders; KeyError if a value is missing."""
+        out = []
+        for literal, field, spec, conversion in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            out.append(format(value, spec))
+        return "".join(out)
+
+
+# Process-wide cache of compiled active templates, keyed by name
+_templates: Dict[str, CompiledTemplate] = {}
+_templates_loaded_at: Optional[float] = None
+_templates_lock = threading.Lock()
+
+
+def _load_templates() -> Dict[str, CompiledTemplate]:
+    templates = {}
+    for row in DatabaseService.get_all_templates():
+        if not row['is_active']:
+            continue
+        try:
+            templates[row['template_name']] = CompiledTemplate(
+                row['template_name'], row['message_content'], row['template_type']
+            )
+        except TemplateError as e:
+            # Saved before validation existed; skip rather than fail every send
+            print(f"Skipping invalid message template: {e}")
+    return templates
+
+
+class TemplateRegistry:
+    """
+    In-process cache of the active message templates, compiled.
+
+    Loads every active template on first use, and again whenever the
+    reference cache drops message_templates: on a write in this process,
+    on a change NOTIFY from any other, or when the cache TTL runs out.
+    """
+
+    @staticmethod
+    def get(name: str) -> Optional[CompiledTemplate]:
+        """Get an active template by name, or None."""
+        global _templates, _templates_loaded_at
+
+        with _templates_lock:
+            expired = (
+                _templates_loaded_at is None
+                or time.monotonic() - _templates_loaded_at > ReferenceCache.ttl()
+            )
+            if expired:
+                _templates = _load_templates()
+                _templates_loaded_at = time.monotonic()
+            return _templates.get(name)
+
+    @staticmethod
+    def render(name: str, **values: Any) -> Optional[str]:
+        """Render an active template by name; None if there is no such template."""
+        template = TemplateRegistry.get(name)
+        return template.render(**values) if template else None
+
+    @staticmethod
+    def invalidate():
+        """Drop the cache; the next lookup reloads from the database."""
+        global _templates_loaded_at
+
+        with _templates_lock:
+            _templates_loaded_at = None
+
+    @staticmethod
+    def validate(name: str, content: str) -> Optional[str]:
+        """Error message for template text that would not render, else None."""
+        try:
+            CompiledTemplate(name, content)
+        except TemplateError as e:
+            return str(e)
+        return None
+
+
+ReferenceCache.on_invalidate('message_templates', TemplateRegistry.invalidate)
@@ -1,8 +1,54 @@
 """State management for PTC Library Admin Dashboard."""
 
+import asyncio
+import os
+import shutil
+import tempfile
 import reflex as rx
-from typing import List, Dict, Optional
+from datetime import date
+from typing import List, Dict, Optional, Tuple
+from library_admin.config import Config
+from library_admin.models import BookRow, LoanRow, UserRow
+from library_admin.services.async_database import AsyncDatabaseService
 from library_admin.services.database import DatabaseService
+from library_admin.services.book_import import BookImportError, BookImportService, ImportProgress
+from library_admin.services.change_feed import ChangeFeed
+from library_admin.services.export import EXPORT_DATASETS, EXPORT_FORMATS, ExportService
+from library_admin.services.notifications import NotificationService
+from library_admin.services.outbox import OutboxService
+from library_admin.services.templates import TemplateRegistry
+from library_admin.services.search_debounce import SearchDebouncer, SearchSuperseded
+
+
+# Shared by every session; keys are "<client token>:<page>"
+_search_debouncer = SearchDebouncer(Config.SEARCH_DEBOUNCE_MS / 1000)
+
+
+async def _fetch_books(search: str, filter_status: str, filter_genre: str,
+                       page_size: int, cursor: str = "") -> Dict:
+    """Fetch one page of books: relevance-ranked when searching, keyset-paged otherwise."""
+    search = search.strip()
+    fetch_page = (
+        AsyncDatabaseService.search_books_page if search
+        else AsyncDatabaseService.get_books_page
+    )
+    page = await fetch_page(
+        search,
+        filter_status=filter_status,
+        filter_genre=filter_genre,
+        page_size=page_size,
+        cursor=cursor
+    )
+
+    # The page we were on may have emptied out; fall back to the first page
+    if not page['books'] and cursor:
+        page = await fetch_page(
+            search,
+            filter_status=filter_status,
+            filter_genre=filter_genre,
+            page_size=page_size
+        )
+    return page
 
 
 class State(rx.State):
@@ -20,12 +66,14 @@ class State(rx.State):
     dashboard_stats: Dict = {}
 
     # Books
-    books: List[Dict] = []
+    books: List[BookRow] = []
     selected_book: Optional[Dict] = None
     book_search: str = ""
     book_filter_status: str = "all"
     book_filter_genre: str = "all"
     genres: List[str] = []
+    books_page_size: int = 50
+    books_next_cursor: str = ""  # Page token of the next page to append, "" at the end
 
     @rx.var
     def genres_with_all(self) -> List[str]:
@@ -42,14 +90,33 @@ class State(rx.State):
     book_form_error: str = ""
     book_form_send_notification: bool = False  # Send notification when adding book
 
+    # Bulk book import
+    import_dialog_open: bool = False
+    import_in_progress: bool = False
+    import_phase: str = ""  # "queued", "loading", "validating", "merging", "done", "failed"
+    import_rows_read: int = 0
+    import_total: int = 0
+    import_imported: int = 0
+    import_skipped: int = 0
+    import_errors: List[Dict] = []
+    import_error: str = ""
+    _import_path: str = ""  # Uploaded file waiting to be imported (server-side only)
+    _import_format: str = ""
+
     # Loans
-    active_loans: List[Dict] = []
+    active_loans: List[LoanRow] = []
     loan_search: str = ""
     loan_filter_status: str = "all"
+    loans_page_size: int = 50
+    loans_has_more: bool = False
+    _loans_after: Optional[Tuple[str, int]] = None  # (due_date, loan_id) of the last loan loaded
 
     # Users
-    users: List[Dict] = []
+    users: List[UserRow] = []
     user_search: str = ""
+    users_page_size: int = 50
+    users_has_more: bool = False
+    _users_after: Optional[Tuple[str, str]] = None  # (created_at, user_id) of the last user loaded
     user_form_mode: str = ""
     user_form_id: str = ""
     user_form_name: str = ""
@@ -76,7 +143,7 @@ class State(rx.State):
     @rx.var
     def user_select_options(self) -> list[str]:
         """Get formatted user options for select dropdown."""
-        return [f"{u.get('name', 'Unknown')} ({u.get('user_id', '')})" for u in self.users]
+        return [f"{u.name or 'Unknown'} ({u.user_id})" for u in self.users]
 
     # Settings
     setting_whatsapp_group_id: str = ""
@@ -112,14 +179,14 @@ class State(rx.State):
         """Set password input."""
         self.password_input = value
 
-    def check_password(self):
+    async def check_password(self):
         """Check admin password."""
         from library_admin.config import Config
 
         if self.password_input == Config.ADMIN_PASSWORD:
             self.is_authenticated = True
             self.auth_error = ""
-            self.load_dashboard_data()
+            await self.load_dashboard_data()
         else:
             self.auth_error = "Invalid password"
             self.password_input = ""
@@ -132,13 +199,13 @@ class State(rx.State):
 
     # ===== DASHBOARD =====
 
-    def load_dashboard_data(self):
+    async def load_dashboard_data(self):
         """Load dashboard statistics."""
         self.is_loading = True
         self.loading_message = "Loading dashboard..."
 
         try:
-            self.dashboard_stats = DatabaseService.get_dashboard_stats()
+            self.dashboard_stats = await AsyncDatabaseService.get_dashboard_stats()
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading dashboard: {str(e)}"
@@ -148,17 +215,20 @@ class State(rx.State):
 
     # ===== BOOKS =====
 
-    def load_books(self):
-        """Load all books with current filters."""
+    async def load_books(self):
+        """Load the first page of books with current filters."""
         self.is_loading = True
         self.loading_message = "Loading books..."
+        ChangeFeed.watch(self.router.session.client_token, "books")
 
         try:
-            self.books = DatabaseService.get_all_books(
-                search=self.book_search,
-                filter_status=self.book_filter_status,
-                filter_genre=self.book_filter_genre
+            page = await _fetch_books(
+                self.book_search,
+                self.book_filter_status,
+                self.book_filter_genre,
+                self.books_page_size
             )
+            self._apply_books_page(page)
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading books: {str(e)}"
@@ -166,10 +236,20 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
-    def load_genres(self):
+    def _apply_books_page(self, page: Dict, append: bool = False):
+        """Show (or append) a page returned by _fetch_books."""
+        books = [BookRow.from_row(book) for book in page['books']]
+        if append:
+            shown = {book.book_id for book in self.books}
+            books = self.books + [book for book in books if book.book_id not in shown]
+        self.books = books
+        self.books_next_cursor = page['next_cursor']
+
+    async def load_genres(self):
         """Load all genres."""
+        ChangeFeed.watch(self.router.session.client_token, "genres")
         try:
-            self.genres = DatabaseService.get_all_genres()
+            self.genres = await AsyncDatabaseService.get_all_genres()
         except Exception as e:
             print(f"Error loading genres: {e}")
 
@@ -177,28 +257,70 @@ class State(rx.State):
         """Set book search filter."""
         self.book_search = value
 
-    def set_book_filter_status(self, value: str):
+    async def set_book_filter_status(self, value: str):
         """Set book status filter."""
         self.book_filter_status = value
-        self.load_books()
+        await self.load_books()
 
-    def set_book_filter_genre(self, value: str):
+    async def set_book_filter_genre(self, value: str):
         """Set book genre filter."""
         self.book_filter_genre = value
-        self.load_books()
+        await self.load_books()
+
+    @rx.event(background=True)
+    async def search_books(self):
+        """Search books once typing settles; superseded keystrokes never query or render."""
+        key = f"{self.router.session.client_token}:books"
+
+        try:
+            async with _search_debouncer.settled(key) as ticket:
+                async with self:
+                    search = self.book_search
+                    filter_status = self.book_filter_status
+                    filter_genre = self.book_filter_genre
+                    page_size = self.books_page_size
+                page = await _search_debouncer.run(
+                    key, ticket, lambda: _fetch_books(search, filter_status, filter_genre, page_size)
+                )
+        except SearchSuperseded:
+            return
+        except Exception as e:
+            async with self:
+                self.error_message = f"Error loading books: {str(e)}"
+            return
 
-    def search_books(self):
-        """Search books."""
-        self.load_books()
+        async with self:
+            # A newer keystroke is already on its way
+            if _search_debouncer.has_pending(key):
+                return
+            self._apply_books_page(page)
+            self.error_message = ""
 
-    def clear_book_filters(self):
+    async def clear_book_filters(self):
         """Clear all book filters."""
         self.book_search = ""
         self.book_filter_status = "all"
         self.book_filter_genre = "all"
-        self.load_books()
+        await self.load_books()
+
+    async def load_more_books(self, visible: bool = True):
+        """Append the next page of books once the end of the list scrolls into view."""
+        if not visible or not self.books_next_cursor:
+            return
+
+        try:
+            page = await _fetch_books(
+                self.book_search,
+                self.book_filter_status,
+                self.book_filter_genre,
+                self.books_page_size,
+                self.books_next_cursor
+            )
+            self._apply_books_page(page, append=True)
+        except Exception as e:
+            self.error_message = f"Error loading books: {str(e)}"
 
-    def open_add_book_form(self):
+    async def open_add_book_form(self):
         """Open add book form."""
         self.book_form_mode = "add"
         self.book_form_id = ""
@@ -208,11 +330,11 @@ class State(rx.State):
         self.book_form_error = ""
         self.book_form_send_notification = False
         if not self.genres:
-            self.load_genres()
+            await self.load_genres()
 
-    def open_edit_book_form(self, book_id: str):
+    async def open_edit_book_form(self, book_id: str):
         """Open edit book form."""
-        book = DatabaseService.get_book_by_id(book_id)
+        book = await AsyncDatabaseService.get_book_by_id(book_id)
         if book:
             self.book_form_mode = "edit"
             self.book_form_id = book['book_id']
@@ -222,7 +344,7 @@ class State(rx.State):
             self.book_form_genre = book['genre']
             self.book_form_error = ""
             if not self.genres:
-                self.load_genres()
+                await self.load_genres()
 
     def close_book_form(self):
         """Close book form."""
@@ -255,7 +377,7 @@ class State(rx.State):
         """Set book form send notification flag."""
         self.book_form_send_notification = value
 
-    def save_book(self):
+    async def save_book(self):
         """Save book (add or update)."""
         # Validation
         if not self.book_form_id or not self.book_form_title or not self.book_form_author or not self.book_form_genre:
@@ -267,17 +389,21 @@ class State(rx.State):
 
         try:
             if self.book_form_mode == "add":
-                success = DatabaseService.add_book(
+                book = await AsyncDatabaseService.add_book(
                     self.book_form_id,
                     self.book_form_title,
                     self.book_form_author,
                     self.book_form_genre
                 )
                 message = "Book added successfully"
+                if book:
+                    await self._patch_books([book], set())
+                    self._adjust_book_counts(BookRow.from_row(book), 1)
 
                 # Send notification if requested
-                if success and self.book_form_send_notification:
-                    self._send_new_book_notification(
+                if book and self.book_form_send_notification:
+                    await self._send_new_book_notification(
+                        self.book_form_id,
                         self.book_form_title,
                         self.book_form_author,
                         self.book_form_genre
@@ -285,20 +411,26 @@ class State(rx.State):
 
             else:  # edit
                 # Pass new_book_id only if it changed
-                new_id = self.book_form_id if self.book_form_id != self.book_form_original_id else None
-                success = DatabaseService.update_book(
-                    self.book_form_original_id,  # Use original ID to find the book
+                original_id = self.book_form_original_id
+                new_id = self.book_form_id if self.book_form_id != original_id else None
+                before = next((b for b in self.books if b.book_id == original_id), None)
+                book = await AsyncDatabaseService.update_book(
+                    original_id,  # Use original ID to find the book
                     self.book_form_title,
                     self.book_form_author,
                     self.book_form_genre,
                     new_book_id=new_id
                 )
                 message = "Book updated successfully"
+                if book:
+                    await self._patch_books([book], {original_id} if new_id else set())
+                    if before and before.genre != book['genre']:
+                        self._adjust_book_counts(before, -1)
+                        self._adjust_book_counts(BookRow.from_row(book), 1)
 
-            if success:
+            if book:
                 self.success_message = message
                 self.close_book_form()
-                self.load_books()
             else:
                 self.book_form_error = "Failed to save book. Book ID may already exist."
 
@@ -308,13 +440,11 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
-    def _send_new_book_notification(self, title: str, author: str, genre: str):
-        """Send notification about new book to group."""
-        from library_admin.services.notifications import NotificationService
-
+    async def _send_new_book_notification(self, book_id: str, title: str, author: str, genre: str):
+        """Queue a notification about a new book for the group."""
         try:
             # Get template
-            template = DatabaseService.get_template_by_name('new_book_announcement')
+            template = await AsyncDatabaseService.run(TemplateRegistry.get, 'new_book_announcement')
             if not template:
                 return  # Silently skip if template not found
 
@@ -324,30 +454,32 @@ class State(rx.State):
                 return  # Silently skip if no group ID
 
             # Format message
-            message = template['message_content'].format(
+            message = template.render(
                 book_title=title,
                 author=author,
                 genre=genre
             )
 
-            # Send notification
-            NotificationService.send_group_message(group_id, message)
+            # Queue notification; the outbox worker delivers it
+            await AsyncDatabaseService.run(OutboxService.enqueue_many, [
+                OutboxService.message(f"new_book:{book_id}", group_id, message, channel="group")
+            ])
 
         except Exception as e:
             # Don't fail the book save if notification fails
-            print(f"Failed to send new book notification: {e}")
+            print(f"Failed to queue new book notification: {e}")
 
-    def delete_book_confirm(self, book_id: str):
+    async def delete_book_confirm(self, book_id: str):
         """Delete a book."""
         self.is_loading = True
         self.loading_message = "Deleting book..."
 
         try:
-            success = DatabaseService.delete_book(book_id)
-            if success:
+            book = await AsyncDatabaseService.delete_book(book_id)
+            if book:
                 self.success_message = "Book deleted successfully"
-                self.load_books()
-                self.load_dashboard_data()
+                await self._patch_books([], {book_id})
+                self._adjust_book_counts(BookRow.from_row(book), -1)
             else:
                 self.error_message = "Cannot delete book. It may be currently borrowed."
         except Exception as e:
@@ -356,36 +488,138 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
+    # ===== BOOK IMPORT =====
+
+    def open_import_dialog(self):
+        """Open the bulk import dialog."""
+        self.import_dialog_open = True
+        if not self.import_in_progress:
+            self.import_phase = ""
+            self.import_error = ""
+            self.import_errors = []
+
+    def close_import_dialog(self):
+        """Close the bulk import dialog (a running import keeps going)."""
+        self.import_dialog_open = False
+
+    async def handle_book_import_upload(self, files: List[rx.UploadFile]):
+        """Save an uploaded CSV/JSONL file and start importing it."""
+        if self.import_in_progress:
+            self.import_error = "An import is already running"
+            return
+        if not files:
+            self.import_error = "Please choose a CSV or JSONL file"
+            return
+
+        upload = files[0]
+        name = (upload.filename or "").lower()
+        if name.endswith(".csv"):
+            file_format = "csv"
+        elif name.endswith((".jsonl", ".ndjson")):
+            file_format = "jsonl"
+        else:
+            self.import_error = "Only .csv and .jsonl files can be imported"
+            return
+
+        fd, path = tempfile.mkstemp(prefix="book-import-", suffix=f".{file_format}")
+        with os.fdopen(fd, "wb") as out:
+            await asyncio.to_thread(shutil.copyfileobj, upload.file, out)
+
+        self._import_path = path
+        self._import_format = file_format
+        self.import_in_progress = True
+        self.import_phase = "queued"
+        self.import_rows_read = 0
+        self.import_total = 0
+        self.import_imported = 0
+        self.import_skipped = 0
+        self.import_errors = []
+        self.import_error = ""
+        return State.run_book_import
+
+    @rx.event(background=True)
+    async def run_book_import(self):
+        """Import the uploaded file, reporting progress while it runs."""
+        async with self:
+            path, file_format = self._import_path, self._import_format
+            self._import_path = ""
+            self._import_format = ""
+        if not path:
+            return
+
+        progress = ImportProgress()
+        task = asyncio.ensure_future(AsyncDatabaseService.run(
+            BookImportService.import_file, path, file_format, progress=progress
+        ))
+        result = None
+        error = ""
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=0.5)
+                snapshot = progress.snapshot()
+                async with self:
+                    self.import_phase = snapshot["phase"]
+                    self.import_rows_read = snapshot["rows_read"]
+                    self.import_total = snapshot.get("total", 0)
+            result = task.result()
+        except BookImportError as e:
+            error = str(e)
+        except Exception as e:
+            error = f"Error importing books: {str(e)}"
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        async with self:
+            self.import_in_progress = False
+            if result is None:
+                self.import_phase = "failed"
+                self.import_error = error
+                return
+            self.import_phase = "done" if result['success'] else "failed"
+            self.import_total = result['total']
+            self.import_imported = result['imported']
+            self.import_skipped = result['skipped']
+            self.import_errors = result['errors']
+            if result['imported']:
+                self.success_message = f"Imported {result['imported']} books"
+        if result['imported']:
+            yield State.load_books
+            yield State.load_dashboard_data
+
+    # ===== EXPORT =====
+
+    def export_data(self, dataset: str, file_format: str):
+        """Download a whole table, streamed by the export endpoint."""
+        if not self.is_authenticated:
+            return
+        if dataset not in EXPORT_DATASETS or file_format not in EXPORT_FORMATS:
+            self.error_message = f"Unknown export: {dataset}.{file_format}"
+            return
+        token = ExportService.create_token(dataset, file_format)
+        return rx.download(
+            url=f"/api/export/{dataset}.{file_format}?token={token}",
+            filename=f"{dataset}.{file_format}",
+        )
+
     # ===== LOANS =====
 
-    def load_active_loans(self):
-        """Load all active loans with filters."""
+    async def load_active_loans(self):
+        """Load active loans matching the current search and status filter."""
         self.is_loading = True
         self.loading_message = "Loading loans..."
+        ChangeFeed.watch(self.router.session.client_token, "active_loans")
 
         try:
-            # Get all loans first
-            all_loans = DatabaseService.get_active_loans()
-
-            # Apply search filter
-            if self.loan_search:
-                search_lower = self.loan_search.lower()
-                all_loans = [
-                    loan for loan in all_loans
-                    if search_lower in loan.get('title', '').lower()
-                    or search_lower in loan.get('author', '').lower()
-                    or search_lower in loan.get('book_id', '').lower()
-                    or search_lower in loan.get('user_id', '').lower()
-                ]
-
-            # Apply status filter
-            if self.loan_filter_status != "all":
-                all_loans = [
-                    loan for loan in all_loans
-                    if loan.get('status') == self.loan_filter_status
-                ]
-
-            self.active_loans = all_loans
+            # One row past the page tells whether there is another
+            loans = await AsyncDatabaseService.get_active_loans(
+                search=self.loan_search,
+                status=self.loan_filter_status,
+                limit=self.loans_page_size + 1
+            )
+            self._apply_loans_page(loans, self.loans_page_size)
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading loans: {str(e)}"
@@ -393,34 +627,102 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
+    def _apply_loans_page(self, loans: List[Dict], limit: int, append: bool = False):
+        """Show (or append) up to limit loans, fetched with limit + 1 rows."""
+        page = loans[:limit]
+        rows = [LoanRow.from_row(loan) for loan in page]
+        if append:
+            shown = {loan.loan_id for loan in self.active_loans}
+            rows = self.active_loans + [loan for loan in rows if loan.loan_id not in shown]
+        self.active_loans = rows
+        self.loans_has_more = len(loans) > limit
+        if page:
+            self._loans_after = (page[-1]['due_date'], page[-1]['loan_id'])
+        elif not append:
+            self._loans_after = None
+
+    async def load_more_loans(self, visible: bool = True):
+        """Append the next page of loans once the end of the list scrolls into view."""
+        if not visible or not self.loans_has_more:
+            return
+
+        try:
+            loans = await AsyncDatabaseService.get_active_loans(
+                search=self.loan_search,
+                status=self.loan_filter_status,
+                limit=self.loans_page_size + 1,
+                after=self._loans_after
+            )
+            self._apply_loans_page(loans, self.loans_page_size, append=True)
+        except Exception as e:
+            self.error_message = f"Error loading loans: {str(e)}"
+
     def set_loan_search(self, value: str):
         """Set loan search filter."""
         self.loan_search = value
 
-    def set_loan_filter_status(self, value: str):
+    async def set_loan_filter_status(self, value: str):
         """Set loan status filter."""
         self.loan_filter_status = value
-        self.load_active_loans()
+        await self.load_active_loans()
+
+    @rx.event(background=True)
+    async def search_loans(self):
+        """Search loans once typing settles; superseded keystrokes never query or render."""
+        key = f"{self.router.session.client_token}:loans"
 
-    def search_loans(self):
-        """Search loans."""
-        self.load_active_loans()
+        try:
+            async with _search_debouncer.settled(key) as ticket:
+                async with self:
+                    search = self.loan_search
+                    status = self.loan_filter_status
+                    page_size = self.loans_page_size
+                loans = await _search_debouncer.run(
+                    key, ticket, lambda: AsyncDatabaseService.get_active_loans(
+                        search=search, status=status, limit=page_size + 1
+                    )
+                )
+        except SearchSuperseded:
+            return
+        except Exception as e:
+            async with self:
+                self.error_message = f"Error loading loans: {str(e)}"
+            return
 
-    def clear_loan_filters(self):
+        async with self:
+            if _search_debouncer.has_pending(key):
+                return
+            self._apply_loans_page(loans, page_size)
+            self.error_message = ""
+
+    async def clear_loan_filters(self):
         """Clear all loan filters."""
         self.loan_search = ""
         self.loan_filter_status = "all"
-        self.load_active_loans()
+        await self.load_active_loans()
 
     # ===== USERS =====
 
-    def load_users(self):
-        """Load all users."""
+    async def load_users(self):
+        """Load the first page of users matching the current search."""
+        await self._load_users(self.user_search, self.users_page_size)
+
+    async def load_all_users(self):
+        """Load every user, for the notification recipient picker."""
+        await self._load_users("", None)
+
+    async def _load_users(self, search: str, limit: Optional[int]):
+        """Load the first limit users matching search (None for all)."""
         self.is_loading = True
         self.loading_message = "Loading users..."
+        ChangeFeed.watch(self.router.session.client_token, "users")
 
         try:
-            self.users = DatabaseService.get_all_users()
+            users = await AsyncDatabaseService.get_all_users(
+                search=search,
+                limit=None if limit is None else limit + 1
+            )
+            self._apply_users_page(users, limit)
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading users: {str(e)}"
@@ -428,32 +730,74 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
+    def _apply_users_page(self, users: List[Dict], limit: Optional[int], append: bool = False):
+        """Show (or append) up to limit users (None for all), fetched with limit + 1 rows."""
+        page = users[:limit]
+        rows = [UserRow.from_row(user) for user in page]
+        if append:
+            shown = {user.user_id for user in self.users}
+            rows = self.users + [user for user in rows if user.user_id not in shown]
+        self.users = rows
+        self.users_has_more = limit is not None and len(users) > limit
+        if page:
+            self._users_after = (page[-1]['created_at'], page[-1]['user_id'])
+        elif not append:
+            self._users_after = None
+
+    async def load_more_users(self, visible: bool = True):
+        """Append the next page of users once the end of the list scrolls into view."""
+        if not visible or not self.users_has_more:
+            return
+
+        try:
+            users = await AsyncDatabaseService.get_all_users(
+                search=self.user_search,
+                limit=self.users_page_size + 1,
+                after=self._users_after
+            )
+            self._apply_users_page(users, self.users_page_size, append=True)
+        except Exception as e:
+            self.error_message = f"Error loading users: {str(e)}"
+
     def set_user_search(self, value: str):
         """Set user search."""
         self.user_search = value
 
-    def search_users(self):
-        """Search users."""
-        if self.user_search:
-            search_lower = self.user_search.lower()
-            all_users = DatabaseService.get_all_users()
-            self.users = [
-                u for u in all_users
-                if search_lower in u.get('name', '').lower()
-                or search_lower in u.get('user_id', '').lower()
-            ]
-        else:
-            self.load_users()
+    @rx.event(background=True)
+    async def search_users(self):
+        """Search users once typing settles; superseded keystrokes never query or render."""
+        key = f"{self.router.session.client_token}:users"
+
+        try:
+            async with _search_debouncer.settled(key) as ticket:
+                async with self:
+                    search = self.user_search
+                    page_size = self.users_page_size
+                users = await _search_debouncer.run(
+                    key, ticket, lambda: AsyncDatabaseService.get_all_users(search=search, limit=page_size + 1)
+                )
+        except SearchSuperseded:
+            return
+        except Exception as e:
+            async with self:
+                self.error_message = f"Error loading users: {str(e)}"
+            return
+
+        async with self:
+            if _search_debouncer.has_pending(key):
+                return
+            self._apply_users_page(users, page_size)
+            self.error_message = ""
 
     def open_edit_user_form(self, user_id: str):
         """Open edit user form."""
-        users_list = [u for u in self.users if u['user_id'] == user_id]
+        users_list = [u for u in self.users if u.user_id == user_id]
         if users_list:
             user = users_list[0]
             self.user_form_mode = "edit"
-            self.user_form_id = user['user_id']
-            self.user_form_name = user.get('name', '')
-            self.user_form_role = user.get('role', 'user')
+            self.user_form_id = user.user_id
+            self.user_form_name = user.name or ''
+            self.user_form_role = user.role or 'user'
             self.user_form_error = ""
 
     def set_user_form_name(self, value: str):
@@ -469,7 +813,7 @@ class State(rx.State):
         self.user_form_mode = ""
         self.user_form_error = ""
 
-    def save_user(self):
+    async def save_user(self):
         """Save user."""
         if not self.user_form_name:
             self.user_form_error = "Name is required"
@@ -477,16 +821,16 @@ class State(rx.State):
 
         self.is_loading = True
         try:
-            success = DatabaseService.update_user(
+            user = await AsyncDatabaseService.update_user(
                 self.user_form_id,
                 self.user_form_name,
                 self.user_form_role
             )
 
-            if success:
+            if user:
                 self.success_message = "User updated successfully"
                 self.close_user_form()
-                self.load_users()
+                self._patch_users([user], set())
             else:
                 self.user_form_error = "Failed to update user"
         except Exception as e:
@@ -496,13 +840,14 @@ class State(rx.State):
 
     # ===== GENRES =====
 
-    def load_genres_list(self):
+    async def load_genres_list(self):
         """Load all genres with book counts."""
         self.is_loading = True
         self.loading_message = "Loading genres..."
+        ChangeFeed.watch(self.router.session.client_token, "genres_list")
 
         try:
-            self.genres_list = DatabaseService.get_genres_with_counts()
+            self.genres_list = await AsyncDatabaseService.get_genres_with_counts()
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading genres: {str(e)}"
@@ -546,7 +891,7 @@ class State(rx.State):
         """Set genre form description."""
         self.genre_form_description = value
 
-    def save_genre(self):
+    async def save_genre(self):
         """Save genre (add or update)."""
         if not self.genre_form_name:
             self.genre_form_error = "Genre name is required"
@@ -557,24 +902,23 @@ class State(rx.State):
 
         try:
             if self.genre_form_mode == "add":
-                success = DatabaseService.add_genre(
+                genre = await AsyncDatabaseService.add_genre(
                     self.genre_form_name,
                     self.genre_form_description
                 )
                 message = "Genre added successfully"
             else:  # edit
-                success = DatabaseService.update_genre(
+                genre = await AsyncDatabaseService.update_genre(
                     self.genre_form_id,
                     self.genre_form_name,
                     self.genre_form_description
                 )
                 message = "Genre updated successfully"
 
-            if success:
+            if genre:
                 self.success_message = message
                 self.close_genre_form()
-                self.load_genres_list()
-                self.load_genres()  # Refresh genres dropdown
+                self._patch_genres(genre)
             else:
                 self.genre_form_error = "Failed to save genre. Genre name may already exist."
 
@@ -584,17 +928,16 @@ class State(rx.State):
             self.is_loading = False
             self.loading_message = ""
 
-    def delete_genre_confirm(self, genre_id: int):
+    async def delete_genre_confirm(self, genre_id: int):
         """Delete a genre."""
         self.is_loading = True
         self.loading_message = "Deleting genre..."
 
         try:
-            success = DatabaseService.delete_genre(genre_id)
-            if success:
+            genre = await AsyncDatabaseService.delete_genre(genre_id)
+            if genre:
                 self.success_message = "Genre deleted successfully"
-                self.load_genres_list()
-                self.load_genres()  # Refresh genres dropdown
+                self._patch_genres(genre, deleted=True)
             else:
                 self.error_message = "Cannot delete genre. It may be used by books."
         except Exception as e:
@@ -670,10 +1013,8 @@ Come and borrow it today! 📚✨"""
         self.notify_message = ""
         self.notify_group_message = ""
 
-    def send_notification_to_user(self):
+    async def send_notification_to_user(self):
         """Send notification to a user."""
-        from library_admin.services.notifications import NotificationService
-
         if not self.notify_phone_number:
             self.error_message = "Please select a user or enter a phone number"
             return
@@ -686,7 +1027,9 @@ Come and borrow it today! 📚✨"""
         self.loading_message = "Sending message..."
 
         try:
-            result = NotificationService.send_whatsapp_message(
+            # The rate limiter may block; keep the event loop free
+            result = await asyncio.to_thread(
+                NotificationService.send_whatsapp_message,
                 self.notify_phone_number,
                 self.notify_message
             )
@@ -705,10 +1048,8 @@ Come and borrow it today! 📚✨"""
             self.is_loading = False
             self.loading_message = ""
 
-    def send_notification_to_group(self):
+    async def send_notification_to_group(self):
         """Send broadcast notification to group."""
-        from library_admin.services.notifications import NotificationService
-
         # Use group ID from settings
         group_id = self.setting_whatsapp_group_id
 
@@ -724,7 +1065,8 @@ Come and borrow it today! 📚✨"""
         self.loading_message = "Sending broadcast..."
 
         try:
-            result = NotificationService.send_group_message(
+            result = await asyncio.to_thread(
+                NotificationService.send_group_message,
                 group_id,
                 self.notify_group_message
             )
@@ -741,15 +1083,13 @@ Come and borrow it today! 📚✨"""
             self.is_loading = False
             self.loading_message = ""
 
-    def test_evolution_api(self):
+    async def test_evolution_api(self):
         """Test Evolution API connection."""
-        from library_admin.services.notifications import NotificationService
-
         self.evolution_api_status = "testing"
         self.evolution_api_error = ""
 
         try:
-            result = NotificationService.test_connection()
+            result = await asyncio.to_thread(NotificationService.test_connection)
 
             if result.get("success"):
                 self.evolution_api_status = "connected"
@@ -764,11 +1104,11 @@ Come and borrow it today! 📚✨"""
 
     # ===== SETTINGS =====
 
-    def load_settings(self):
+    async def load_settings(self):
         """Load all settings."""
         self.is_loading = True
         try:
-            settings = DatabaseService.get_all_settings()
+            settings = await AsyncDatabaseService.get_all_settings()
             for setting in settings:
                 key = setting['setting_key']
                 value = setting['setting_value']
@@ -782,10 +1122,10 @@ Come and borrow it today! 📚✨"""
                     self.setting_overdue_alert_days_after = value
 
             # Load counts for targeted notifications
-            overdue_users = DatabaseService.get_users_with_overdue_books()
+            overdue_users = await AsyncDatabaseService.get_users_with_overdue_books()
             self.overdue_users_count = len(overdue_users)
 
-            due_soon_users = DatabaseService.get_users_with_due_soon_books()
+            due_soon_users = await AsyncDatabaseService.get_users_with_due_soon_books()
             self.due_soon_users_count = len(due_soon_users)
 
             self.error_message = ""
@@ -810,17 +1150,28 @@ Come and borrow it today! 📚✨"""
         """Set overdue alert days after."""
         self.setting_overdue_alert_days_after = value
 
-    def save_settings(self):
+    async def save_settings(self):
         """Save all settings."""
         self.is_loading = True
         try:
-            DatabaseService.update_setting('whatsapp_group_id', self.setting_whatsapp_group_id)
-            DatabaseService.update_setting('loan_due_days', self.setting_loan_due_days)
-            DatabaseService.update_setting('reminder_days_before', self.setting_reminder_days_before)
-            DatabaseService.update_setting('overdue_alert_days_after', self.setting_overdue_alert_days_after)
-
-            self.success_message = "Settings saved successfully"
-            self.error_message = ""
+            # Labels as shown on the settings page
+            settings = [
+                ('whatsapp_group_id', self.setting_whatsapp_group_id, "WhatsApp Group ID"),
+                ('loan_due_days', self.setting_loan_due_days, "Loan Due Period (days)"),
+                ('reminder_days_before', self.setting_reminder_days_before, "Reminder Days Before Due"),
+                ('overdue_alert_days_after', self.setting_overdue_alert_days_after, "Overdue Alert Days After"),
+            ]
+            failed = []
+            for key, value, label in settings:
+                if not await AsyncDatabaseService.update_setting(key, value):
+                    failed.append(label)
+
+            if failed:
+                self.success_message = ""
+                self.error_message = f"Failed to save: {', '.join(failed)}"
+            else:
+                self.success_message = "Settings saved successfully"
+                self.error_message = ""
         except Exception as e:
             self.error_message = f"Error saving settings: {str(e)}"
         finally:
@@ -828,11 +1179,11 @@ Come and borrow it today! 📚✨"""
 
     # ===== MESSAGE TEMPLATES =====
 
-    def load_templates(self):
+    async def load_templates(self):
         """Load all message templates."""
         self.is_loading = True
         try:
-            self.templates = DatabaseService.get_all_templates()
+            self.templates = await AsyncDatabaseService.get_all_templates()
             self.error_message = ""
         except Exception as e:
             self.error_message = f"Error loading templates: {str(e)}"
@@ -883,16 +1234,22 @@ Come and borrow it today! 📚✨"""
         """Set template form description."""
         self.template_form_description = value
 
-    def save_template(self):
+    async def save_template(self):
         """Save message template."""
         if not self.template_form_name or not self.template_form_type or not self.template_form_content:
             self.template_form_error = "Name, type, and content are required"
             return
 
+        # Reject placeholders that would fail at send time
+        template_error = TemplateRegistry.validate(self.template_form_name, self.template_form_content)
+        if template_error:
+            self.template_form_error = template_error
+            return
+
         self.is_loading = True
         try:
             if self.template_form_mode == "add":
-                success = DatabaseService.add_template(
+                success = await AsyncDatabaseService.add_template(
                     self.template_form_name,
                     self.template_form_type,
                     self.template_form_content,
@@ -900,7 +1257,7 @@ Come and borrow it today! 📚✨"""
                 )
                 message = "Template added successfully"
             else:  # edit
-                success = DatabaseService.update_template(
+                success = await AsyncDatabaseService.update_template(
                     self.template_form_id,
                     self.template_form_name,
                     self.template_form_type,
@@ -912,7 +1269,7 @@ Come and borrow it today! 📚✨"""
             if success:
                 self.success_message = message
                 self.close_template_form()
-                self.load_templates()
+                await self.load_templates()
             else:
                 self.template_form_error = "Failed to save template"
 
@@ -923,122 +1280,143 @@ Come and borrow it today! 📚✨"""
 
     # ===== TARGETED NOTIFICATIONS =====
 
-    def send_overdue_alerts_bulk(self):
-        """Send alerts to all users with overdue books."""
-        from library_admin.services.notifications import NotificationService
-
+    async def send_overdue_alerts_bulk(self):
+        """Queue alerts for all users with overdue books."""
         self.is_loading = True
-        self.loading_message = "Sending overdue alerts..."
+        self.loading_message = "Queueing overdue alerts..."
 
         try:
-            overdue_users = DatabaseService.get_users_with_overdue_books()
+            # Every recipient with all their overdue loans not alerted
+            # about recently, in one query
+            overdue_users = await AsyncDatabaseService.get_active_loans_by_user(
+                status='overdue', not_notified='overdue_alert'
+            )
 
             if not overdue_users:
-                self.error_message = "No users with overdue books found"
+                self.error_message = "No users with overdue books left to alert"
                 return
 
-            # Get template
-            template = DatabaseService.get_template_by_name('overdue_alert')
-            if not template:
+            # Get template: digests list every book, single alerts only the first
+            digest = Config.NOTIFY_DIGEST
+            template = await AsyncDatabaseService.run(
+                TemplateRegistry.get, 'overdue_digest' if digest else 'overdue_alert'
+            )
+            if not template and not digest:
                 self.error_message = "Overdue alert template not found"
                 return
 
-            success_count = 0
+            today = date.today().isoformat()
+            messages = []
+            ledger = []
             for user in overdue_users:
                 user_id = user['user_id']
-                overdue_count = user['overdue_count']
-
-                # Get user's overdue loans
-                loans = DatabaseService.get_active_loans()
-                user_loans = [l for l in loans if l['user_id'] == user_id and l['status'] == 'overdue']
+                user_loans = user['loans']
 
-                if user_loans:
+                if digest:
+                    message = NotificationService.format_loan_digest(
+                        'overdue', user_loans, template
+                    )
+                else:
                     first_book = user_loans[0]
-                    message = template['message_content'].format(
+                    message = template.render(
                         book_title=first_book['title'],
                         days_overdue=abs(first_book['days_remaining'])
                     )
+                # One alert per user per day, however often the button is pressed
+                key = f"overdue_bulk:{user_id}:{today}"
+                messages.append(OutboxService.message(key, user_id, message))
+                # A single alert only mentions the first book
+                notified = user_loans if digest else user_loans[:1]
+                ledger.extend((loan['loan_id'], 'overdue_alert', user_id, key) for loan in notified)
 
-                    result = NotificationService.send_whatsapp_message(user_id, message)
-                    if result.get('success'):
-                        success_count += 1
-
-            self.success_message = f"Sent alerts to {success_count} of {len(overdue_users)} users"
-            self.load_settings()  # Reload counts
+            queued = await AsyncDatabaseService.run(OutboxService.enqueue_many, messages, ledger)
+            self.success_message = f"Queued alerts for {queued} of {len(overdue_users)} users"
+            await self.load_settings()  # Reload counts
 
         except Exception as e:
-            self.error_message = f"Error sending alerts: {str(e)}"
+            self.error_message = f"Error queueing alerts: {str(e)}"
         finally:
             self.is_loading = False
             self.loading_message = ""
 
-    def send_due_soon_reminders_bulk(self):
-        """Send reminders to all users with books due soon."""
-        from library_admin.services.notifications import NotificationService
-
+    async def send_due_soon_reminders_bulk(self):
+        """Queue reminders for all users with books due soon."""
         self.is_loading = True
-        self.loading_message = "Sending due soon reminders..."
+        self.loading_message = "Queueing due soon reminders..."
 
         try:
-            due_soon_users = DatabaseService.get_users_with_due_soon_books()
+            # Every recipient with all their due-soon loans not reminded
+            # about recently, in one query
+            due_soon_users = await AsyncDatabaseService.get_active_loans_by_user(
+                status='due_soon', not_notified='due_reminder'
+            )
 
             if not due_soon_users:
-                self.error_message = "No users with books due soon found"
+                self.error_message = "No users with books due soon left to remind"
                 return
 
-            # Get template
-            template = DatabaseService.get_template_by_name('due_reminder')
-            if not template:
+            # Get template: digests list every book, single reminders only the first
+            digest = Config.NOTIFY_DIGEST
+            template = await AsyncDatabaseService.run(
+                TemplateRegistry.get, 'due_soon_digest' if digest else 'due_reminder'
+            )
+            if not template and not digest:
                 self.error_message = "Due reminder template not found"
                 return
 
-            success_count = 0
+            today = date.today().isoformat()
+            messages = []
+            ledger = []
             for user in due_soon_users:
                 user_id = user['user_id']
+                user_loans = user['loans']
 
-                # Get user's due soon loans
-                loans = DatabaseService.get_active_loans()
-                user_loans = [l for l in loans if l['user_id'] == user_id and l['status'] == 'due_soon']
-
-                if user_loans:
+                if digest:
+                    message = NotificationService.format_loan_digest(
+                        'due_soon', user_loans, template
+                    )
+                else:
                     first_book = user_loans[0]
-                    message = template['message_content'].format(
+                    message = template.render(
                         book_title=first_book['title'],
                         due_date=first_book['due_date']
                     )
+                key = f"due_soon_bulk:{user_id}:{today}"
+                messages.append(OutboxService.message(key, user_id, message))
+                # A single reminder only mentions the first book
+                notified = user_loans if digest else user_loans[:1]
+                ledger.extend((loan['loan_id'], 'due_reminder', user_id, key) for loan in notified)
 
-                    result = NotificationService.send_whatsapp_message(user_id, message)
-                    if result.get('success'):
-                        success_count += 1
-
-            self.success_message = f"Sent reminders to {success_count} of {len(due_soon_users)} users"
-            self.load_settings()  # Reload counts
+            queued = await AsyncDatabaseService.run(OutboxService.enqueue_many, messages, ledger)
+            self.success_message = f"Queued reminders for {queued} of {len(due_soon_users)} users"
+            await self.load_settings()  # Reload counts
 
         except Exception as e:
-            self.error_message = f"Error sending reminders: {str(e)}"
+            self.error_message = f"Error queueing reminders: {str(e)}"
         finally:
             self.is_loading = False
             self.loading_message = ""
 
-    def send_notification_to_loan_user(self, user_id: str, book_title: str, loan_status: str):
+    async def send_notification_to_loan_user(self, user_id: str, book_title: str, loan_status: str):
         """Send notification to a specific user about their loan."""
-        from library_admin.services.notifications import NotificationService
-
         self.is_loading = True
         self.loading_message = "Sending notification..."
 
         try:
             # Get appropriate template
             template_name = 'overdue_alert' if loan_status == 'overdue' else 'due_reminder'
-            template = DatabaseService.get_template_by_name(template_name)
+            template = await AsyncDatabaseService.run(TemplateRegistry.get, template_name)
 
             if not template:
                 self.error_message = f"Template '{template_name}' not found"
                 return
 
-            # Get loan details
-            loans = DatabaseService.get_active_loans()
-            user_loans = [l for l in loans if l['user_id'] == user_id and l['title'] == book_title]
+            # Get loan details: just this user's loans
+            borrowers = await AsyncDatabaseService.get_active_loans_by_user(user_id=user_id)
+            user_loans = [
+                l for borrower in borrowers for l in borrower['loans']
+                if l['title'] == book_title
+            ]
 
             if not user_loans:
                 self.error_message = "Loan not found"
@@ -1048,20 +1426,23 @@ Come and borrow it today! 📚✨"""
 
             # Format message
             if loan_status == 'overdue':
-                message = template['message_content'].format(
+                message = template.render(
                     book_title=loan['title'],
                     days_overdue=abs(loan['days_remaining'])
                 )
             else:
-                message = template['message_content'].format(
+                message = template.render(
                     book_title=loan['title'],
                     due_date=loan['due_date']
                 )
 
             # Send notification
-            result = NotificationService.send_whatsapp_message(user_id, message)
+            result = await asyncio.to_thread(NotificationService.send_whatsapp_message, user_id, message)
 
             if result.get('success'):
+                # Sent on request, but counts for the scheduled runs too
+                kind = 'overdue_alert' if loan_status == 'overdue' else 'due_reminder'
+                await AsyncDatabaseService.log_notifications([(loan['loan_id'], kind, user_id, None)])
                 self.success_message = f"Notification sent to {user_id}"
             else:
                 self.error_message = result.get('error', 'Failed to send notification')
@@ -1072,6 +1453,162 @@ Come and borrow it today! 📚✨"""
             self.is_loading = False
             self.loading_message = ""
 
+    # ===== LIVE UPDATES =====
+
+    def _book_matches(self, book: BookRow) -> bool:
+        """Whether a book passes the current book filters."""
+        if self.book_filter_status != "all" and book.status != self.book_filter_status:
+            return False
+        if self.book_filter_genre != "all" and book.genre != self.book_filter_genre:
+            return False
+        search = self.book_search.strip().lower()
+        return not search or any(search in (f or '').lower() for f in (book.title, book.author, book.book_id))
+
+    def _loan_matches(self, loan: LoanRow) -> bool:
+        """Whether a loan passes the current loan filters."""
+        if self.loan_filter_status != "all" and loan.status != self.loan_filter_status:
+            return False
+        # The search also matches the author, which loan rows don't carry; a
+        # loan matching only on author is picked up by the next full reload
+        search = self.loan_search.lower()
+        return not search or any(
+            search in (f or '').lower() for f in (loan.title, loan.book_id, loan.user_id)
+        )
+
+    def _user_matches(self, user: UserRow) -> bool:
+        """Whether a user passes the current user search."""
+        search = self.user_search.lower()
+        return not search or any(search in (f or '').lower() for f in (user.name, user.user_id))
+
+    async def _patch_books(self, rows: List[Dict], removed):
+        """Apply changed books to the page shown."""
+        fresh = {row['book_id']: BookRow.from_row(row) for row in rows}
+        books = []
+        for book in self.books:
+            if book.book_id in removed:
+                continue
+            changed = fresh.pop(book.book_id, None)
+            if changed is None:
+                books.append(book)
+            elif self._book_matches(changed):
+                books.append(changed)
+
+        # Search results are relevance-ranked; only keyset pages take new rows.
+        # Where they go depends on the database's collation, so the database
+        # orders the IDs and drops new rows sorting past the loaded window;
+        # those come with the page they belong to.
+        added = [book for book in fresh.values() if self._book_matches(book)]
+        if added and not self.book_search.strip():
+            _, last = DatabaseService.decode_page_cursor(self.books_next_cursor)
+            shown = {book.book_id: book for book in books + added}
+            order = await AsyncDatabaseService.order_book_ids(list(shown), up_to=last or "")
+            books = [shown[book_id] for book_id in order]
+
+        self.books = books
+
+    def _patch_active_loans(self, rows: List[Dict], removed):
+        """Apply changed loans to the loans list."""
+        fresh = [LoanRow.from_row(row) for row in rows]
+        fresh_ids = {loan.loan_id for loan in fresh}
+        loans = [
+            loan for loan in self.active_loans
+            if loan.loan_id not in removed and loan.loan_id not in fresh_ids
+        ]
+        # Loans sorting past the last one loaded come with the page they belong to
+        last = tuple(self._loans_after) if self._loans_after and self.loans_has_more else None
+        loans.extend(
+            loan for loan in fresh
+            if self._loan_matches(loan)
+            and (last is None or (loan.due_date or '', loan.loan_id) <= last)
+        )
+        loans.sort(key=lambda l: (l.due_date or '', l.loan_id))
+        self.active_loans = loans
+
+    def _patch_users(self, rows: List[Dict], removed, added=()):
+        """Apply changed users (added: keys of new ones) to the users list."""
+        fresh = {row['user_id']: UserRow.from_row(row) for row in rows}
+        users = []
+        for user in self.users:
+            if user.user_id in removed:
+                continue
+            changed = fresh.pop(user.user_id, None)
+            if changed is None:
+                users.append(user)
+            elif self._user_matches(changed):
+                users.append(changed)
+        # The list is newest first, so new users go on top; other users not
+        # shown yet come with the page they belong to
+        self.users = [
+            user for user in fresh.values()
+            if self._user_matches(user) and (user.user_id in added or not self.users_has_more)
+        ] + users
+
+    def _adjust_book_counts(self, book: BookRow, delta: int):
+        """Add (delta=1) or remove (delta=-1) a book from the dashboard and genre counts."""
+        if self.dashboard_stats:
+            stats = dict(self.dashboard_stats)
+            stats['total_books'] = stats.get('total_books', 0) + delta
+            counter = {'available': 'available_books', 'borrowed': 'borrowed_books'}.get(book.status)
+            if counter:
+                stats[counter] = stats.get(counter, 0) + delta
+            self.dashboard_stats = stats
+
+        self.genres_list = [
+            {**genre, 'book_count': genre['book_count'] + delta}
+            if genre['genre_name'] == book.genre else genre
+            for genre in self.genres_list
+        ]
+
+    def _patch_genres(self, genre: Dict, deleted: bool = False):
+        """Apply an added, updated or deleted genre to the genre lists."""
+        before = next((g for g in self.genres_list if g['genre_id'] == genre['genre_id']), None)
+        genres_list = [g for g in self.genres_list if g['genre_id'] != genre['genre_id']]
+        if not deleted:
+            genres_list.append(genre)
+            genres_list.sort(key=lambda g: (g.get('display_order') or 0, g['genre_name']))
+        self.genres_list = genres_list
+
+        # Genre dropdown: names only, in display order
+        names = [name for name in self.genres if name != (before or genre)['genre_name']]
+        if not deleted:
+            if before and before['genre_name'] in self.genres:
+                names.insert(self.genres.index(before['genre_name']), genre['genre_name'])
+            else:
+                names.append(genre['genre_name'])
+        self.genres = names
+
+    async def _apply_change_patch(self, patch: Dict, lists):
+        """
+        Apply a change feed patch (see ChangeFeed.build_patch).
+
+        Args:
+            patch: Fresh rows and removed keys per list, plus lists to reload
+            lists: The lists this session watches that the patch touches
+        """
+        for name in lists:
+            if name in patch["reload"]:
+                reload = {
+                    "books": self.load_books,
+                    "genres": self.load_genres,
+                    "genres_list": self.load_genres_list,
+                    "active_loans": self.load_active_loans,
+                    # Keep every user loaded where all were (e.g. the recipient picker)
+                    "users": lambda: self._load_users(
+                        self.user_search, self.users_page_size if self.users_has_more else None
+                    ),
+                }[name]
+                await reload()
+            elif name == "books" and "books" in patch:
+                await self._patch_books(patch["books"]["rows"], patch["books"]["removed"])
+            elif name == "active_loans" and "active_loans" in patch:
+                self._patch_active_loans(patch["active_loans"]["rows"], patch["active_loans"]["removed"])
+            elif name == "users" and "users" in patch:
+                self._patch_users(patch["users"]["rows"], patch["users"]["removed"], patch["users"]["added"])
+            elif name == "genres_list" and "genres_list" in patch:
+                self.genres_list = patch["genres_list"]["rows"]
+            elif name == "genres" and "genres" in patch:
+                self.genres = patch["genres"]["rows"]
+
     # ===== MESSAGES =====
 
     def clear_messages(self):
@@ -0,0 +1,33 @@
+-- PTC Library Admin: indexed full-text and trigram search for books.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/001_books_search.sql
+--
+-- Safe to re-run.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Search document kept up to date by PostgreSQL on every insert/update.
+-- The 'simple' configuration avoids English stemming so names and
+-- non-English titles match as typed; prefix queries cover partial words.
+ALTER TABLE books
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(book_id, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_books_search_vector
+    ON books USING GIN (search_vector);
+
+-- Trigram indexes serve the typo-tolerant fallback (word_similarity) as
+-- well as the LOWER(...) LIKE '%text%' filters used by the list queries.
+CREATE INDEX IF NOT EXISTS idx_books_title_trgm
+    ON books USING GIN (LOWER(title) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_books_author_trgm
+    ON books USING GIN (LOWER(author) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_books_book_id_trgm
+    ON books USING GIN (LOWER(book_id) gin_trgm_ops);
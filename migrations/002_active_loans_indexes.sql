@@ -0,0 +1,18 @@
+-- PTC Library Admin: indexes for active-loan queries.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/002_active_loans_indexes.sql
+--
+-- Safe to re-run.
+
+-- Active loans are a small slice of the loans table; index only those.
+-- Serves the status filters in DatabaseService.get_active_loans, which
+-- are written as borrow_date ranges, and its ORDER BY borrow_date.
+CREATE INDEX IF NOT EXISTS idx_loans_active_borrow_date
+    ON loans (borrow_date, loan_id)
+    WHERE return_date IS NULL;
+
+-- Per-user active loan lookups (user lists, notification targeting)
+CREATE INDEX IF NOT EXISTS idx_loans_active_user_id
+    ON loans (user_id)
+    WHERE return_date IS NULL;
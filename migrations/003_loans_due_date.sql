@@ -0,0 +1,40 @@
+-- PTC Library Admin: persisted, indexed due date on loans.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/003_loans_due_date.sql
+--
+-- Safe to re-run.
+
+ALTER TABLE loans ADD COLUMN IF NOT EXISTS due_date DATE;
+
+-- Backfill from the configured loan period (defaults to 14 days)
+UPDATE loans
+SET due_date = borrow_date::date + COALESCE(
+    (SELECT setting_value::integer FROM settings WHERE setting_key = 'loan_due_days'), 14
+)
+WHERE due_date IS NULL;
+
+-- New loans get their due date at borrow time, whichever client inserts them
+CREATE OR REPLACE FUNCTION loans_set_due_date() RETURNS trigger AS $$
+BEGIN
+    IF NEW.due_date IS NULL THEN
+        NEW.due_date := NEW.borrow_date::date + COALESCE(
+            (SELECT setting_value::integer FROM settings WHERE setting_key = 'loan_due_days'), 14
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_loans_set_due_date ON loans;
+CREATE TRIGGER trg_loans_set_due_date
+    BEFORE INSERT ON loans
+    FOR EACH ROW EXECUTE FUNCTION loans_set_due_date();
+
+-- Overdue / due-soon checks become range scans over active loans
+CREATE INDEX IF NOT EXISTS idx_loans_active_due_date
+    ON loans (due_date, loan_id)
+    WHERE return_date IS NULL;
+
+-- Superseded by idx_loans_active_due_date
+DROP INDEX IF EXISTS idx_loans_active_borrow_date;
@@ -0,0 +1,38 @@
+-- PTC Library Admin: durable outbox for WhatsApp notifications.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/004_notification_outbox.sql
+--
+-- Safe to re-run.
+
+-- Callers enqueue messages here; OutboxWorker delivers them.
+--   pending  waiting for (another) attempt at next_attempt_at
+--   sending  claimed by a worker; the claim expires at next_attempt_at,
+--            so a crashed worker's messages are picked up again
+--   sent     delivered
+--   dead     gave up after the maximum number of attempts
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    channel TEXT NOT NULL CHECK (channel IN ('direct', 'group')),
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    sent_at TIMESTAMPTZ
+);
+
+-- Claim queries only ever look at undelivered messages that are due
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+    ON notification_outbox (next_attempt_at)
+    WHERE status IN ('pending', 'sending');
+
+-- Dead letters, for inspection and manual requeue
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_dead
+    ON notification_outbox (created_at)
+    WHERE status = 'dead';
@@ -0,0 +1,23 @@
+-- PTC Library Admin: checkpoints for scheduled notification runs.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/005_notification_checkpoints.sql
+--
+-- Safe to re-run.
+
+-- One row per finished phase of a day's run, per shard. A rerun of the
+-- same day (e.g. after a crash) skips the phases recorded here; messages
+-- already queued are delivered by the outbox worker either way.
+CREATE TABLE IF NOT EXISTS notification_checkpoints (
+    run_date DATE NOT NULL,
+    phase TEXT NOT NULL,
+    shard_index INTEGER NOT NULL,
+    shard_count INTEGER NOT NULL,
+    loans INTEGER NOT NULL DEFAULT 0,
+    queued INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    invalid INTEGER NOT NULL DEFAULT 0,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (run_date, phase, shard_index, shard_count),
+    CHECK (shard_index >= 0 AND shard_index < shard_count)
+);
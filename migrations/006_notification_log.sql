@@ -0,0 +1,21 @@
+-- PTC Library Admin: ledger of loan notifications.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/006_notification_log.sql
+--
+-- Safe to re-run.
+
+-- One row per loan, notification kind and day, written when the
+-- notification is queued (or sent directly). Candidate queries skip loans
+-- notified within the kind's repeat window with a NOT EXISTS against the
+-- unique index, so reruns and the bulk buttons don't notify twice.
+CREATE TABLE IF NOT EXISTS notification_log (
+    loan_id INTEGER NOT NULL REFERENCES loans(loan_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL CHECK (kind IN ('due_reminder', 'overdue_alert')),
+    user_id TEXT NOT NULL,
+    notified_on DATE NOT NULL DEFAULT CURRENT_DATE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_log_loan_kind_day
+    ON notification_log (loan_id, kind, notified_on);
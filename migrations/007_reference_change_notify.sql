@@ -0,0 +1,32 @@
+-- PTC Library Admin: announce changes to cached reference tables.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/007_reference_change_notify.sql
+--
+-- Safe to re-run.
+
+-- Every backend process caches genres, settings and message templates
+-- (ReferenceCache) and LISTENs on reference_changed. Any write to these
+-- tables, from the app or from psql, drops the cached copies everywhere
+-- once the writing transaction commits.
+CREATE OR REPLACE FUNCTION notify_reference_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('reference_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS genres_reference_changed ON genres;
+CREATE TRIGGER genres_reference_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON genres
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_changed();
+
+DROP TRIGGER IF EXISTS settings_reference_changed ON settings;
+CREATE TRIGGER settings_reference_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON settings
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_changed();
+
+DROP TRIGGER IF EXISTS message_templates_reference_changed ON message_templates;
+CREATE TRIGGER message_templates_reference_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON message_templates
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_changed();
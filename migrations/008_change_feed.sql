@@ -0,0 +1,140 @@
+-- PTC Library Admin: statement-level change feed.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/008_change_feed.sql
+--
+-- Safe to re-run. Requires PostgreSQL 10+ (transition tables).
+
+-- Every statement changing books, loans, users or genres sends one
+-- NOTIFY row_changed with a small JSON payload, however many rows it
+-- touched:
+--   {"table": "loans", "op": "UPDATE", "keys": ["42", "43"],
+--    "old_keys": [], "user_ids": ["6281..."]}
+-- keys are the primary keys of the rows written (or deleted); old_keys
+-- the keys an UPDATE moved rows away from. A payload that would not fit
+-- in a NOTIFY (8000 bytes), e.g. from a bulk import or a recompute of
+-- every loan, is replaced by {"table": ..., "op": ..., "reload": true}.
+-- The app's change feed fetches the changed rows once and patches every
+-- open session showing them.
+CREATE OR REPLACE FUNCTION notify_rows_changed() RETURNS trigger AS $$
+DECLARE
+    key_column TEXT := TG_ARGV[0];
+    new_keys TEXT[] := '{}';
+    old_keys TEXT[] := '{}';
+    user_ids TEXT[] := '{}';
+    payload TEXT;
+BEGIN
+    -- new_rows/old_rows only exist for the events that declare them
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COALESCE(array_agg(DISTINCT to_jsonb(r) ->> key_column), '{}'),
+               COALESCE(array_agg(DISTINCT to_jsonb(r) ->> 'user_id')
+                        FILTER (WHERE to_jsonb(r) ->> 'user_id' IS NOT NULL), '{}')
+        INTO new_keys, user_ids
+        FROM new_rows r;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COALESCE(array_agg(DISTINCT to_jsonb(r) ->> key_column), '{}'),
+               user_ids || COALESCE(array_agg(DISTINCT to_jsonb(r) ->> 'user_id')
+                                    FILTER (WHERE to_jsonb(r) ->> 'user_id' IS NOT NULL), '{}')
+        INTO old_keys, user_ids
+        FROM old_rows r;
+    END IF;
+
+    -- e.g. INSERT ... ON CONFLICT DO NOTHING that inserted nothing
+    IF cardinality(new_keys) = 0 AND cardinality(old_keys) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    payload := json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'keys', CASE WHEN TG_OP = 'DELETE' THEN old_keys ELSE new_keys END,
+        'old_keys', CASE
+            WHEN TG_OP = 'UPDATE'
+            THEN ARRAY(SELECT unnest(old_keys) EXCEPT SELECT unnest(new_keys))
+            ELSE '{}'
+        END,
+        'user_ids', ARRAY(SELECT DISTINCT unnest(user_ids))
+    )::text;
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'reload', true)::text;
+    END IF;
+
+    PERFORM pg_notify('row_changed', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables can't be shared between events, so each table gets
+-- one trigger per event. The *_row_changed triggers are the per-row ones
+-- of earlier versions of this migration.
+
+DROP TRIGGER IF EXISTS books_row_changed ON books;
+
+DROP TRIGGER IF EXISTS books_rows_inserted ON books;
+CREATE TRIGGER books_rows_inserted
+    AFTER INSERT ON books REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('book_id');
+
+DROP TRIGGER IF EXISTS books_rows_updated ON books;
+CREATE TRIGGER books_rows_updated
+    AFTER UPDATE ON books REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('book_id');
+
+DROP TRIGGER IF EXISTS books_rows_deleted ON books;
+CREATE TRIGGER books_rows_deleted
+    AFTER DELETE ON books REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('book_id');
+
+DROP TRIGGER IF EXISTS loans_row_changed ON loans;
+
+DROP TRIGGER IF EXISTS loans_rows_inserted ON loans;
+CREATE TRIGGER loans_rows_inserted
+    AFTER INSERT ON loans REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('loan_id');
+
+DROP TRIGGER IF EXISTS loans_rows_updated ON loans;
+CREATE TRIGGER loans_rows_updated
+    AFTER UPDATE ON loans REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('loan_id');
+
+DROP TRIGGER IF EXISTS loans_rows_deleted ON loans;
+CREATE TRIGGER loans_rows_deleted
+    AFTER DELETE ON loans REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('loan_id');
+
+DROP TRIGGER IF EXISTS users_row_changed ON users;
+
+DROP TRIGGER IF EXISTS users_rows_inserted ON users;
+CREATE TRIGGER users_rows_inserted
+    AFTER INSERT ON users REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('user_id');
+
+DROP TRIGGER IF EXISTS users_rows_updated ON users;
+CREATE TRIGGER users_rows_updated
+    AFTER UPDATE ON users REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('user_id');
+
+DROP TRIGGER IF EXISTS users_rows_deleted ON users;
+CREATE TRIGGER users_rows_deleted
+    AFTER DELETE ON users REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('user_id');
+
+DROP TRIGGER IF EXISTS genres_row_changed ON genres;
+
+DROP TRIGGER IF EXISTS genres_rows_inserted ON genres;
+CREATE TRIGGER genres_rows_inserted
+    AFTER INSERT ON genres REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('genre_id');
+
+DROP TRIGGER IF EXISTS genres_rows_updated ON genres;
+CREATE TRIGGER genres_rows_updated
+    AFTER UPDATE ON genres REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('genre_id');
+
+DROP TRIGGER IF EXISTS genres_rows_deleted ON genres;
+CREATE TRIGGER genres_rows_deleted
+    AFTER DELETE ON genres REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rows_changed('genre_id');
+
+DROP FUNCTION IF EXISTS notify_row_changed();
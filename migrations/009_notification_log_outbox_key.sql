@@ -0,0 +1,13 @@
+-- PTC Library Admin: link notification ledger entries to their outbox message.
+--
+-- Apply with:
+--   psql -h $DB_HOST -U $DB_USER -d $DB_NAME -f migrations/009_notification_log_outbox_key.sql
+--
+-- Safe to re-run.
+
+-- Ledger entries are written when a notification is queued. Keeping the
+-- outbox message's idempotency key lets candidate queries ignore entries
+-- whose message was dead-lettered, so an undelivered notification doesn't
+-- stop the loan from being notified again. NULL for notifications sent
+-- directly (already delivered).
+ALTER TABLE notification_log ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+CLI script to deliver queued notifications from the notification outbox.
+
+Runs until stopped, delivering messages as they become due. Any number
+of workers can run at once; each claims its own batches.
+
+Usage:
+  python run_outbox_worker.py              # run forever
+  python run_outbox_worker.py --once       # drain what is due now, then exit
+
+Options:
+  --batch-size N    Messages claimed per batch (default: OUTBOX_BATCH_SIZE)
+  --concurrency N   Messages in flight at once (default: NOTIFY_CONCURRENCY)
+
+Not needed when the app runs its own worker (OUTBOX_WORKER_ENABLED=true).
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+from library_admin.services.outbox import OutboxService, OutboxWorker
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Deliver PTC Library queued notifications")
+    parser.add_argument("--once", action="store_true", help="drain due messages and exit")
+    parser.add_argument("--batch-size", type=int, default=None, help="messages claimed per batch")
+    parser.add_argument("--concurrency", type=int, default=None, help="messages in flight at once")
+    return parser.parse_args()
+
+
+def main():
+    """Run the outbox worker."""
+    args = parse_args()
+    worker = OutboxWorker(batch_size=args.batch_size, concurrency=args.concurrency)
+
+    try:
+        if args.once:
+            results = asyncio.run(worker.drain())
+            results["outbox"] = OutboxService.get_outbox_stats()
+            print(json.dumps(results, indent=2))
+            sys.exit(1 if results["failed"] else 0)
+
+        print("Outbox worker started")
+        asyncio.run(worker.run_forever())
+
+    except KeyboardInterrupt:
+        print("Outbox worker stopped")
+    except Exception as e:
+        print(f"ERROR: {str(e)}")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,26 @@ This script should be run daily via cron or systemd timer.
 Example crontab entry (run daily at 9 AM):
 0 9 * * * cd /path/to/library-admin && python send_scheduled_notifications.py
 
+Messages are queued in the notification outbox and then delivered;
+failed deliveries are retried later by the outbox worker
+(run_outbox_worker.py, or the app itself when OUTBOX_WORKER_ENABLED).
+
+Options:
+  --plan            Dry run: print what would be sent as JSON lines, send nothing
+  --enqueue-only    Only queue messages, leave delivery to the outbox worker
+  --concurrency N   Messages in flight at once (default: NOTIFY_CONCURRENCY)
+  --workers N       Queue with N worker processes, one shard of users each
+                    (queueing only; delivery still runs in this process)
+  --shard I/N       Only handle shard I of N (by user ID), e.g. one per host
+  --no-resume       Redo phases already checkpointed today
+
+Each queued phase is checkpointed (migrations/005_notification_checkpoints.sql),
+so rerunning after a crash skips the work already done. Messages are never
+queued twice either way.
+
+When sharding across hosts, every host that delivers has its own rate
+limiter; use --enqueue-only on all but one, or lower EVOLUTION_RATE.
+
 Example systemd timer:
 [Unit]
 Description=Send PTC Library scheduled notifications
@@ -21,32 +41,163 @@ WantedBy=timers.target
 
 import sys
 import json
+import argparse
 from datetime import datetime
 from library_admin.services.scheduled_notifications import ScheduledNotificationService
 
 
+def parse_shard(value):
+    """Parse an I/N shard spec into (index, count)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, e.g. 0/4, got '{value}'")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be 0..N-1, got '{value}'")
+    return index, count
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Send PTC Library scheduled notifications")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="dry run: print the messages that would be sent as JSON lines, without queueing or sending",
+    )
+    parser.add_argument(
+        "--enqueue-only",
+        action="store_true",
+        help="only queue the messages; leave delivery to a running outbox worker",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="messages in flight at once (default: NOTIFY_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="queue with N worker processes, one shard of users each "
+             "(parallelises queueing only; delivery runs in this process)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="only handle shard I of N (users are assigned by a hash of user ID)",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="redo phases already checkpointed today",
+    )
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers and args.shard:
+        parser.error("--workers and --shard cannot be combined")
+    if args.workers and args.plan:
+        parser.error("--workers cannot be combined with --plan")
+    return args
+
+
+def print_plan(shard=None):
+    """
+    Print the dry-run plan as JSON lines.
+
+    One 'message' line per message that would be queued, one 'phase'
+    line per notification type and a final 'summary' line.
+    """
+    plan = ScheduledNotificationService.plan_daily_notifications(shard=shard)
+
+    for phase, results in plan["phases"].items():
+        for detail in results["details"]:
+            print(json.dumps({"type": "message", "phase": phase, **detail}))
+
+    for phase, results in plan["phases"].items():
+        print(json.dumps({
+            "type": "phase",
+            "phase": phase,
+            "loans": results["total"],
+            "messages": results["messages"],
+            "recipients": results["recipients"],
+            "already_queued": results["already_queued"],
+            "invalid": results["failed"],
+            "chars": results["chars"],
+            "timings": results["timings"],
+        }))
+
+    print(json.dumps({
+        "type": "summary",
+        "timestamp": plan["timestamp"],
+        "digest": plan["digest"],
+        **plan["summary"],
+    }))
+
+
 def main():
     """Run scheduled notifications and output results."""
+    args = parse_args()
+
+    if args.plan:
+        try:
+            print_plan(args.shard)
+        except Exception as e:
+            print(f"ERROR: {str(e)}", file=sys.stderr)
+            sys.exit(2)
+        sys.exit(0)
+
     print(f"=== PTC Library Scheduled Notifications ===")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
 
     try:
         # Run all daily notifications
-        results = ScheduledNotificationService.run_daily_notifications()
+        if args.workers:
+            results = ScheduledNotificationService.run_daily_notifications_parallel(
+                args.workers,
+                deliver=not args.enqueue_only,
+                concurrency=args.concurrency,
+                resume=args.resume,
+            )
+        else:
+            results = ScheduledNotificationService.run_daily_notifications(
+                deliver=not args.enqueue_only,
+                concurrency=args.concurrency,
+                shard=args.shard,
+                resume=args.resume,
+            )
 
         # Display results
-        print("Due Reminders:")
-        print(f"  Total: {results['due_reminders'].get('total', 0)}")
-        print(f"  Sent: {results['due_reminders'].get('success', 0)}")
-        print(f"  Failed: {results['due_reminders'].get('failed', 0)}")
-        print()
-
-        print("Overdue Alerts:")
-        print(f"  Total: {results['overdue_alerts'].get('total', 0)}")
-        print(f"  Sent: {results['overdue_alerts'].get('success', 0)}")
-        print(f"  Failed: {results['overdue_alerts'].get('failed', 0)}")
-        print()
+        for label, key in (("Due Reminders", "due_reminders"), ("Overdue Alerts", "overdue_alerts")):
+            print(f"{label}:")
+            print(f"  Total: {results[key].get('total', 0)}")
+            print(f"  Queued: {results[key].get('queued', 0)}")
+            print(f"  Already queued: {results[key].get('duplicates', 0)}")
+            print(f"  Invalid: {results[key].get('failed', 0)}")
+            if results[key].get('skipped'):
+                print(f"  Skipped: already done at {results[key].get('completed_at')}")
+            if 'error' in results[key]:
+                print(f"  Error: {results[key]['error']}")
+            for error in results[key].get('errors', []):
+                print(f"  Error: {error}")
+            print()
+
+        if not args.enqueue_only:
+            print("Delivery:")
+            print(f"  Sent: {results['delivery'].get('sent', 0)}")
+            print(f"  Failed (will retry): {results['delivery'].get('failed', 0)}")
+            print(f"  Time: {results['delivery'].get('elapsed_seconds', 0)}s")
+            rate = results['delivery'].get('rate', {})
+            print(f"  Send rate: {rate.get('rate_per_second', 0)}/s "
+                  f"({rate.get('sent_last_minute', 0)} in the last minute, "
+                  f"{rate.get('throttled', 0)} throttled)")
+            print()
 
         print(f"Total notifications sent: {results.get('total_sent', 0)}")
         print(f"Total notifications failed: {results.get('total_failed', 0)}")
@@ -0,0 +1,35 @@
+"""Tests for library_admin.services.search_debounce."""
+
+import asyncio
+
+import pytest
+
+from library_admin.services.search_debounce import SearchDebouncer, SearchSuperseded
+
+
+def test_failure_between_settle_and_run_releases_search():
+    debouncer = SearchDebouncer(0)
+
+    async def search():
+        async with debouncer.settled("s:books"):
+            raise RuntimeError("state read failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(search())
+    assert not debouncer.has_pending("s:books")
+
+
+def test_newer_search_stays_pending_when_older_one_exits():
+    debouncer = SearchDebouncer(0)
+
+    async def searches():
+        async with debouncer.settled("s:books") as ticket:
+            newer = asyncio.ensure_future(debouncer.settle("s:books", delay=0.05))
+            await asyncio.sleep(0)
+            with pytest.raises(SearchSuperseded):
+                await debouncer.run("s:books", ticket, lambda: asyncio.sleep(0))
+        assert debouncer.has_pending("s:books")
+        return await debouncer.run("s:books", await newer, lambda: asyncio.sleep(0, "rows"))
+
+    assert asyncio.run(searches()) == "rows"
+    assert not debouncer.has_pending("s:books")
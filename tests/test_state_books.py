@@ -0,0 +1,154 @@
+"""Tests for the books handlers in library_admin.state."""
+
+import asyncio
+import types
+
+import pytest
+
+from library_admin import state as state_module
+from library_admin.models import BookRow
+from library_admin.services.async_database import AsyncDatabaseService
+from library_admin.services.database import DatabaseService
+from library_admin.state import State
+
+
+def _session(**values):
+    """A stand-in for a State instance with the books handlers bound to it."""
+    defaults = dict(
+        is_loading=False,
+        loading_message="",
+        success_message="",
+        error_message="",
+        book_search="",
+        book_filter_status="all",
+        book_filter_genre="all",
+        books_next_cursor="",
+        books=[],
+        dashboard_stats={},
+        genres_list=[],
+    )
+    session = types.SimpleNamespace(**{**defaults, **values})
+    for name in ("delete_book_confirm", "_patch_books", "_apply_books_page", "_book_matches",
+                 "_adjust_book_counts"):
+        handler = getattr(State, name)
+        setattr(session, name, getattr(handler, "fn", handler).__get__(session))
+    return session
+
+
+@pytest.fixture
+def deleted_book(monkeypatch):
+    """Make AsyncDatabaseService.delete_book return a row as the database does."""
+    row = {
+        "book_id": "B2",
+        "title": "Dune",
+        "author": "Frank Herbert",
+        "genre": "Fiction",
+        "status": "available",
+        "loaned_to": None,
+    }
+
+    async def delete_book(book_id):
+        return dict(row, book_id=book_id)
+
+    monkeypatch.setattr(AsyncDatabaseService, "delete_book", staticmethod(delete_book))
+    return row
+
+
+def test_delete_book_removes_row_and_adjusts_counts(deleted_book):
+    session = _session(
+        books=[
+            BookRow("B1", "Emma", "Jane Austen", "Fiction", "available"),
+            BookRow("B2", "Dune", "Frank Herbert", "Fiction", "available"),
+        ],
+        dashboard_stats={"total_books": 2, "available_books": 2, "borrowed_books": 0},
+        genres_list=[{"genre_id": 1, "genre_name": "Fiction", "book_count": 2}],
+    )
+
+    asyncio.run(session.delete_book_confirm("B2"))
+
+    assert session.error_message == ""
+    assert session.success_message == "Book deleted successfully"
+    assert [book.book_id for book in session.books] == ["B1"]
+    assert session.dashboard_stats["total_books"] == 1
+    assert session.dashboard_stats["available_books"] == 1
+    assert session.genres_list[0]["book_count"] == 1
+
+
+def test_delete_borrowed_book_reports_error(monkeypatch):
+    async def delete_book(book_id):
+        return None
+
+    monkeypatch.setattr(AsyncDatabaseService, "delete_book", staticmethod(delete_book))
+    session = _session(books=[BookRow("B1", "Emma", "Jane Austen", "Fiction", "borrowed", "u1")])
+
+    asyncio.run(session.delete_book_confirm("B1"))
+
+    assert session.error_message == "Cannot delete book. It may be currently borrowed."
+    assert [book.book_id for book in session.books] == ["B1"]
+
+
+def _collated(book_ids, up_to=""):
+    """Order IDs case-insensitively, as a database collation would."""
+    return sorted(
+        (book_id for book_id in book_ids if not up_to or book_id.lower() <= up_to.lower()),
+        key=str.lower,
+    )
+
+
+def test_patch_places_new_books_in_database_order(monkeypatch):
+    async def fetch_books(*args, **kwargs):
+        raise AssertionError("placing a new book needs no reload")
+
+    async def order_book_ids(book_ids, up_to=""):
+        return _collated(book_ids, up_to)
+
+    monkeypatch.setattr(state_module, "_fetch_books", fetch_books)
+    monkeypatch.setattr(AsyncDatabaseService, "order_book_ids", staticmethod(order_book_ids))
+    session = _session(books=[
+        BookRow("A1", "", "", "Fiction", "available"),
+        BookRow("C1", "", "", "Fiction", "available"),
+    ])
+
+    new_book = {"book_id": "b1", "title": "", "author": "", "genre": "Fiction", "status": "available"}
+    asyncio.run(session._patch_books([new_book], set()))
+
+    assert [book.book_id for book in session.books] == ["A1", "b1", "C1"]
+
+
+def test_patch_drops_new_books_past_the_loaded_page(monkeypatch):
+    async def order_book_ids(book_ids, up_to=""):
+        return _collated(book_ids, up_to)
+
+    monkeypatch.setattr(AsyncDatabaseService, "order_book_ids", staticmethod(order_book_ids))
+    session = _session(
+        books=[
+            BookRow("A1", "", "", "Fiction", "available"),
+            BookRow("C1", "", "", "Fiction", "available"),
+        ],
+        books_next_cursor=DatabaseService.encode_page_cursor("next", "C1"),
+    )
+
+    new_books = [
+        {"book_id": book_id, "title": "", "author": "", "genre": "Fiction", "status": "available"}
+        for book_id in ("b1", "d1")
+    ]
+    asyncio.run(session._patch_books(new_books, set()))
+
+    assert [book.book_id for book in session.books] == ["A1", "b1", "C1"]
+
+
+def test_patch_updates_shown_book_in_place(monkeypatch):
+    async def fetch_books(*args, **kwargs):
+        raise AssertionError("an in-place update needs no query")
+
+    monkeypatch.setattr(state_module, "_fetch_books", fetch_books)
+    session = _session(books=[
+        BookRow("A1", "Emma", "Jane Austen", "Fiction", "available"),
+        BookRow("C1", "Dune", "Frank Herbert", "Fiction", "available"),
+    ])
+
+    changed = {"book_id": "A1", "title": "Emma", "author": "Jane Austen", "genre": "Fiction",
+               "status": "borrowed", "loaned_to": "u1"}
+    asyncio.run(session._patch_books([changed], set()))
+
+    assert [(book.book_id, book.status) for book in session.books] == [("A1", "borrowed"), ("C1", "available")]